@@ -9,6 +9,65 @@ from nba_pick5_optimizer import *
 
 
 def main(arguments):
+    # optional `--seed <int>` anywhere in the command makes the run reproducible
+    seed = None
+    if "--seed" in arguments:
+        i = arguments.index("--seed")
+        seed = int(arguments[i + 1])
+        arguments = arguments[:i] + arguments[i + 2 :]
+
+    # optional `--benchmark_sampling` on a gpp, showdown or late swap sim reports how
+    # much each sampling method cuts the variance of the sim's ROI and win% instead of
+    # running it
+    benchmark_sampling = "--benchmark_sampling" in arguments
+    if benchmark_sampling:
+        arguments.remove("--benchmark_sampling")
+    # optional `--benchmark_distributions` on a gpp sim times the player outcome draws
+    # under each outcome distribution instead of running it
+    benchmark_distributions = "--benchmark_distributions" in arguments
+    if benchmark_distributions:
+        arguments.remove("--benchmark_distributions")
+
+    # optional `--shard <i>/<n>` on a gpp sim simulates only the i-th of n disjoint
+    # shares of the iterations and saves its partial results; `--merge <n>` adds the n
+    # shards' results up into the usual output. `--shard_dir <path>` is where the
+    # shards and the merge meet (output/ by default), e.g. a directory every host
+    # running a shard can reach
+    shard = None
+    merge_shards = None
+    shard_dir = None
+    if "--shard" in arguments:
+        i = arguments.index("--shard")
+        try:
+            index, count = [int(x) for x in arguments[i + 1].split("/")]
+        except (IndexError, ValueError):
+            index, count = 0, 0
+        if count < 1 or not 1 <= index <= count:
+            print(
+                "Incorrect usage of --shard, expected --shard <i>/<n> with 1 <= i <= n. "
+                "Please see `README.md` for proper usage."
+            )
+            exit()
+        shard = (index - 1, count)
+        arguments = arguments[:i] + arguments[i + 2 :]
+    if "--merge" in arguments:
+        i = arguments.index("--merge")
+        try:
+            merge_shards = int(arguments[i + 1])
+        except (IndexError, ValueError):
+            merge_shards = 0
+        if merge_shards < 1:
+            print(
+                "Incorrect usage of --merge, expected --merge <n> with n >= 1. "
+                "Please see `README.md` for proper usage."
+            )
+            exit()
+        arguments = arguments[:i] + arguments[i + 2 :]
+    if "--shard_dir" in arguments:
+        i = arguments.index("--shard_dir")
+        shard_dir = arguments[i + 1]
+        arguments = arguments[:i] + arguments[i + 2 :]
+
     if len(arguments) < 3 or len(arguments) > 7:
         print("Incorrect usage. Please see `README.md` for proper usage.")
         exit()
@@ -16,23 +75,59 @@ def main(arguments):
     site = arguments[1]
     process = arguments[2]
 
+    # the optional flags each process takes; any other is refused rather than ignored
+    flags = {
+        "--shard": shard is not None,
+        "--merge": merge_shards is not None,
+        "--shard_dir": shard_dir is not None,
+        "--benchmark_sampling": benchmark_sampling,
+        "--benchmark_distributions": benchmark_distributions,
+    }
+    supported_flags = {
+        "sim": list(flags),
+        "sim contests": ["--shard", "--merge", "--shard_dir"],
+        "sd_sim": ["--benchmark_sampling"],
+        "swap_sim": ["--benchmark_sampling"],
+    }
+    mode = process
+    if process == "sim" and len(arguments) > 3 and arguments[3] == "contests":
+        mode = "sim contests"
+    used = [flag for flag, given in flags.items() if given]
+    unsupported = [f for f in used if f not in supported_flags.get(mode, [])]
+    # a benchmark replaces the sim, so it can't be one shard of it
+    if (shard is not None or merge_shards is not None) and (
+        benchmark_sampling or benchmark_distributions
+    ):
+        unsupported += [
+            f for f in ["--benchmark_sampling", "--benchmark_distributions"] if flags[f]
+        ]
+    if len(unsupported) > 0:
+        print(
+            "{} not supported for {}{}. Please see `README.md` for proper usage.".format(
+                ", ".join(sorted(set(unsupported))),
+                mode,
+                " with --shard or --merge" if mode == "sim" else "",
+            )
+        )
+        exit()
+
     if process == "opto":
         num_lineups = arguments[3]
         num_uniques = arguments[4]
-        opto = NBA_Optimizer(site, num_lineups, num_uniques)
+        opto = NBA_Optimizer(site, num_lineups, num_uniques, seed=seed)
         opto.optimize()
         opto.output()
 
     if process == "pick5":
         num_lineups = arguments[3]
         num_uniques = arguments[4]
-        pick5 = NBA_Pick5_Optimizer(site, num_lineups, num_uniques)
+        pick5 = NBA_Pick5_Optimizer(site, num_lineups, num_uniques, seed=seed)
         pick5.optimize()
         pick5.output()
 
     if process == "swap":
         num_uniques = arguments[3]
-        swapto = NBA_Late_Swaptimizer(site, num_uniques)
+        swapto = NBA_Late_Swaptimizer(site, num_uniques, seed=seed)
         swapto.swaptimize()
         swapto.output()
 
@@ -41,16 +136,21 @@ def main(arguments):
 
         num_uniques = arguments[3]
         num_iterations = int(arguments[4])
-        simto = nba_swap_sims.NBA_Swaptimizer_Sims(num_iterations, site, num_uniques)
+        simto = nba_swap_sims.NBA_Swaptimizer_Sims(
+            num_iterations, site, num_uniques, seed=seed
+        )
         simto.swaptimize()
         simto.compute_best_guesses_parallel()
-        simto.run_tournament_simulation()
-        simto.output()
+        if benchmark_sampling:
+            simto.benchmark_sampling()
+        else:
+            simto.run_tournament_simulation()
+            simto.output()
 
     elif process == "sd_opto":
         num_lineups = arguments[3]
         num_uniques = arguments[4]
-        opto = NBA_Showdown_Optimizer(site, num_lineups, num_uniques)
+        opto = NBA_Showdown_Optimizer(site, num_lineups, num_uniques, seed=seed)
         opto.optimize()
         opto.output()
 
@@ -75,11 +175,19 @@ def main(arguments):
         # if 'match' in arguments:
         #    match_lineup_input_to_field_size = True
         sim = nba_showdown_simulator.nba_showdown_simulator(
-            site, field_size, num_iterations, use_contest_data, use_file_upload
+            site,
+            field_size,
+            num_iterations,
+            use_contest_data,
+            use_file_upload,
+            seed=seed,
         )
         sim.generate_field_lineups()
-        sim.run_tournament_simulation()
-        sim.save_results()
+        if benchmark_sampling:
+            sim.benchmark_sampling()
+        else:
+            sim.run_tournament_simulation()
+            sim.save_results()
 
     elif process == "sim":
         import nba_gpp_simulator
@@ -90,6 +198,36 @@ def main(arguments):
         use_contest_data = False
         use_file_upload = False
         match_lineup_input_to_field_size = True
+        if arguments[3] == "contests":
+            # every contest in config.json's "contests" against one outcome simulation
+            num_iterations = arguments[4]
+            sim = nba_gpp_simulator.NBA_GPP_Simulator(
+                site, field_size, num_iterations, False, False, seed=seed
+            )
+            if shard is not None:
+                # before the contests are copied from it
+                sim.set_shard(shard[0], shard[1], shard_dir)
+            contests = sim.load_contests()
+            if len(contests) == 0:
+                return
+            if merge_shards is not None:
+                for contest in contests:
+                    if not contest.merge_shard_results(merge_shards, shard_dir):
+                        return
+                for contest in contests:
+                    contest.output()
+                return
+            # largest field first, the smaller fields are then drawn from its cache
+            for contest in sorted(contests, key=lambda c: -c.field_size):
+                if shard is None:
+                    contest.generate_field_lineups()
+                elif not contest.share_field_lineups():
+                    return
+            sim.run_tournament_simulation(contests)
+            if shard is None:
+                for contest in contests:
+                    contest.output()
+            return
         if arguments[3] == "cid":
             use_contest_data = True
         else:
@@ -103,11 +241,29 @@ def main(arguments):
         # if 'match' in arguments:
         #    match_lineup_input_to_field_size = True
         sim = nba_gpp_simulator.NBA_GPP_Simulator(
-            site, field_size, num_iterations, use_contest_data, use_file_upload
+            site,
+            field_size,
+            num_iterations,
+            use_contest_data,
+            use_file_upload,
+            seed=seed,
         )
-        sim.generate_field_lineups()
-        sim.run_tournament_simulation()
-        sim.output()
+        if merge_shards is not None:
+            if sim.merge_shard_results(merge_shards, shard_dir):
+                sim.output()
+        elif shard is not None:
+            sim.set_shard(shard[0], shard[1], shard_dir)
+            if sim.share_field_lineups():
+                sim.run_tournament_simulation()
+        elif benchmark_distributions:
+            sim.benchmark_outcome_distributions()
+        else:
+            sim.generate_field_lineups()
+            if benchmark_sampling:
+                sim.benchmark_sampling()
+            else:
+                sim.run_tournament_simulation()
+                sim.output()
 
 
 if __name__ == "__main__":
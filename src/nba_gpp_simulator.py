@@ -1,4 +1,5 @@
 import csv
+import hashlib
 import json
 import math
 import os
@@ -12,12 +13,28 @@ import statistics
 import datetime
 import itertools
 import collections
+import copy
 import re
-from scipy.stats import norm, kendalltau, multivariate_normal, gamma
+from scipy.stats import norm, kendalltau, gamma
+from scipy.sparse import csr_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from numba import jit, prange
+from nba_sim_utils import (
+    OUTCOME_DISTRIBUTIONS,
+    AdaptiveSim,
+    add_block_stats,
+    build_correlation_matrix,
+    correlated_outcomes,
+    draw_standard_normals,
+    get_copula_marginals,
+    load_covariance_factor,
+    nearest_power_of_two,
+    new_block_stats,
+    score_ranked_block,
+)
 
 
 @jit(nopython=True)
@@ -25,7 +42,215 @@ def salary_boost(salary, max_salary):
     return (salary / max_salary) ** 2
 
 
-class NBA_GPP_Simulator:
+# reasons a sampled field lineup gets thrown away, indexes into sample_lineups' counters.
+# The salary reasons count slots left without a player that keeps the lineup between the
+# salary floor and cap, no_candidates slots whose affordable players were all taken
+REJECT_REASONS = (
+    "salary_too_high",
+    "salary_too_low",
+    "projection_too_low",
+    "single_game",
+    "team_limit",
+    "no_candidates",
+)
+SALARY_TOO_HIGH = 0
+SALARY_TOO_LOW = 1
+PROJECTION_TOO_LOW = 2
+SINGLE_GAME = 3
+TEAM_LIMIT = 4
+NO_CANDIDATES = 5
+
+
+@jit(nopython=True, cache=True)
+def sample_lineups(
+    num_lineups,
+    seed,
+    slot_players,
+    slot_counts,
+    slot_salaries,
+    slot_cum,
+    slot_cum_boosted,
+    slot_ranks,
+    salaries,
+    projections,
+    teams,
+    matchups,
+    num_slots,
+    salary_floor,
+    salary_ceiling,
+    min_salary_after,
+    max_salary_after,
+    reasonable_projection,
+    max_players_per_team,
+    min_acceptance_rate,
+    adapt_window,
+    projection_backoff,
+):
+    # Draws `num_lineups` field lineups as rows of player indices. Each roster slot is
+    # filled by ownership-weighted sampling over the eligible, unused players that keep
+    # the lineup completable: min/max_salary_after[k + 1] bound what the remaining slots
+    # can add, so a pick can't push the lineup past the cap or out of reach of the salary
+    # floor (the last slot is additionally weighted by salary_boost). Slot k's candidates
+    # are sorted by salary (see get_slot_tables), so the affordable ones are a contiguous
+    # range of the cumulative ownership table and a pick is a binary search, with players
+    # already in the lineup skipped as holes in that range. A lineup that
+    # dead-ends or fails the projection, multi-game or team limit checks is thrown away
+    # and restarted, and the reason is tallied in reject_counts: a slot with no
+    # affordable salary counts against the salary cap or floor, one whose affordable
+    # players are all taken as no_candidates. With a min_acceptance_rate
+    # > 0, the projection floor is multiplied by projection_backoff whenever fewer than
+    # that share of the last adapt_window attempts were accepted. Returns the lineups, the
+    # reject counts and the projection floor in use at the end.
+    np.random.seed(seed)
+    num_players = len(salaries)
+    lineups = np.empty((num_lineups, num_slots), dtype=np.int16)
+    lineup = np.empty(num_slots, dtype=np.int64)
+    in_lineup = np.zeros(num_players, dtype=np.bool_)
+    holes = np.empty(num_slots, dtype=np.int64)
+    team_counts = np.zeros(teams.max() + 1, dtype=np.int64)
+    reject_counts = np.zeros(len(REJECT_REASONS), dtype=np.int64)
+    filled = 0
+    attempts = 0
+    window_filled = 0
+    while filled < num_lineups:
+        if min_acceptance_rate > 0.0 and attempts > 0 and attempts % adapt_window == 0:
+            if filled - window_filled < min_acceptance_rate * adapt_window:
+                reasonable_projection *= projection_backoff
+            window_filled = filled
+        attempts += 1
+        salary = 0
+        proj = 0.0
+        picked = 0
+        reason = -1
+        for k in range(num_slots):
+            n = slot_counts[k]
+            max_pick = salary_ceiling - salary - min_salary_after[k + 1]
+            min_pick = salary_floor - salary - max_salary_after[k + 1]
+            lo = np.searchsorted(slot_salaries[k, :n], min_pick, "left")
+            hi = np.searchsorted(slot_salaries[k, :n], max_pick, "right")
+            if lo >= hi:
+                # no salary fits: blame the bound that rules out more of the slot's
+                # players (all of them when it alone empties the range)
+                reason = SALARY_TOO_HIGH if n - hi >= lo else SALARY_TOO_LOW
+                break
+            if k == num_slots - 1:
+                cum = slot_cum_boosted[k, : n + 1]
+            else:
+                cum = slot_cum[k, : n + 1]
+            num_holes = 0
+            removed = 0.0
+            for j in range(picked):
+                rank = slot_ranks[k, lineup[j]]
+                if lo <= rank < hi:
+                    holes[num_holes] = rank
+                    num_holes += 1
+                    removed += cum[rank + 1] - cum[rank]
+            total = cum[hi] - cum[lo] - removed
+            if total <= 0.0:
+                reason = NO_CANDIDATES
+                break
+            # step the target over the weight of every hole at or below it
+            holes[:num_holes].sort()
+            target = cum[lo] + np.random.random() * total
+            for h in range(num_holes):
+                if target >= cum[holes[h]]:
+                    target += cum[holes[h] + 1] - cum[holes[h]]
+            rank = min(np.searchsorted(cum, target, "right") - 1, hi - 1)
+            choice = slot_players[k, rank]
+            if in_lineup[choice]:
+                # only reachable through float round-off at the edge of the range
+                reason = NO_CANDIDATES
+                break
+            lineup[k] = choice
+            picked += 1
+            in_lineup[choice] = True
+            salary += salaries[choice]
+            proj += projections[choice]
+            team_counts[teams[choice]] += 1
+            if max_players_per_team > 0 and team_counts[teams[choice]] > max_players_per_team:
+                reason = TEAM_LIMIT
+                break
+        # clear the scratch state for the players picked so far
+        for i in range(picked):
+            in_lineup[lineup[i]] = False
+            team_counts[teams[lineup[i]]] = 0
+        if reason >= 0:
+            reject_counts[reason] += 1
+            continue
+        if salary > salary_ceiling:
+            reject_counts[SALARY_TOO_HIGH] += 1
+            continue
+        if salary < salary_floor:
+            reject_counts[SALARY_TOO_LOW] += 1
+            continue
+        if proj < reasonable_projection:
+            reject_counts[PROJECTION_TOO_LOW] += 1
+            continue
+        # must use players from more than one game
+        multi_game = False
+        for i in range(1, num_slots):
+            if matchups[lineup[i]] != matchups[lineup[0]]:
+                multi_game = True
+                break
+        if not multi_game:
+            reject_counts[SINGLE_GAME] += 1
+            continue
+        lineups[filled, :] = lineup
+        filled += 1
+    return lineups, reject_counts, reasonable_projection
+
+
+def hash_lineups(lineups):
+    # 64-bit FNV-1a style hash over each lineup's sorted player indices, so the same players
+    # in a different roster order hash the same. Returns the sorted rows and their hashes.
+    rows = np.sort(lineups, axis=1)
+    hashes = np.full(len(rows), 0xCBF29CE484222325, dtype=np.uint64)
+    for col in rows.T.astype(np.uint64):
+        hashes ^= col
+        hashes *= np.uint64(0x100000001B3)
+    return rows, hashes
+
+
+def dedupe_lineups(lineups):
+    # Collapses a (lineups x roster slots) batch to its distinct lineups: returns the sorted
+    # rows, their hashes, the first occurrence of each distinct lineup and how often it
+    # appears. Rows that share a hash are verified against each other, and the batch falls
+    # back to comparing the rows themselves if two different lineups collide.
+    rows, hashes = hash_lineups(lineups)
+    _, first, inverse, counts = np.unique(
+        hashes, return_index=True, return_inverse=True, return_counts=True
+    )
+    if not np.array_equal(rows, rows[first[inverse.reshape(-1)]]):
+        _, first, counts = np.unique(
+            rows, axis=0, return_index=True, return_counts=True
+        )
+    return rows, hashes, first, counts
+
+
+# slate arrays for field generation, published once per pool worker by init_field_slate
+field_slate = None
+
+
+def init_field_slate(slate):
+    global field_slate
+    field_slate = slate
+
+
+# field lineups and payout table for the tournament sim, published once per pool worker
+# by init_tournament_field
+tournament_field = None
+
+
+def init_tournament_field(field):
+    global tournament_field
+    tournament_field = field
+
+
+# Correlation between teammates sharing a primary position
+SAME_POSITION_CORRELATIONS = np.array([-0.1324, -0.1324, -0.0812, -0.0812, -0.1231, 0])
+
+
+class NBA_GPP_Simulator(AdaptiveSim):
     config = None
     player_dict = {}
     field_lineups = {}
@@ -49,6 +274,21 @@ class NBA_GPP_Simulator:
     min_lineup_salary = 48000
     max_pct_off_optimal = 0.4
     overlap_limit = 7
+    field_chunk_size = 1000
+    min_acceptance_rate = 0
+    adapt_window = 1000
+    projection_backoff = 0.95
+    field_rejections = {}
+    sim_memory_mb = 2048
+    sim_parallel_blocks = 16
+    sim_score_type = "float32"
+    outcome_chunk_size = 10000
+    sim_name = "gpp_sim"
+    contest_name = None
+    lineup_path = "tournament_lineups.csv"
+    shard = None
+    shard_dir = None
+    shard_iterations = None
     teams_dict = collections.defaultdict(list)  # Initialize teams_dict
     correlation_rules = {}
     game_info = {}
@@ -72,9 +312,23 @@ class NBA_GPP_Simulator:
         num_iterations,
         use_contest_data,
         use_lineup_input,
+        seed=None,
     ):
         self.site = site
         self.use_lineup_input = use_lineup_input
+        # every random stream in a run is spawned from its stage's child of this sequence
+        # (rng, field chunks, outcome chunks, benchmark replicates), fixed here so a stage's
+        # draws never depend on how many streams another stage spawned, e.g. whether the
+        # field came from the cache. A fixed seed reproduces the run on any number of cores
+        self.seed = seed
+        self.seed_sequence = np.random.SeedSequence(seed)
+        (
+            rng_seed,
+            self.field_seed_sequence,
+            self.outcome_seed_sequence,
+            self.benchmark_seed_sequence,
+        ) = self.seed_sequence.spawn(4)
+        self.rng = np.random.default_rng(rng_seed)
         self.load_config()
         self.load_rules()
 
@@ -90,6 +344,13 @@ class NBA_GPP_Simulator:
         )
         self.load_player_ids(player_path)
 
+        if self.outcome_distribution == "empirical":
+            boom_bust_path = os.path.join(
+                os.path.dirname(__file__),
+                "../{}_data/{}".format(site, self.config.get("boom_bust_path", "")),
+            )
+            self.load_boom_bust(boom_bust_path)
+
         if site == "dk":
             self.roster_construction = ["PG", "SG", "SF", "PF", "C", "G", "F", "UTIL"]
             self.salary = 50000
@@ -123,6 +384,7 @@ class NBA_GPP_Simulator:
 
         # self.adjust_default_stdev()
         self.assertPlayerDict()
+        self.index_players()
         self.num_iterations = int(num_iterations)
         self.get_optimal()
         if self.use_lineup_input:
@@ -142,6 +404,22 @@ class NBA_GPP_Simulator:
         self.max_pct_off_optimal = float(self.config["max_pct_off_optimal"])
         self.default_var = float(self.config["default_var"])
         self.correlation_rules = self.config["custom_correlations"]
+        # optional: relax the projection floor when field generation accepts too few lineups
+        self.min_acceptance_rate = float(self.config.get("min_acceptance_rate", 0))
+        # optional: memory the tournament sim may use for its lineups x iterations blocks
+        self.sim_memory_mb = int(self.config.get("sim_memory_mb", self.sim_memory_mb))
+        # optional: "float32", "int32" (fixed point tenths) or "float16" lineup scores
+        self.sim_score_type = self.config.get("sim_score_type", self.sim_score_type)
+        if self.sim_score_type not in ["float32", "int32", "float16"]:
+            print(
+                "unknown sim_score_type {}, using float32".format(self.sim_score_type)
+            )
+            self.sim_score_type = "float32"
+        # optional: outcome distribution, sampling and the adaptive iteration count
+        self.load_sim_options()
+        if self.sampling == "sobol":
+            # every outcome chunk is its own Sobol draw
+            self.outcome_chunk_size = nearest_power_of_two(self.outcome_chunk_size)
 
     def assertPlayerDict(self):
         for p, s in list(self.player_dict.items()):
@@ -152,6 +430,31 @@ class NBA_GPP_Simulator:
                 )
                 self.player_dict.pop(p)
 
+    # players are keyed by their index (0..N-1) in the simulator hot loops, string IDs are
+    # only looked up again when writing output
+    def index_players(self):
+        self.player_keys = list(self.player_dict.keys())
+        self.player_ids = np.array(
+            [self.player_dict[k]["ID"] for k in self.player_keys], dtype=object
+        )
+        self.id_to_index = {}
+        for i, k in enumerate(self.player_keys):
+            self.player_dict[k]["Index"] = i
+            self.id_to_index[self.player_dict[k]["ID"]] = i
+        # game start time, and bit k set when the player can fill position_map[k]
+        self.player_start_times = np.array(
+            [
+                self.game_info.get(self.player_dict[k]["Matchup"])
+                for k in self.player_keys
+            ],
+            dtype="datetime64[m]",
+        )
+        self.player_slot_masks = np.zeros(len(self.player_keys), dtype=np.int64)
+        for i, k in enumerate(self.player_keys):
+            for slot, positions in self.position_map.items():
+                if any(pos in positions for pos in self.player_dict[k]["Position"]):
+                    self.player_slot_masks[i] |= 1 << slot
+
     # In order to make reasonable tournament lineups, we want to be close enough to the optimal that
     # a person could realistically land on this lineup. Skeleton here is taken from base `mlb_optimizer.py`
     def get_optimal(self):
@@ -555,6 +858,43 @@ class NBA_GPP_Simulator:
                     )
         # print(self.payout_structure)
 
+    def load_contests(self):
+        # one simulator per entry of the config's "contests", each with its own contest
+        # structure, field size and lineup file but sharing this one's slate, so player
+        # outcomes are simulated once and every field is scored against them
+        contests = []
+        for i, contest in enumerate(self.config.get("contests", [])):
+            sim = copy.copy(self)
+            sim.contest_name = contest.get("name", "contest{}".format(i + 1))
+            sim.field_lineups = {}
+            sim.seen_lineups = {}
+            sim.seen_lineups_ix = {}
+            sim.payout_structure = {}
+            # the contest file's field size unless the contest sets its own
+            sim.field_size = contest.get("field_size")
+            if sim.field_size is not None:
+                sim.field_size = int(sim.field_size)
+            sim.entry_fee = None
+            sim.use_contest_data = True
+            contest_path = os.path.join(
+                os.path.dirname(__file__),
+                "../{}_data/{}".format(self.site, contest["contest_structure_path"]),
+            )
+            sim.load_contest_data(contest_path)
+            sim.use_lineup_input = "lineup_path" in contest
+            if sim.use_lineup_input:
+                sim.lineup_path = contest["lineup_path"]
+                sim.load_lineups_from_file()
+            print(
+                "Contest {} loaded: {} entries, ${} entry fee".format(
+                    sim.contest_name, sim.field_size, sim.entry_fee
+                )
+            )
+            contests.append(sim)
+        if len(contests) == 0:
+            print("no contests in config.json")
+        return contests
+
     def load_correlation_rules(self):
         if len(self.correlation_rules.keys()) > 0:
             for primary_player in self.correlation_rules.keys():
@@ -608,6 +948,26 @@ class NBA_GPP_Simulator:
             self.config = json.load(json_file)
 
     # Load projections from file
+    def load_boom_bust(self, path):
+        # floors and ceilings for the empirical outcome distribution; players without
+        # one keep their projected ceiling and a floor mirrored below their projection
+        if not os.path.isfile(path):
+            print("boom/bust file not found, using projected ceilings")
+            return
+        players_by_name = collections.defaultdict(list)
+        for (player_name, pos_str, team), player in self.player_dict.items():
+            players_by_name[player_name].append(player)
+        with open(path, encoding="utf-8-sig") as file:
+            reader = csv.DictReader(self.lower_first(file))
+            for row in reader:
+                player_name = row["name"].replace("-", "#").lower().strip()
+                ceiling = row.get("ceiling") or row.get("ceil")
+                for player in players_by_name.get(player_name, []):
+                    if row.get("floor"):
+                        player["Floor"] = float(row["floor"])
+                    if ceiling:
+                        player["Ceiling"] = float(ceiling)
+
     def load_projections(self, path):
         # Read projections into a dictionary
         with open(path, encoding="utf-8-sig") as file:
@@ -777,7 +1137,7 @@ class NBA_GPP_Simulator:
         i = 0
         path = os.path.join(
             os.path.dirname(__file__),
-            "../{}_data/{}".format(self.site, "tournament_lineups.csv"),
+            "../{}_data/{}".format(self.site, self.lineup_path),
         )
         with open(path) as file:
             reader = pd.read_csv(file)
@@ -795,8 +1155,7 @@ class NBA_GPP_Simulator:
                 # storing if this lineup was made by an optimizer or with the generation process in this script
                 error = False
                 for l in lineup:
-                    ids = [self.player_dict[k]["ID"] for k in self.player_dict]
-                    if l not in ids:
+                    if l not in self.id_to_index:
                         print(
                             "player id {} in lineup {} not found in player dict".format(
                                 l, i
@@ -809,15 +1168,17 @@ class NBA_GPP_Simulator:
                 if len(lineup) < len(self.roster_construction):
                     print("lineup {} doesn't match roster construction size".format(i))
                     continue
-                # storing if this lineup was made by an optimizer or with the generation process in this script
-                error = False
                 if not error:
-                    lineup_list = sorted(lineup)
-                    lineup_set = frozenset(lineup_list)
+                    lineup = np.array(
+                        [self.id_to_index[l] for l in lineup], dtype=np.int16
+                    )
+                    rows, hashes = hash_lineups(lineup[np.newaxis, :])
+                    lineup_key = self.get_lineup_key(hashes[0], rows[0])
 
                     # Keeping track of lineup duplication counts
-                    if lineup_set in self.seen_lineups:
-                        self.seen_lineups[lineup_set] += 1
+                    if lineup_key in self.seen_lineups:
+                        self.seen_lineups[lineup_key] += 1
+                        self.field_lineups[self.seen_lineups_ix[lineup_key]]["Count"] += 1
                     else:
                         self.field_lineups[j] = {
                             "Lineup": lineup,
@@ -830,271 +1191,42 @@ class NBA_GPP_Simulator:
                         }
 
                         # Add to seen_lineups and seen_lineups_ix
-                        self.seen_lineups[lineup_set] = 1
-                        self.seen_lineups_ix[lineup_set] = j
+                        self.seen_lineups[lineup_key] = 1
+                        self.seen_lineups_ix[lineup_key] = j
 
                         j += 1
         print("loaded {} lineups".format(j))
         # print(self.field_lineups)
 
     @staticmethod
-    def generate_lineups(
-        lu_num,
-        ids,
-        in_lineup,
-        pos_matrix,
-        ownership,
-        salary_floor,
-        salary_ceiling,
-        optimal_score,
-        salaries,
-        projections,
-        max_pct_off_optimal,
-        teams,
-        opponents,
-        overlap_limit,
-        matchups,
-        num_players_in_roster,
-        site,
-    ):
-        # new random seed for each lineup (without this there is a ton of dupes)
-        rng = np.random.Generator(np.random.PCG64())
-        lus = {}
-        # make sure nobody is already showing up in a lineup
-        if sum(in_lineup) != 0:
-            in_lineup.fill(0)
-        reject = True
-        iteration_count = 0
-        total_players = num_players_in_roster
-        issue = ""
-        complete = ""
-        reasonable_projection = optimal_score - (max_pct_off_optimal * optimal_score)
-        max_players_per_team = 4 if site == "fd" else None
-        while reject:
-            iteration_count += 1
-            salary = 0
-            proj = 0
-            if sum(in_lineup) != 0:
-                in_lineup.fill(0)
-            lineup = []
-            player_teams = []
-            def_opps = []
-            players_opposing_def = 0
-            lineup_matchups = []
-            k = 0
-            for pos in pos_matrix.T:
-                if k < 1:
-                    # check for players eligible for the position and make sure they arent in a lineup, returns a list of indices of available player
-                    valid_players = np.nonzero((pos > 0) & (in_lineup == 0))[0]
-                    # grab names of players eligible
-                    plyr_list = ids[valid_players]
-                    # create np array of probability of being seelcted based on ownership and who is eligible at the position
-                    prob_list = ownership[valid_players]
-                    prob_list = prob_list / prob_list.sum()
-                    try:
-                        choice = rng.choice(plyr_list, p=prob_list)
-                    except:
-                        print(plyr_list, prob_list)
-                        print("find failed on nonstack and first player selection")
-                    choice_idx = np.nonzero(ids == choice)[0]
-                    lineup.append(str(choice))
-                    in_lineup[choice_idx] = 1
-                    salary += salaries[choice_idx]
-                    proj += projections[choice_idx]
-                    lineup_matchups.append(matchups[choice_idx[0]])
-                    player_teams.append(teams[choice_idx][0])
-                if k >= 1:
-                    remaining_salary = salary_ceiling - salary
-                    if players_opposing_def < overlap_limit:
-                        if k == total_players - 1:
-                            valid_players = np.nonzero(
-                                (pos > 0)
-                                & (in_lineup == 0)
-                                & (salaries <= remaining_salary)
-                                & (salary + salaries >= salary_floor)
-                            )[0]
-                        else:
-                            valid_players = np.nonzero(
-                                (pos > 0)
-                                & (in_lineup == 0)
-                                & (salaries <= remaining_salary)
-                            )[0]
-                        # grab names of players eligible
-                        plyr_list = ids[valid_players]
-                        # create np array of probability of being seelcted based on ownership and who is eligible at the position
-                        prob_list = ownership[valid_players]
-                        prob_list = prob_list / prob_list.sum()
-                        if k == total_players - 1:
-                            boosted_salaries = np.array(
-                                [
-                                    salary_boost(s, salary_ceiling)
-                                    for s in salaries[valid_players]
-                                ]
-                            )
-                            boosted_probabilities = prob_list * boosted_salaries
-                            boosted_probabilities /= (
-                                boosted_probabilities.sum()
-                            )  # normalize to ensure it sums to 1
-                        try:
-                            if k == total_players - 1:
-                                choice = rng.choice(plyr_list, p=boosted_probabilities)
-                            else:
-                                choice = rng.choice(plyr_list, p=prob_list)
-                        except:
-                            # if remaining_salary <= np.min(salaries):
-                            #     reject_counters["salary_too_high"] += 1
-                            # else:
-                            #     reject_counters["salary_too_low"]
-                            salary = 0
-                            proj = 0
-                            lineup = []
-                            player_teams = []
-                            def_opps = []
-                            players_opposing_def = 0
-                            lineup_matchups = []
-                            in_lineup.fill(0)  # Reset the in_lineup array
-                            k = 0  # Reset the player index
-                            continue  # Skip to the next iteration of the while loop
-                        choice_idx = np.nonzero(ids == choice)[0]
-                        lineup.append(str(choice))
-                        in_lineup[choice_idx] = 1
-                        salary += salaries[choice_idx]
-                        proj += projections[choice_idx]
-                        player_teams.append(teams[choice_idx][0])
-                        lineup_matchups.append(matchups[choice_idx[0]])
-                        if max_players_per_team is not None:
-                            team_count = Counter(player_teams)
-                            if any(
-                                count > max_players_per_team
-                                for count in team_count.values()
-                            ):
-                                salary = 0
-                                proj = 0
-                                lineup = []
-                                player_teams = []
-                                def_opps = []
-                                players_opposing_def = 0
-                                lineup_matchups = []
-                                in_lineup.fill(0)  # Reset the in_lineup array
-                                k = 0  # Reset the player index
-                                continue  # Skip to the next iteration of the while loop
-                    else:
-                        if k == total_players - 1:
-                            valid_players = np.nonzero(
-                                (pos > 0)
-                                & (in_lineup == 0)
-                                & (salaries <= remaining_salary)
-                                & (salary + salaries >= salary_floor)
-                            )[0]
-                        else:
-                            valid_players = np.nonzero(
-                                (pos > 0)
-                                & (in_lineup == 0)
-                                & (salaries <= remaining_salary)
-                            )[0]
-                        # grab names of players eligible
-                        plyr_list = ids[valid_players]
-                        # create np array of probability of being seelcted based on ownership and who is eligible at the position
-                        prob_list = ownership[valid_players]
-                        prob_list = prob_list / prob_list.sum()
-                        if k == total_players - 1:
-                            boosted_salaries = np.array(
-                                [
-                                    salary_boost(s, salary_ceiling)
-                                    for s in salaries[valid_players]
-                                ]
-                            )
-                            boosted_probabilities = prob_list * boosted_salaries
-                            boosted_probabilities /= (
-                                boosted_probabilities.sum()
-                            )  # normalize to ensure it sums to 1
-                        try:
-                            if k == total_players - 1:
-                                choice = rng.choice(plyr_list, p=boosted_probabilities)
-                            else:
-                                choice = rng.choice(plyr_list, p=prob_list)
-                        except:
-                            salary = 0
-                            proj = 0
-                            lineup = []
-                            player_teams = []
-                            def_opps = []
-                            players_opposing_def = 0
-                            lineup_matchups = []
-                            in_lineup.fill(0)  # Reset the in_lineup array
-                            k = 0  # Reset the player index
-                            continue  # Skip to the next iteration of the while loop
-                            # if remaining_salary <= np.min(salaries):
-                            #     reject_counters["salary_too_high"] += 1
-                            # else:
-                            #     reject_counters["salary_too_low"]
-                        choice_idx = np.nonzero(ids == choice)[0]
-                        lineup.append(str(choice))
-                        in_lineup[choice_idx] = 1
-                        salary += salaries[choice_idx]
-                        proj += projections[choice_idx]
-                        player_teams.append(teams[choice_idx][0])
-                        lineup_matchups.append(matchups[choice_idx[0]])
-                        if max_players_per_team is not None:
-                            team_count = Counter(player_teams)
-                            if any(
-                                count > max_players_per_team
-                                for count in team_count.values()
-                            ):
-                                salary = 0
-                                proj = 0
-                                lineup = []
-                                player_teams = []
-                                def_opps = []
-                                players_opposing_def = 0
-                                lineup_matchups = []
-                                in_lineup.fill(0)  # Reset the in_lineup array
-                                k = 0  # Reset the player index
-                                continue  # Skip to the next iteration of the while loop
-                k += 1
-            # Must have a reasonable salary
-            # if salary > salary_ceiling:
-            #     reject_counters["salary_too_high"] += 1
-            # elif salary < salary_floor:
-            #     reject_counters["salary_too_low"] += 1
-            if salary >= salary_floor and salary <= salary_ceiling:
-                # Must have a reasonable projection (within 60% of optimal) **people make a lot of bad lineups
-                if proj >= reasonable_projection:
-                    if len(set(lineup_matchups)) > 1:
-                        if max_players_per_team is not None:
-                            team_count = Counter(player_teams)
-                            if all(
-                                count <= max_players_per_team
-                                for count in team_count.values()
-                            ):
-                                reject = False
-                                lus[lu_num] = {
-                                    "Lineup": lineup,
-                                    "Wins": 0,
-                                    "Top1Percent": 0,
-                                    "ROI": 0,
-                                    "Cashes": 0,
-                                    "Type": "generated",
-                                    "Count": 0,
-                                }
-                        else:
-                            reject = False
-                            lus[lu_num] = {
-                                "Lineup": lineup,
-                                "Wins": 0,
-                                "Top1Percent": 0,
-                                "ROI": 0,
-                                "Cashes": 0,
-                                "Type": "generated",
-                                "Count": 0,
-                            }
-                        # complete = 'completed'
-                        # print(str(lu_num) + ' ' + complete)
-                #     else:
-                #         reject_counters["invalid_matchups"] += 1
-                # else:
-                #     reject_counters["projection_too_low"] += 1
-        return lus
+    def generate_lineups(start, num_lineups, seed):
+        # work unit for a pool worker; the slate itself comes from init_field_slate
+        slate = field_slate
+        lineups, reject_counts, projection_floor = sample_lineups(
+            num_lineups,
+            seed,
+            slate["slot_players"],
+            slate["slot_counts"],
+            slate["slot_salaries"],
+            slate["slot_cum"],
+            slate["slot_cum_boosted"],
+            slate["slot_ranks"],
+            slate["salaries"],
+            slate["projections"],
+            slate["teams"],
+            slate["matchups"],
+            slate["num_players_in_roster"],
+            slate["salary_floor"],
+            slate["salary_ceiling"],
+            slate["min_salary_after"],
+            slate["max_salary_after"],
+            slate["reasonable_projection"],
+            slate["max_players_per_team"],
+            slate["min_acceptance_rate"],
+            slate["adapt_window"],
+            slate["projection_backoff"],
+        )
+        return start, lineups, reject_counts, projection_floor
 
     def generate_field_lineups(self):
         diff = self.field_size - len(self.field_lineups)
@@ -1106,22 +1238,19 @@ class NBA_GPP_Simulator:
             )
         else:
             print("Generating " + str(diff) + " lineups.")
-            ids = []
             ownership = []
             salaries = []
             projections = []
-            positions = []
+            pos_masks = []
             teams = []
-            opponents = []
             matchups = []
-            # put def first to make it easier to avoid overlap
-            for k in self.player_dict.keys():
+            # arrays are in player index order, so sampled rows are player indices
+            for k in self.player_keys:
                 if "Team" not in self.player_dict[k].keys():
                     print(
                         self.player_dict[k]["Name"],
                         " name mismatch between projections and player ids!",
                     )
-                ids.append(self.player_dict[k]["UniqueKey"])
                 ownership.append(self.player_dict[k]["Ownership"])
                 salaries.append(self.player_dict[k]["Salary"])
                 if self.player_dict[k]["fieldFpts"] >= self.projection_minimum:
@@ -1129,121 +1258,251 @@ class NBA_GPP_Simulator:
                 else:
                     projections.append(0)
                 teams.append(self.player_dict[k]["Team"])
-                opponents.append(self.player_dict[k]["Opp"])
                 matchups.append(self.player_dict[k]["Matchup"])
-                pos_list = []
-                for pos in self.roster_construction:
+                # bit k is set when the player is eligible for roster slot k
+                pos_mask = 0
+                for i, pos in enumerate(self.roster_construction):
                     if pos in self.player_dict[k]["Position"]:
-                        pos_list.append(1)
-                    else:
-                        pos_list.append(0)
-                positions.append(np.array(pos_list))
-            in_lineup = np.zeros(shape=len(ids))
-            ownership = np.array(ownership)
-            salaries = np.array(salaries)
-            projections = np.array(projections)
-            pos_matrix = np.array(positions)
-            ids = np.array(ids)
-            optimal_score = self.optimal_score
-            salary_floor = self.min_lineup_salary
-            salary_ceiling = self.salary
-            max_pct_off_optimal = self.max_pct_off_optimal
-            teams = np.array(teams)
-            opponents = np.array(opponents)
-            overlap_limit = self.overlap_limit
-            problems = []
-            num_players_in_roster = len(self.roster_construction)
-            # creating tuples of the above np arrays plus which lineup number we are going to create
-            for i in range(diff):
-                lu_tuple = (
-                    i,
-                    ids,
-                    in_lineup,
-                    pos_matrix,
-                    ownership,
-                    salary_floor,
-                    salary_ceiling,
-                    optimal_score,
-                    salaries,
-                    projections,
-                    max_pct_off_optimal,
-                    teams,
-                    opponents,
-                    overlap_limit,
-                    matchups,
-                    num_players_in_roster,
-                    self.site,
+                        pos_mask |= 1 << i
+                pos_masks.append(pos_mask)
+            ownership = np.array(ownership, dtype=np.float64)
+            salaries = np.array(salaries, dtype=np.int64)
+            projections = np.array(projections, dtype=np.float64)
+            pos_masks = np.array(pos_masks, dtype=np.int64)
+            # the sampler only needs to know which players share a team / game
+            teams = np.unique(np.array(teams), return_inverse=True)[1].astype(np.int64)
+            matchup_index = {m: i for i, m in enumerate(sorted(set(matchups)))}
+            matchups = np.array([matchup_index[m] for m in matchups], dtype=np.int64)
+            min_salary_after, max_salary_after = self.get_salary_bounds(
+                pos_masks, salaries
+            )
+            slate = {
+                **self.get_slot_tables(pos_masks, ownership, salaries),
+                "salaries": salaries,
+                "projections": projections,
+                "teams": teams,
+                "matchups": matchups,
+                "num_players_in_roster": len(self.roster_construction),
+                "salary_floor": self.min_lineup_salary,
+                "salary_ceiling": self.salary,
+                "min_salary_after": min_salary_after,
+                "max_salary_after": max_salary_after,
+                "reasonable_projection": self.optimal_score
+                - (self.max_pct_off_optimal * self.optimal_score),
+                "max_players_per_team": 4 if self.site == "fd" else 0,
+                "min_acceptance_rate": self.min_acceptance_rate,
+                "adapt_window": self.adapt_window,
+                "projection_backoff": self.projection_backoff,
+            }
+            # a field generated from the same slate and settings is reused from output/
+            cache_path = os.path.join(
+                os.path.dirname(__file__),
+                "../output/{}_gpp_field_cache_{}.npz".format(
+                    self.site, self.get_field_fingerprint(slate)
+                ),
+            )
+            lineups = self.load_field_cache(cache_path)
+            if len(lineups) > diff:
+                lineups = lineups[self.rng.permutation(len(lineups))[:diff]]
+            missing = diff - len(lineups)
+            if len(lineups) > 0:
+                print("reusing {} cached field lineups".format(len(lineups)))
+            if missing > 0:
+                start_time = time.time()
+                generated, reject_counts, projection_floor = self.sample_field(
+                    slate, missing, offset=len(lineups)
                 )
-                problems.append(lu_tuple)
-            # print(problems[0])
-            start_time = time.time()
-            with mp.Pool() as pool:
-                output = pool.starmap(self.generate_lineups, problems)
+                end_time = time.time()
+                print("lineups took " + str(end_time - start_time) + " seconds")
+                self.report_field_rejections(missing, reject_counts, projection_floor)
                 print(
-                    "number of running processes =",
-                    (
-                        pool.__dict__["_processes"]
-                        if (pool.__dict__["_state"]).upper() == "RUN"
-                        else None
-                    ),
+                    "{} field lineups successfully generated ({} lineups/sec)".format(
+                        missing, round(missing / max(end_time - start_time, 1e-9))
+                    )
                 )
-                pool.close()
-                pool.join()
-            print("pool closed")
-            self.update_field_lineups(output, diff)
-            end_time = time.time()
-            print("lineups took " + str(end_time - start_time) + " seconds")
-            print(str(diff) + " field lineups successfully generated")
-            # print("Reject counters:", dict(overall_reject_counters))
-
-            # print(self.field_lineups)
-
-    def get_start_time(self, player_id):
-        for _, player in self.player_dict.items():
-            if player["ID"] == player_id:
-                matchup = player["Matchup"]
-                return self.game_info[matchup]
-        return None
-
-    def get_player_attribute(self, player_id, attribute):
-        for _, player in self.player_dict.items():
-            if player["ID"] == player_id:
-                return player.get(attribute, None)
-        return None
-
-    def is_valid_for_position(self, player, position_idx):
-        return any(
-            pos in self.position_map[position_idx]
-            for pos in self.get_player_attribute(player, "Position")
+                lineups = np.concatenate([lineups, generated])
+                self.save_field_cache(cache_path, lineups)
+            self.update_field_lineups(lineups, diff)
+
+    def sample_field(self, slate, num_lineups, offset=0):
+        # workers only receive (start, count, seed); the slate is sent once per worker.
+        # Each chunk's seed is keyed by where it starts in the field, after the offset
+        # lineups (e.g. cached ones) already in it, so topping up a cached field never
+        # redraws the lineups it was built from
+        chunk_size = max(1, min(self.field_chunk_size, num_lineups))
+        starts = range(0, num_lineups, chunk_size)
+        seeds = [
+            np.random.SeedSequence(
+                self.field_seed_sequence.entropy,
+                spawn_key=self.field_seed_sequence.spawn_key + (offset + start,),
+            )
+            for start in starts
+        ]
+        problems = [
+            (
+                start,
+                min(chunk_size, num_lineups - start),
+                int(seed.generate_state(1)[0]),
+            )
+            for start, seed in zip(starts, seeds)
+        ]
+        with mp.Pool(initializer=init_field_slate, initargs=(slate,)) as pool:
+            output = pool.starmap(self.generate_lineups, problems)
+            print(
+                "number of running processes =",
+                (
+                    pool.__dict__["_processes"]
+                    if (pool.__dict__["_state"]).upper() == "RUN"
+                    else None
+                ),
+            )
+            pool.close()
+            pool.join()
+        print("pool closed")
+        output.sort(key=lambda o: o[0])
+        lineups = np.concatenate([o[1] for o in output])
+        reject_counts = np.sum([o[2] for o in output], axis=0)
+        projection_floor = min(o[3] for o in output)
+        return lineups, reject_counts, projection_floor
+
+    def get_field_fingerprint(self, slate):
+        # changes to projections, ownership, player IDs or the field settings change the
+        # fingerprint, changes to the contest structure or our own lineups don't. A seeded
+        # run gets a cache of its own, so the seed decides the draws that built the field
+        # and not just which cached lineups are used
+        fingerprint = hashlib.sha1()
+        fingerprint.update(
+            json.dumps(
+                [
+                    self.site,
+                    self.roster_construction,
+                    self.player_ids.tolist(),
+                    self.max_pct_off_optimal,
+                    self.min_lineup_salary,
+                    self.projection_minimum,
+                ]
+                + ([] if self.seed is None else [self.seed])
+            ).encode()
         )
+        for key in sorted(slate):
+            fingerprint.update(key.encode())
+            fingerprint.update(np.asarray(slate[key]).tobytes())
+        return fingerprint.hexdigest()[:16]
+
+    def load_field_cache(self, path):
+        if not os.path.exists(path):
+            return np.empty((0, len(self.roster_construction)), dtype=np.int16)
+        with np.load(path) as cache:
+            return np.repeat(cache["lineups"], cache["counts"], axis=0)
+
+    def save_field_cache(self, path, lineups):
+        # distinct lineups (in roster slot order) plus how many times each was generated
+        _, _, first, counts = dedupe_lineups(lineups)
+        tmp_path = "{}.{}.tmp".format(path, os.urandom(8).hex())
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, lineups=lineups[first], counts=counts)
+        os.replace(tmp_path, path)
+
+    def report_field_rejections(self, accepted, reject_counts, projection_floor):
+        self.field_rejections = {
+            reason: int(count) for reason, count in zip(REJECT_REASONS, reject_counts)
+        }
+        rejected = sum(self.field_rejections.values())
+        attempts = accepted + rejected
+        print(
+            "rejected {} of {} sampled lineups ({}%)".format(
+                rejected, attempts, round(rejected / attempts * 100, 2)
+            )
+        )
+        for reason, count in self.field_rejections.items():
+            if count > 0:
+                print("    {}: {}".format(reason, count))
+        if self.min_acceptance_rate > 0:
+            print("projection floor relaxed to {}".format(round(projection_floor, 2)))
+
+        # written when the field is built, before an adaptive run knows how many
+        # iterations it will take
+        out_path = self.get_output_path("field_rejections", iterations=False)
+        with open(out_path, "w") as f:
+            f.write("Reason,Count,Pct. of Attempts\n")
+            f.write(
+                "accepted,{},{}%\n".format(
+                    accepted, round(accepted / attempts * 100, 2)
+                )
+            )
+            for reason, count in self.field_rejections.items():
+                f.write(
+                    "{},{},{}%\n".format(reason, count, round(count / attempts * 100, 2))
+                )
 
-    def sort_lineup_by_start_time(self, lineup):
-        # Iterate over the entire roster construction
-        for i, position in enumerate(
-            self.roster_construction
-        ):  # ['PG','SG','SF','PF','C','G','F','UTIL']
-            # Only check G, F, and UTIL positions
-            if position in ["G", "F", "UTIL"]:
-                current_player = lineup[i]
-                current_player_start_time = self.get_start_time(current_player)
-
-                # Look for a swap candidate among primary positions
-                for primary_i, primary_pos in enumerate(
-                    self.roster_construction[:5]
-                ):  # Only the primary positions (0 to 4)
-                    primary_player = lineup[primary_i]
-                    primary_player_start_time = self.get_start_time(primary_player)
-
-                    # Check the conditions for the swap
-                    if (
-                        primary_player_start_time > current_player_start_time
-                        and self.is_valid_for_position(primary_player, i)
-                        and self.is_valid_for_position(current_player, primary_i)
-                    ):
-                        # Perform the swap
-                        lineup[i], lineup[primary_i] = lineup[primary_i], lineup[i]
-                        break  # Break out of the inner loop once a swap is made
-        return lineup
+    def get_slot_tables(self, pos_masks, ownership, salaries):
+        # per roster slot: the eligible players sorted by salary, their salaries, prefix sums
+        # of their ownership (plain and salary_boost weighted for the last slot) and each
+        # player's rank in the slot's list (-1 if ineligible), padded to the slate size
+        num_slots = len(self.roster_construction)
+        num_players = len(salaries)
+        boosted = ownership * salary_boost(salaries, self.salary)
+        slot_players = np.zeros((num_slots, num_players), dtype=np.int64)
+        slot_counts = np.zeros(num_slots, dtype=np.int64)
+        slot_salaries = np.zeros((num_slots, num_players), dtype=np.int64)
+        slot_cum = np.zeros((num_slots, num_players + 1), dtype=np.float64)
+        slot_cum_boosted = np.zeros((num_slots, num_players + 1), dtype=np.float64)
+        slot_ranks = np.full((num_slots, num_players), -1, dtype=np.int64)
+        for k in range(num_slots):
+            eligible = np.nonzero(pos_masks & (1 << k))[0]
+            eligible = eligible[np.argsort(salaries[eligible], kind="stable")]
+            n = len(eligible)
+            slot_players[k, :n] = eligible
+            slot_counts[k] = n
+            slot_salaries[k, :n] = salaries[eligible]
+            slot_cum[k, 1 : n + 1] = np.cumsum(ownership[eligible])
+            slot_cum_boosted[k, 1 : n + 1] = np.cumsum(boosted[eligible])
+            slot_ranks[k, eligible] = np.arange(n)
+        return {
+            "slot_players": slot_players,
+            "slot_counts": slot_counts,
+            "slot_salaries": slot_salaries,
+            "slot_cum": slot_cum,
+            "slot_cum_boosted": slot_cum_boosted,
+            "slot_ranks": slot_ranks,
+        }
+
+    def get_salary_bounds(self, pos_masks, salaries):
+        # min_salary_after[k] / max_salary_after[k] are the least / most that roster slots
+        # k.. can still add, using the cheapest / priciest eligible player for each slot
+        num_slots = len(self.roster_construction)
+        min_salary_after = np.zeros(num_slots + 1, dtype=np.int64)
+        max_salary_after = np.zeros(num_slots + 1, dtype=np.int64)
+        for k in range(num_slots - 1, -1, -1):
+            eligible = salaries[(pos_masks & (1 << k)) > 0]
+            if len(eligible) == 0:
+                continue
+            min_salary_after[k] = min_salary_after[k + 1] + eligible.min()
+            max_salary_after[k] = max_salary_after[k + 1] + eligible.max()
+        return min_salary_after, max_salary_after
+
+    def sort_lineups_by_start_time(self, lineups):
+        # Late-swap friendly ordering for a whole (lineups x roster slots) batch: a G, F or
+        # UTIL player swaps with the first primary-position player that starts later, as long
+        # as each of them can play the other's slot
+        start_times = self.player_start_times
+        slot_masks = self.player_slot_masks
+        for i, position in enumerate(self.roster_construction):
+            if position not in ["G", "F", "UTIL"]:
+                continue
+            pending = np.ones(len(lineups), dtype=bool)
+            for primary_i in range(5):
+                current = lineups[:, i]
+                primary = lineups[:, primary_i]
+                swap = (
+                    pending
+                    & (start_times[primary] > start_times[current])
+                    & ((slot_masks[primary] >> i) & 1 == 1)
+                    & ((slot_masks[current] >> primary_i) & 1 == 1)
+                )
+                lineups[swap, i], lineups[swap, primary_i] = primary[swap], current[swap]
+                pending &= ~swap
+        return lineups
 
     def update_field_lineups(self, output, diff):
         if len(self.field_lineups) == 0:
@@ -1256,309 +1515,658 @@ class NBA_GPP_Simulator:
                 )
             )
 
+        lineups = np.array(output, dtype=np.int16).reshape(
+            -1, len(self.roster_construction)
+        )
+        rows, hashes, first, counts = dedupe_lineups(lineups)
+        if self.site == "dk":
+            lineups = self.sort_lineups_by_start_time(lineups)
+
         nk = new_keys[0]
-        for i, o in enumerate(output):
-            lineup_list = sorted(next(iter(o.values()))["Lineup"])
-            lineup_set = frozenset(lineup_list)
+        # distinct lineups in the order they were generated
+        for i in np.argsort(first):
+            lineup = lineups[first[i]]
+            lineup_key = self.get_lineup_key(hashes[first[i]], rows[first[i]])
+            count = int(counts[i])
 
             # Keeping track of lineup duplication counts
-            if lineup_set in self.seen_lineups:
-                self.seen_lineups[lineup_set] += 1
+            if lineup_key in self.seen_lineups:
+                self.seen_lineups[lineup_key] += count
 
                 # Increase the count in field_lineups using the index stored in seen_lineups_ix
-                self.field_lineups[self.seen_lineups_ix[lineup_set]]["Count"] += 1
+                self.field_lineups[self.seen_lineups_ix[lineup_key]]["Count"] += count
             else:
-                self.seen_lineups[lineup_set] = 1
+                self.seen_lineups[lineup_key] = count
 
                 # Updating the field lineups dictionary
                 if nk in self.field_lineups.keys():
                     print("bad lineups dict, please check dk_data files")
                 else:
-                    if self.site == "dk":
-                        sorted_lineup = self.sort_lineup_by_start_time(
-                            next(iter(o.values()))["Lineup"]
-                        )
-                    else:
-                        sorted_lineup = next(iter(o.values()))["Lineup"]
-
-                    self.field_lineups[nk] = next(iter(o.values()))
-                    self.field_lineups[nk]["Lineup"] = sorted_lineup
-                    self.field_lineups[nk]["Count"] += self.seen_lineups[lineup_set]
+                    self.field_lineups[nk] = {
+                        "Lineup": lineup,
+                        "Wins": 0,
+                        "Top1Percent": 0,
+                        "ROI": 0,
+                        "Cashes": 0,
+                        "Type": "generated",
+                        "Count": self.seen_lineups[lineup_key],
+                    }
                     # Store the new nk in seen_lineups_ix for quick access in the future
-                    self.seen_lineups_ix[lineup_set] = nk
+                    self.seen_lineups_ix[lineup_key] = nk
                     nk += 1
 
-    def calc_gamma(self, mean, sd):
-        alpha = (mean / sd) ** 2
-        beta = sd**2 / mean
-        return alpha, beta
-
-    @staticmethod
-    def run_simulation_for_game(
-        team1_id,
-        team1,
-        team2_id,
-        team2,
-        num_iterations,
-        roster_construction,
-    ):
-        # Define correlations between positions
-
-        def get_corr_value(player1, player2):
-            # First, check for specific player-to-player correlations
-            if player2["Name"] in player1.get("Player Correlations", {}):
-                return player1["Player Correlations"][player2["Name"]]
-
-            # If no specific correlation is found, proceed with the general logic
-            position_correlations = {
-                "PG": -0.1324,
-                "SG": -0.1324,
-                "SF": -0.0812,
-                "PF": -0.0812,
-                "C": -0.1231,
-            }
-
-            if (
-                player1["Team"] == player2["Team"]
-                and player1["Position"][0] == player2["Position"][0]
-            ):
-                primary_position = player1["Position"][0]
-                return position_correlations[primary_position]
-
-            if player1["Team"] != player2["Team"]:
-                player_2_pos = "Opp " + str(player2["Position"][0])
-            else:
-                player_2_pos = player2["Position"][0]
-
-            return player1["Correlations"].get(
-                player_2_pos, 0
-            )  # Default to 0 if no correlation is found
-
-        def build_covariance_matrix(players):
-            N = len(players)
-            matrix = [[0 for _ in range(N)] for _ in range(N)]
-            corr_matrix = [[0 for _ in range(N)] for _ in range(N)]
-
-            for i in range(N):
-                for j in range(N):
-                    if i == j:
-                        matrix[i][j] = (
-                            players[i]["StdDev"] ** 2
-                        )  # Variance on the diagonal
-                        corr_matrix[i][j] = 1
-                    else:
-                        matrix[i][j] = (
-                            get_corr_value(players[i], players[j])
-                            * players[i]["StdDev"]
-                            * players[j]["StdDev"]
-                        )
-                        corr_matrix[i][j] = get_corr_value(players[i], players[j])
-            return matrix, corr_matrix
-
-        def ensure_positive_semidefinite(matrix):
-            eigs = np.linalg.eigvals(matrix)
-            if np.any(eigs < 0):
-                jitter = abs(min(eigs)) + 1e-6  # a small value
-                matrix += np.eye(len(matrix)) * jitter
-            return matrix
-
-        game = team1 + team2
-        covariance_matrix, corr_matrix = build_covariance_matrix(game)
-        # print(team1_id, team2_id)
-        # print(corr_matrix)
-        corr_matrix = np.array(corr_matrix)
-
-        # Given eigenvalues and eigenvectors from previous code
-        eigenvalues, eigenvectors = np.linalg.eigh(covariance_matrix)
-
-        # Set negative eigenvalues to zero
-        eigenvalues[eigenvalues < 0] = 0
-
-        # Reconstruct the matrix
-        covariance_matrix = eigenvectors.dot(np.diag(eigenvalues)).dot(eigenvectors.T)
-
-        try:
-            samples = multivariate_normal.rvs(
-                mean=[player["Fpts"] for player in game],
-                cov=covariance_matrix,
-                size=num_iterations,
+    def get_lineup_key(self, lineup_hash, sorted_lineup):
+        # seen_lineups is keyed by lineup hash; if the hash already belongs to a different
+        # lineup, probe the following keys until we find this lineup or a free one
+        key = int(lineup_hash)
+        while key in self.seen_lineups_ix and not np.array_equal(
+            np.sort(self.field_lineups[self.seen_lineups_ix[key]]["Lineup"]),
+            sorted_lineup,
+        ):
+            key = (key + 1) % 2**64
+        return key
+
+    def get_game_factor(self, game):
+        # covariance factor for the game's players, cached in output/ keyed by the
+        # players and their covariances so re-running the slate skips the decomposition
+        corr_matrix = build_correlation_matrix(
+            game, SAME_POSITION_CORRELATIONS, same_position_only=True
+        )
+        stddevs = np.array([player["StdDev"] for player in game], dtype=float)
+        covariance_matrix = corr_matrix * np.outer(stddevs, stddevs)
+        key = hashlib.sha1(
+            json.dumps([player["ID"] for player in game]).encode()
+            + covariance_matrix.tobytes()
+        ).hexdigest()[:16]
+        path = os.path.join(
+            os.path.dirname(__file__),
+            "../output/{}_gpp_sim_game_factor_{}.npy".format(self.site, key),
+        )
+        # negative eigenvalues are clipped
+        return load_covariance_factor(path, covariance_matrix, jitter=False)
+
+    def get_slate_factor(self):
+        # block diagonal covariance factor for the whole slate: each game's factor fills
+        # its players' rows (in player index order) and a block of columns of its own
+        means = np.zeros(len(self.player_keys))
+        game_blocks = []
+        for team1, team2 in sorted(self.matchups):
+            game = self.teams_dict[team1] + self.teams_dict[team2]
+            rows = np.array([self.id_to_index.get(p["ID"], -1) for p in game])
+            game_fpts = np.array([p["Fpts"] for p in game], dtype=float)
+            means[rows[rows >= 0]] = game_fpts[rows >= 0]
+            game_blocks.append((rows, self.get_game_factor(game)))
+
+        num_columns = sum(len(rows) for rows, _ in game_blocks)
+        factor = np.zeros((len(self.player_keys), num_columns), dtype=np.float32)
+        column = 0
+        for rows, game_factor in game_blocks:
+            factor[rows[rows >= 0], column : column + len(rows)] = game_factor[rows >= 0]
+            column += len(rows)
+        return means.astype(np.float32), factor
+
+    def get_outcome_fingerprint(self, means, factor, marginals):
+        # outcomes depend on the players, their means, covariances and distributions, the
+        # sampling and the seed. An unseeded run's fresh entropy stands in for the seed,
+        # so it never picks up another run's outcomes
+        fingerprint = hashlib.sha1(
+            json.dumps(
+                [
+                    self.site,
+                    self.player_ids.tolist(),
+                    self.seed_sequence.entropy,
+                    self.outcome_chunk_size,
+                    self.outcome_distribution,
+                    self.sampling,
+                ]
+                # each shard simulates its own iterations
+                + ([] if self.shard is None else [list(self.shard)])
+            ).encode()
+            + means.tobytes()
+            + factor.tobytes()
+        )
+        if marginals is not None:
+            fingerprint.update(marginals["tables"].tobytes())
+        return fingerprint.hexdigest()[:16]
+
+    def load_player_outcomes(self, path):
+        # read-only memory map of a stored (players x iterations) outcome matrix, or None
+        # if there isn't one with at least num_iterations iterations for these players
+        sidecar_path = os.path.splitext(path)[0] + ".json"
+        if not os.path.exists(path) or not os.path.exists(sidecar_path):
+            return None
+        with open(sidecar_path) as f:
+            sidecar = json.load(f)
+        if (
+            sidecar["player_ids"] != self.player_ids.tolist()
+            or sidecar["num_iterations"] < self.num_iterations
+        ):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def get_outcome_model(self, distribution=None):
+        # the slate's means and block diagonal factor, plus the gaussian copula's
+        # marginals for a non-normal outcome distribution (by default the configured one).
+        # empirical takes its floors and ceilings from the boom/bust file when it has them
+        if distribution is None:
+            distribution = self.outcome_distribution
+        means, factor = self.get_slate_factor()
+        players = [self.player_dict[k] for k in self.player_keys]
+        marginals = get_copula_marginals(
+            distribution,
+            means,
+            factor,
+            floors=[p.get("Floor", np.nan) for p in players],
+            ceilings=[p["Ceiling"] for p in players],
+            quantiles=self.boom_bust_quantiles,
+        )
+        return {"means": means, "factor": factor, "marginals": marginals}
+
+    def draw_player_outcomes(self, player_fpts, model, sampling, seed_sequence):
+        # fills the (players x iterations) player_fpts a chunk of iterations at a time
+        # across threads. Every chunk is its own randomized antithetic / Sobol block with
+        # one seed per chunk rather than per thread, so results don't depend on the number
+        # of cores
+        starts = range(0, player_fpts.shape[1], self.outcome_chunk_size)
+        seeds = seed_sequence.spawn(len(starts))
+        self.draw_outcome_chunks(player_fpts, model, sampling, starts, seeds)
+
+    def draw_outcome_chunks(self, player_fpts, model, sampling, starts, seeds):
+        # the chunks of player_fpts starting at starts, each from its seed
+        num_iterations = player_fpts.shape[1]
+        factor = model["factor"]
+
+        def draw_chunk(start, seed):
+            stop = min(start + self.outcome_chunk_size, num_iterations)
+            normals = draw_standard_normals(
+                np.random.default_rng(seed), factor.shape[1], stop - start, sampling
+            )
+            player_fpts[:, start:stop] = correlated_outcomes(
+                factor, normals, model["means"], model["marginals"]
             )
-        except:
-            print(team1_id, team2_id, "bad matrix")
-
-        player_samples = []
-        for i, player in enumerate(game):
-            if "QB" in player["Position"]:
-                sample = samples[:, i]
-            else:
-                sample = samples[:, i]
-            # if player['Team'] in ['LAR','SEA']:
-            #     print(player['Name'], player['Fpts'], player['StdDev'], sample, np.mean(sample), np.std(sample))
-            player_samples.append(sample)
-
-        temp_fpts_dict = {}
-        # print(team1_id, team2_id, len(game), uniform_samples.T.shape, len(player_samples), covariance_matrix.shape )
-
-        for i, player in enumerate(game):
-            temp_fpts_dict[player["ID"]] = player_samples[i]
-
-        # fig, (ax1, ax2, ax3,ax4) = plt.subplots(4, figsize=(15, 25))
-        # fig.tight_layout(pad=5.0)
-
-        # for i, player in enumerate(game):
-        #     sns.kdeplot(player_samples[i], ax=ax1, label=player['Name'])
-
-        # ax1.legend(loc='upper right', fontsize=14)
-        # ax1.set_xlabel('Fpts', fontsize=14)
-        # ax1.set_ylabel('Density', fontsize=14)
-        # ax1.set_title(f'Team {team1_id}{team2_id} Distributions', fontsize=14)
-        # ax1.tick_params(axis='both', which='both', labelsize=14)
-
-        # y_min, y_max = ax1.get_ylim()
-        # ax1.set_ylim(y_min, y_max*1.1)
-
-        # ax1.set_xlim(-5, 50)
-
-        # # # Sorting players and correlating their data
-        # player_names = [f"{player['Name']} ({player['Position']})" if player['Position'] is not None else f"{player['Name']} (P)" for player in game]
-
-        # # # Ensuring the data is correctly structured as a 2D array
-        # sorted_samples_array = np.array(player_samples)
-        # if sorted_samples_array.shape[0] < sorted_samples_array.shape[1]:
-        #     sorted_samples_array = sorted_samples_array.T
-
-        # correlation_matrix = pd.DataFrame(np.corrcoef(sorted_samples_array.T), columns=player_names, index=player_names)
-
-        # sns.heatmap(correlation_matrix, annot=True, ax=ax2, cmap='YlGnBu', cbar_kws={"shrink": .5})
-        # ax2.set_title(f'Correlation Matrix for Game {team1_id}{team2_id}', fontsize=14)
-
-        # original_corr_matrix = pd.DataFrame(corr_matrix, columns=player_names, index=player_names)
-        # sns.heatmap(original_corr_matrix, annot=True, ax=ax3, cmap='YlGnBu', cbar_kws={"shrink": .5})
-        # ax3.set_title(f'Original Correlation Matrix for Game {team1_id}{team2_id}', fontsize=14)
-
-        # mean_values = [np.mean(samples) for samples in player_samples]
-        # variance_values = [np.var(samples) for samples in player_samples]
-        # min_values = [np.min(samples) for samples in player_samples]
-        # max_values = [np.max(samples) for samples in player_samples]
 
-        # # Create a DataFrame for the mean and variance values
-        # mean_variance_df = pd.DataFrame({
-        #     'Player': player_names,
-        #     'Mean': mean_values,
-        #     'Variance': variance_values,
-        #     'Min' : min_values,
-        #     'Max' :max_values
-        # }).set_index('Player')
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(draw_chunk, starts, seeds))
 
-        # # Plot the mean and variance table
-        # ax4.axis('tight')
-        # ax4.axis('off')
-        # ax4.table(cellText=mean_variance_df.values, colLabels=mean_variance_df.columns, rowLabels=mean_variance_df.index, cellLoc='center', loc='center')
-        # ax4.set_title(f'Mean and Variance for Game {team1_id}{team2_id}', fontsize=14)
+    def open_player_outcomes(self):
+        # the outcome store for the slate: a stored one with at least num_iterations
+        # iterations, or a new one that extend_player_outcomes draws a chunk at a time
+        model = self.get_outcome_model()
+        fingerprint = self.get_outcome_fingerprint(
+            model["means"], model["factor"], model["marginals"]
+        )
+        path = os.path.join(
+            os.path.dirname(__file__),
+            "../output/{}_gpp_sim_outcomes_{}.npy".format(self.site, fingerprint),
+        )
+        store = {"path": path, "fingerprint": fingerprint}
+        if self.load_player_outcomes(path) is not None:
+            print(
+                "using stored player outcomes for seed {} from {}".format(
+                    self.seed, os.path.basename(path)
+                )
+            )
+            store["drawn"] = self.num_iterations
+            return store
+
+        # the old sidecar goes first, so a store being redrawn is never reused
+        sidecar_path = os.path.splitext(path)[0] + ".json"
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
+        seed_sequence = self.get_outcome_seed_sequence()
+        num_chunks = math.ceil(self.num_iterations / self.outcome_chunk_size)
+        store.update(
+            model=model,
+            player_fpts=np.lib.format.open_memmap(
+                path,
+                mode="w+",
+                dtype=np.float32,
+                shape=(len(self.player_keys), self.num_iterations),
+            ),
+            # the same seeds a full draw uses, however many chunks end up drawn
+            seeds=seed_sequence.spawn(num_chunks),
+            entropy=seed_sequence.entropy,
+            drawn=0,
+        )
+        return store
+
+    def extend_player_outcomes(self, store, num_iterations):
+        # draws the store's outcomes up to at least num_iterations, in whole chunks
+        if store["drawn"] >= num_iterations:
+            return
+        player_fpts = store["player_fpts"]
+        starts = range(store["drawn"], num_iterations, self.outcome_chunk_size)
+        first = store["drawn"] // self.outcome_chunk_size
+        seeds = store["seeds"][first : first + len(starts)]
+        self.draw_outcome_chunks(player_fpts, store["model"], self.sampling, starts, seeds)
+        # the workers map the file themselves
+        player_fpts.flush()
+        store["drawn"] = min(starts[-1] + self.outcome_chunk_size, player_fpts.shape[1])
+
+    def close_player_outcomes(self, store):
+        # records how many iterations were drawn, and returns the path of the store. Only
+        # a seeded run's outcomes are kept for later runs; an unseeded run's store is
+        # deleted once it's been scored, so every unseeded run is independent
+        if "player_fpts" in store:
+            del store["player_fpts"]
+            if self.seed is None:
+                os.remove(store["path"])
+                return store["path"]
+            # the sidecar is written last, so a store without one is never reused
+            with open(os.path.splitext(store["path"])[0] + ".json", "w") as f:
+                json.dump(
+                    {
+                        "player_ids": self.player_ids.tolist(),
+                        "num_iterations": store["drawn"],
+                        "seed": store["entropy"],
+                        "fingerprint": store["fingerprint"],
+                    },
+                    f,
+                )
+        return store["path"]
 
-        # plt.savefig(f'output/Team_{team1_id}{team2_id}_Distributions_Correlation.png', bbox_inches='tight')
-        # plt.close()
+    @staticmethod
+    def simulate_tournament_block(bounds):
+        # each worker maps the outcome store itself, only the block's columns are read
+        start, stop = bounds
+        player_fpts = np.load(tournament_field["outcomes_path"], mmap_mode="r")
+        return NBA_GPP_Simulator.score_tournament_block(player_fpts[:, start:stop])
 
-        return temp_fpts_dict
+    @staticmethod
+    def score_tournament_block(player_fpts):
+        # scores one block of iterations for the lineups of every contest at once, then
+        # ranks and pays out each contest's field. Only per-lineup totals are returned,
+        # one (wins, top1pct, cashes, roi) per contest; the block's lineups x iterations
+        # arrays are dropped with the call
+        field = tournament_field
+        if field["score_type"] == "int32":
+            # fixed point tenths of a point, so lineup sums are exact
+            player_fpts = np.rint(player_fpts * 10).astype(np.int32)
+        else:
+            player_fpts = player_fpts.astype(np.float32)
+        # (lineups x players) @ (players x iterations) scores the whole field at once
+        scores = field["incidence"] @ player_fpts
+        if field["score_type"] == "float16":
+            # the kernels can't take float16, float32 holds the same (tie-prone) values
+            scores = scores.astype(np.float16).astype(np.float32)
+        results = []
+        for contest in field["contests"]:
+            if contest["rows"] is None:
+                contest_scores = scores
+            else:
+                contest_scores = scores[contest["rows"]]
+            results.append(
+                NBA_GPP_Simulator.score_contest_block(contest_scores, contest)
+            )
+        return results
 
     @staticmethod
-    @jit(nopython=True)
-    def calculate_payouts(args):
-        (
-            ranks,
-            payout_array,
-            entry_fee,
-            field_lineup_keys,
-            use_contest_data,
-            field_lineups_count,
-        ) = args
-        num_lineups = len(field_lineup_keys)
-        combined_result_array = np.zeros(num_lineups)
-
-        payout_cumsum = np.cumsum(payout_array)
-
-        for r in range(ranks.shape[1]):
-            ranks_in_sim = ranks[:, r]
-            payout_index = 0
-            for lineup_index in ranks_in_sim:
-                lineup_count = field_lineups_count[lineup_index]
-                prize_for_lineup = (
-                    (
-                        payout_cumsum[payout_index + lineup_count - 1]
-                        - payout_cumsum[payout_index - 1]
-                    )
-                    / lineup_count
-                    if payout_index != 0
-                    else payout_cumsum[payout_index + lineup_count - 1] / lineup_count
-                )
-                combined_result_array[lineup_index] += prize_for_lineup
-                payout_index += lineup_count
-        return combined_result_array
+    def score_contest_block(scores, contest):
+        # ranks and pays out one contest's lineup scores for a block, serially since
+        # every pool worker scores a block of its own
+        (wins, top1pct, cashes), roi = score_ranked_block(
+            scores,
+            contest["num_ranked"],
+            [1, contest["num_top1pct"], contest["num_cashes"]],
+            contest["payout_array"],
+            contest["entry_fee"],
+            contest["counts"],
+            parallel=False,
+        )
+        return wins, top1pct, cashes, roi
+
+    def get_lineup_incidence(self, lineups):
+        # sparse (lineups x players) matrix with a 1 wherever the lineup rosters the player,
+        # in the dtype the scores are summed in
+        lineups = np.asarray(lineups, dtype=np.int64)
+        rows = np.repeat(np.arange(len(lineups)), lineups.shape[1])
+        dtype = np.int32 if self.sim_score_type == "int32" else np.float32
+        return csr_matrix(
+            (np.ones(lineups.size, dtype=dtype), (rows, lineups.ravel())),
+            shape=(len(lineups), len(self.player_keys)),
+        )
 
-    def run_tournament_simulation(self):
+    def get_sim_block_size(self, num_lineups):
+        # about 16 bytes per lineup x iteration cell while a block is ranked (32-bit scores
+        # plus the int64 argpartition). The memory budget holds sim_parallel_blocks blocks,
+        # a fixed number rather than the core count, since the block boundaries decide the
+        # batch means standard errors, where an adaptive run stops and the order the
+        # results are summed in
+        budget = self.sim_memory_mb * 1024 * 1024
+        block_size = budget // (16 * max(num_lineups, 1) * self.sim_parallel_blocks)
+        # but still split the iterations into that many blocks
+        block_size = min(
+            block_size, math.ceil(self.num_iterations / self.sim_parallel_blocks)
+        )
+        return max(1, int(block_size))
+
+    def get_sim_workers(self, num_lineups, block_size):
+        # as many pool workers as there are cores, or as many blocks as fit in the memory
+        # budget at once if that's fewer; this only schedules the blocks
+        budget = self.sim_memory_mb * 1024 * 1024
+        in_memory = budget // (16 * max(num_lineups, 1) * block_size)
+        return max(1, min(mp.cpu_count(), int(in_memory)))
+
+    def run_tournament_simulation(self, contests=None):
+        # contests are simulators for the same slate (see load_contests) whose fields
+        # are all scored against one simulation of player outcomes; by default just this
+        # one
+        if contests is None:
+            contests = [self]
         print(f"Running {self.num_iterations} simulations")
-        print(f"Number of unique field lineups: {len(self.field_lineups.keys())}")
+        for sim in contests:
+            name = "" if sim.contest_name is None else " ({})".format(sim.contest_name)
+            print(
+                f"Number of unique field lineups{name}: {len(sim.field_lineups.keys())}"
+            )
 
+        self.check_sobol_draws(self.outcome_chunk_size)
+        # an adaptive run's time budget covers drawing the outcomes as well as scoring
         start_time = time.time()
-        temp_fpts_dict = {}
-        size = self.num_iterations
-        game_simulation_params = []
-        for m in self.matchups:
-            game_simulation_params.append(
-                (
-                    m[0],
-                    self.teams_dict[m[0]],
-                    m[1],
-                    self.teams_dict[m[1]],
-                    self.num_iterations,
-                    self.roster_construction,
-                )
+        store = self.open_player_outcomes()
+
+        field = self.get_tournament_field(contests)
+        field["outcomes_path"] = store["path"]
+
+        # iterations are scored, ranked and paid out a block at a time, so the lineups x
+        # iterations matrices only ever exist for one block per worker
+        adaptive = self.is_adaptive()
+        # with several contests the largest one's scores are also copied out per block
+        num_lineups = field["incidence"].shape[0]
+        if len(contests) > 1:
+            num_lineups += max(len(c["counts"]) for c in field["contests"])
+        block_size = self.get_sim_block_size(num_lineups)
+        if adaptive:
+            # small blocks, so the stopping rule is checked often
+            block_size = min(block_size, self.convergence_block_size)
+        # the blocks go to the workers a round at a time: all of them at once, or for an
+        # adaptive run one outcome chunk's worth, so stopping early also skips drawing
+        # the outcomes it didn't need
+        round_size = self.outcome_chunk_size if adaptive else self.num_iterations
+        rounds = []
+        for round_start in range(0, self.num_iterations, round_size):
+            round_stop = min(round_start + round_size, self.num_iterations)
+            rounds.append(
+                [
+                    (i, min(i + block_size, round_stop))
+                    for i in range(round_start, round_stop, block_size)
+                ]
             )
-        with mp.Pool() as pool:
-            results = pool.starmap(self.run_simulation_for_game, game_simulation_params)
+        totals = [None] * len(contests)
+        stats = [new_block_stats(len(sim.field_lineups)) for sim in contests]
+        converged = False
+        with mp.Pool(
+            self.get_sim_workers(num_lineups, block_size),
+            initializer=init_tournament_field,
+            initargs=(field,),
+        ) as pool:
+            self.extend_player_outcomes(store, rounds[0][-1][1])
+            for round_index, blocks in enumerate(rounds):
+                # blocks come back in order, so where an adaptive run stops only depends
+                # on the seed (and the time budget); leaving the pool drops the queued
+                # blocks
+                results = pool.imap(self.simulate_tournament_block, blocks)
+                # the next round's outcomes are drawn while the workers score this one
+                if round_index + 1 < len(rounds):
+                    self.extend_player_outcomes(store, rounds[round_index + 1][-1][1])
+                for (start, stop), block_results in zip(blocks, results):
+                    for i, result in enumerate(block_results):
+                        if totals[i] is None:
+                            totals[i] = list(result)
+                        else:
+                            totals[i] = [t + r for t, r in zip(totals[i], result)]
+                        add_block_stats(stats[i], result[0], result[3], stop - start)
+                    elapsed = time.time() - start_time
+                    if adaptive and all(
+                        sim.has_converged(t[0], t[3], sim_stats, elapsed)
+                        for sim, t, sim_stats in zip(contests, totals, stats)
+                    ):
+                        converged = True
+                        break
+                if converged:
+                    break
+        self.close_player_outcomes(store)
 
-        for res in results:
-            temp_fpts_dict.update(res)
+        for sim, sim_totals, sim_stats in zip(contests, totals, stats):
+            if sim.shard is not None:
+                sim.save_shard_results(sim_totals, sim_stats)
+            sim.apply_tournament_results(sim_totals, sim_stats, adaptive)
 
-        # generate arrays for every sim result for each player in the lineup and sum
-        fpts_array = np.zeros(shape=(len(self.field_lineups), self.num_iterations))
-        # converting payout structure into an np friendly format, could probably just do this in the load contest function
-        # print(self.field_lineups)
-        # print(temp_fpts_dict)
-        # print(payout_array)
-        # print(self.player_dict[('patrick mahomes', 'FLEX', 'KC')])
-        field_lineups_count = np.array(
-            [self.field_lineups[idx]["Count"] for idx in self.field_lineups.keys()]
+        end_time = time.time()
+        diff = end_time - start_time
+        print(
+            str(contests[0].num_iterations)
+            + " tournament simulations finished in "
+            + str(diff)
+            # a shard only saves its partial results, the merge writes the output
+            + (" seconds. Outputting." if self.shard is None else " seconds.")
         )
 
-        for index, values in self.field_lineups.items():
-            try:
-                fpts_sim = sum([temp_fpts_dict[player] for player in values["Lineup"]])
-                # store lineup fpts sum in 2d np array where index (row) corresponds to index of field_lineups and columns are the fpts from each sim
-                fpts_array[index] = fpts_sim
-            except KeyError:
-                for player in values["Lineup"]:
-                    if player not in temp_fpts_dict.keys():
-                        print(player)
-                        # for k,v in self.player_dict.items():
-                        # if v['ID'] == player:
-                        #        print(k,v)
-                # print('cant find player in sim dict', values["Lineup"], temp_fpts_dict.keys())
-
-        fpts_array = fpts_array.astype(np.float16)
-        # ranks = np.argsort(fpts_array, axis=0)[::-1].astype(np.uint16)
-        ranks = np.argsort(-fpts_array, axis=0).astype(np.uint32)
-
-        # count wins, top 10s vectorized
-        wins, win_counts = np.unique(ranks[0, :], return_counts=True)
-        cashes, cash_counts = np.unique(
-            ranks[0 : len(list(self.payout_structure.values()))], return_counts=True
+    def apply_tournament_results(self, totals, stats, adaptive):
+        wins, top1pct, cashes, roi = totals
+        self.num_iterations = stats["iterations"]
+        if adaptive:
+            self.report_convergence(wins, roi, stats)
+        for idx, lineup_key in enumerate(self.field_lineups.keys()):
+            self.field_lineups[lineup_key]["Wins"] += wins[idx]
+            self.field_lineups[lineup_key]["Top1Percent"] += top1pct[idx]
+            self.field_lineups[lineup_key]["Cashes"] += cashes[idx]
+            self.field_lineups[lineup_key]["ROI"] += roi[idx]
+
+    def set_shard(self, index, count, shard_dir=None):
+        # this run only simulates shard index (0 based) of count: its share of the
+        # iterations, from its own seeds. The partial results go to shard_dir (output/
+        # by default), which the other shards, on this host or any other sharing the
+        # directory, write theirs to as well
+        self.shard = (index, count)
+        self.set_shard_dir(shard_dir)
+        bounds = np.linspace(0, self.num_iterations, count + 1).astype(int)
+        self.num_iterations = int(bounds[index + 1] - bounds[index])
+
+    def set_shard_dir(self, shard_dir):
+        if shard_dir is None:
+            shard_dir = os.path.join(os.path.dirname(__file__), "../output")
+        self.shard_dir = shard_dir
+        # shard files are named by the whole run's iterations
+        self.shard_iterations = self.num_iterations
+
+    def get_outcome_seed_sequence(self):
+        # a fresh copy of the run's outcome sequence, so the outcomes spawn the same chunk
+        # seeds however often they're drawn. Shards draw theirs from their own branch of
+        # it, clear of the chunk seeds, so a seeded sharded run is reproducible and no two
+        # shards simulate the same iterations
+        spawn_key = self.outcome_seed_sequence.spawn_key
+        if self.shard is not None:
+            spawn_key += (2**32, self.shard[0])
+        return np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=spawn_key)
+
+    def get_shard_path(self, kind):
+        if self.contest_name is not None:
+            kind = "{}_{}".format(kind, self.contest_name)
+        return os.path.join(
+            self.shard_dir,
+            "{}_gpp_sim_shard_{}_{}_{}.npz".format(
+                self.site, kind, self.field_size, self.shard_iterations
+            ),
         )
 
-        top1pct, top1pct_counts = np.unique(
-            ranks[0 : math.ceil(0.01 * len(self.field_lineups)), :], return_counts=True
+    def share_field_lineups(self, poll_interval=1):
+        # every shard has to score the same field: the shard that takes the lock file
+        # generates it and publishes it to the shard directory, every other shard waits
+        # for that one and loads it (as does the merge). Returns False if the published
+        # field can't be used
+        path = self.get_shard_path("field")
+        lock_path = path + ".lock"
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            if not os.path.exists(path):
+                print("waiting for another shard to publish the field to " + path)
+            while not os.path.exists(path):
+                time.sleep(poll_interval)
+            return self.load_shared_field(path)
+        try:
+            self.generate_field_lineups()
+            field_lineups = list(self.field_lineups.values())
+            tmp_path = "{}.{}.tmp".format(path, os.urandom(8).hex())
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    lineups=np.array(
+                        [x["Lineup"] for x in field_lineups], dtype=np.int16
+                    ),
+                    counts=np.array([x["Count"] for x in field_lineups]),
+                    types=np.array([x["Type"] for x in field_lineups]),
+                    player_ids=self.player_ids.astype(str),
+                )
+            # moved into place in one step, so waiting shards never load half a field
+            os.replace(tmp_path, path)
+        except BaseException:
+            # let the next shard to start take over instead of everyone waiting forever
+            os.remove(lock_path)
+            raise
+        return self.load_shared_field(path)
+
+    def load_shared_field(self, path):
+        if not os.path.exists(path):
+            print("no shared field at " + path + ", run the shards first")
+            return False
+        with np.load(path) as field:
+            if field["player_ids"].tolist() != self.player_ids.astype(str).tolist():
+                print("shared field at " + path + " is for a different slate")
+                return False
+            self.field_lineups = {}
+            for i, (lineup, count, lu_type) in enumerate(
+                zip(field["lineups"], field["counts"].tolist(), field["types"].tolist())
+            ):
+                self.field_lineups[i] = {
+                    "Lineup": lineup,
+                    "Wins": 0,
+                    "Top1Percent": 0,
+                    "ROI": 0,
+                    "Cashes": 0,
+                    "Type": lu_type,
+                    "Count": count,
+                }
+        print("loaded {} shared field lineups".format(len(self.field_lineups)))
+        return True
+
+    def get_shard_key(self):
+        # shards can only be merged if they scored the same field for the same payouts
+        index_to_key = list(self.field_lineups.keys())
+        key = hashlib.sha1(
+            np.array(
+                [self.field_lineups[k]["Lineup"] for k in index_to_key], dtype=np.int16
+            ).tobytes()
+        )
+        key.update(np.array([self.field_lineups[k]["Count"] for k in index_to_key]))
+        key.update(np.array(list(self.payout_structure.values()), dtype=float))
+        key.update(np.array([self.entry_fee], dtype=float))
+        return key.hexdigest()[:16]
+
+    def save_shard_results(self, totals, stats):
+        # every accumulator is a sum over iterations or blocks, so the shards' partial
+        # results add up to what one run over all of their iterations would have found
+        wins, top1pct, cashes, roi = totals
+        path = self.get_shard_path("{}_of_{}".format(self.shard[0] + 1, self.shard[1]))
+        tmp_path = "{}.{}.tmp".format(path, os.urandom(8).hex())
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                shard_key=np.array(self.get_shard_key()),
+                wins=wins,
+                top1pct=top1pct,
+                cashes=cashes,
+                roi=roi,
+                **stats,
+            )
+        # replaced in one step, so the merge never reads a half written file
+        os.replace(tmp_path, path)
+        print(
+            "saved shard {}/{} partial results to {}".format(
+                self.shard[0] + 1, self.shard[1], path
+            )
         )
 
+    def merge_shard_results(self, count, shard_dir=None):
+        # this simulator's field and results from the count shards of a sharded run with
+        # the same settings and num_iterations. Returns False if any shard is missing or
+        # didn't score the shared field
+        self.set_shard_dir(shard_dir)
+        if not self.load_shared_field(self.get_shard_path("field")):
+            return False
+        shard_key = self.get_shard_key()
+        totals = None
+        stats = None
+        for i in range(count):
+            path = self.get_shard_path("{}_of_{}".format(i + 1, count))
+            if not os.path.exists(path):
+                print("no results for shard {} of {} at {}".format(i + 1, count, path))
+                return False
+            with np.load(path) as partial:
+                if str(partial["shard_key"]) != shard_key:
+                    print(
+                        "shard {} of {} scored a different field or contest".format(
+                            i + 1, count
+                        )
+                    )
+                    return False
+                shard_totals = [
+                    partial[k] for k in ["wins", "top1pct", "cashes", "roi"]
+                ]
+                shard_stats = {
+                    k: partial[k]
+                    for k in [
+                        "squares",
+                        "cross",
+                        "weight_squares",
+                        "iterations",
+                        "blocks",
+                    ]
+                }
+            if totals is None:
+                totals = shard_totals
+                stats = shard_stats
+            else:
+                totals = [t + s for t, s in zip(totals, shard_totals)]
+                stats = {k: stats[k] + shard_stats[k] for k in stats}
+        for k in ["weight_squares", "iterations", "blocks"]:
+            stats[k] = int(stats[k])
+        self.apply_tournament_results(totals, stats, self.is_adaptive())
+        print("merged {} shards, {} iterations".format(count, self.num_iterations))
+        return True
+
+    def get_tournament_field(self, contests):
+        # everything the tournament workers need to score, rank and pay out the fields.
+        # A single field is scored as is; with several contests every distinct lineup is
+        # scored once and each contest picks its lineups' rows out of those scores
+        lineups = [
+            [sim.field_lineups[k]["Lineup"] for k in sim.field_lineups.keys()]
+            for sim in contests
+        ]
+        if len(contests) == 1:
+            return {
+                "incidence": self.get_lineup_incidence(lineups[0]),
+                "score_type": self.sim_score_type,
+                "contests": [contests[0].get_contest_field(None)],
+            }
+        union = {}
+        contest_fields = []
+        for sim, sim_lineups in zip(contests, lineups):
+            rows = [
+                union.setdefault(tuple(np.sort(lineup).tolist()), len(union))
+                for lineup in sim_lineups
+            ]
+            contest_fields.append(sim.get_contest_field(np.array(rows, dtype=np.int64)))
+        return {
+            "incidence": self.get_lineup_incidence(list(union.keys())),
+            "score_type": self.sim_score_type,
+            "contests": contest_fields,
+        }
+
+    def get_contest_field(self, rows):
+        # this contest's payouts and entry counts, with the rows of its lineups in the
+        # shared scores (None when they're the only lineups scored)
         payout_array = np.array(list(self.payout_structure.values()))
         # subtract entry fee
         payout_array = payout_array - self.entry_fee
@@ -1566,267 +2174,252 @@ class NBA_GPP_Simulator:
             shape=self.field_size - len(payout_array), fill_value=-self.entry_fee
         )
         payout_array = np.concatenate((payout_array, l_array))
-        field_lineups_keys_array = np.array(list(self.field_lineups.keys()))
-
-        # Adjusted ROI calculation
-        # print(field_lineups_count.shape, payout_array.shape, ranks.shape, fpts_array.shape)
-
-        # Split the simulation indices into chunks
-        field_lineups_keys_array = np.array(list(self.field_lineups.keys()))
-
-        chunk_size = self.num_iterations // 16  # Adjust chunk size as needed
-        simulation_chunks = [
-            (
-                ranks[:, i : min(i + chunk_size, self.num_iterations)].copy(),
-                payout_array,
-                self.entry_fee,
-                field_lineups_keys_array,
-                self.use_contest_data,
-                field_lineups_count,
-            )  # Adding field_lineups_count here
-            for i in range(0, self.num_iterations, chunk_size)
-        ]
 
-        # Use the pool to process the chunks in parallel
-        with mp.Pool() as pool:
-            results = pool.map(self.calculate_payouts, simulation_chunks)
-
-        combined_result_array = np.sum(results, axis=0)
-
-        total_sum = 0
         index_to_key = list(self.field_lineups.keys())
-        for idx, roi in enumerate(combined_result_array):
-            lineup_key = index_to_key[idx]
-            lineup_count = self.field_lineups[lineup_key][
-                "Count"
-            ]  # Assuming "Count" holds the count of the lineups
-            total_sum += roi * lineup_count
-            self.field_lineups[lineup_key]["ROI"] += roi
-
-        for idx in self.field_lineups.keys():
-            if idx in wins:
-                self.field_lineups[idx]["Wins"] += win_counts[np.where(wins == idx)][0]
-            if idx in top1pct:
-                self.field_lineups[idx]["Top1Percent"] += top1pct_counts[
-                    np.where(top1pct == idx)
-                ][0]
-            if idx in cashes:
-                self.field_lineups[idx]["Cashes"] += cash_counts[
-                    np.where(cashes == idx)
-                ][0]
-
-        end_time = time.time()
-        diff = end_time - start_time
+        contest = {
+            "rows": rows,
+            "counts": np.array([self.field_lineups[k]["Count"] for k in index_to_key]),
+            "payout_array": payout_array,
+            "entry_fee": self.entry_fee,
+            "num_cashes": len(self.payout_structure),
+            "num_top1pct": math.ceil(0.01 * len(index_to_key)),
+        }
+        # every paid place is covered by the top len(payout_structure) lineups (each lineup
+        # takes at least one place), so nothing below that or the top 1% needs ranking
+        contest["num_ranked"] = max(contest["num_cashes"], contest["num_top1pct"], 1)
+        return contest
+
+    def simulate_replicates(self, sampling, num_iterations, seeds):
+        # every field lineup's wins and ROI in an independent sim of num_iterations with
+        # this sampling for each seed, for benchmark_sampling
+        init_tournament_field(self.get_tournament_field([self]))
+        model = self.get_outcome_model()
+        player_fpts = np.empty(
+            (len(self.player_keys), num_iterations), dtype=np.float32
+        )
+        results = []
+        for seed in seeds:
+            self.draw_player_outcomes(player_fpts, model, sampling, seed)
+            wins, _, _, roi = self.score_tournament_block(player_fpts)[0]
+            results.append((wins, roi))
+        return results
+
+    def benchmark_outcome_distributions(self, num_iterations=200000, num_repeats=3):
+        # seconds to draw num_iterations iterations of the slate's player outcomes with
+        # each outcome distribution (the best of num_repeats, so numba's compile time
+        # doesn't count) and that time relative to normal outcomes
         print(
-            str(self.num_iterations)
-            + " tournament simulations finished in "
-            + str(diff)
-            + " seconds. Outputting."
+            "Benchmarking outcome distributions with {} iterations".format(
+                num_iterations
+            )
         )
-
-    def output(self):
-        unique = {}
-        for index, x in self.field_lineups.items():
-            if len(x["Lineup"]) < 8:
-                print(f"invalid lineup found: {len(x['Lineup'])} players.")
-                continue
-            # if index == 0:
-            #    print(x)
-            lu_type = x["Type"]
-            salary = 0
-            fpts_p = 0
-            fieldFpts_p = 0
-            ceil_p = 0
-            own_p = []
-            lu_names = []
-            lu_teams = []
-            players_vs_def = 0
-            def_opps = []
-            for id in x["Lineup"]:
-                for k, v in self.player_dict.items():
-                    if v["ID"] == id:
-                        salary += v["Salary"]
-                        fpts_p += v["Fpts"]
-                        fieldFpts_p += v["fieldFpts"]
-                        ceil_p += v["Ceiling"]
-                        own_p.append(v["Ownership"] / 100)
-                        lu_names.append(v["DK Name"])
-                        lu_teams.append(v["Team"])
-                        continue
-            counter = collections.Counter(lu_teams)
-            stacks = counter.most_common()
-
-            # Find the QB team in stacks and set it as primary stack, remove it from stacks and subtract 1 to make sure qb isn't counted
-            # print(f"stacks: {stacks}")
-            primaryStack = str(stacks[0][0]) + " " + str(stacks[0][1])
-            # After removing QB team, the first team in stacks will be the team with most players not in QB stack
-            secondaryStack = str(stacks[1][0]) + " " + str(stacks[1][1])
-            own_s = np.sum(own_p)
-            own_p = np.prod(own_p)
-            win_p = round(x["Wins"] / self.num_iterations * 100, 2)
-            top10_p = round((x["Top1Percent"] / self.num_iterations) * 100, 2)
-            cash_p = round(x["Cashes"] / self.num_iterations * 100, 2)
-            simDupes = x["Count"]
-            if self.site == "dk":
-                if self.use_contest_data:
-                    roi_p = round(
-                        x["ROI"] / self.entry_fee / self.num_iterations * 100, 2
-                    )
-                    roi_round = round(x["ROI"] / self.num_iterations, 2)
-                    lineup_str = (
-                        f"{lu_names[0].replace('#', '-')}"
-                        f" ({x['Lineup'][0]}),"
-                        f"{lu_names[1].replace('#', '-')}"
-                        f" ({x['Lineup'][1]}),"
-                        f"{lu_names[2].replace('#', '-')}"
-                        f" ({x['Lineup'][2]}),"
-                        f"{lu_names[3].replace('#', '-')}"
-                        f" ({x['Lineup'][3]}),"
-                        f"{lu_names[4].replace('#', '-')}"
-                        f" ({x['Lineup'][4]}),"
-                        f"{lu_names[5].replace('#', '-')}"
-                        f" ({x['Lineup'][5]}),"
-                        f"{lu_names[6].replace('#', '-')}"
-                        f" ({x['Lineup'][6]}),"
-                        f"{lu_names[7].replace('#', '-')}"
-                        f" ({x['Lineup'][7]}),"
-                        f"{fpts_p},{fieldFpts_p},{ceil_p},{salary},{win_p}%,{top10_p}%,{roi_p}%,{own_p},{own_s},${roi_round},{primaryStack},{secondaryStack},{lu_type},{simDupes}"
-                    )
-                else:
-                    lineup_str = (
-                        f"{lu_names[0].replace('#', '-')}"
-                        f" ({x['Lineup'][0]}),"
-                        f"{lu_names[1].replace('#', '-')}"
-                        f" ({x['Lineup'][1]}),"
-                        f"{lu_names[2].replace('#', '-')}"
-                        f" ({x['Lineup'][2]}),"
-                        f"{lu_names[3].replace('#', '-')}"
-                        f" ({x['Lineup'][3]}),"
-                        f"{lu_names[4].replace('#', '-')}"
-                        f" ({x['Lineup'][4]}),"
-                        f"{lu_names[5].replace('#', '-')}"
-                        f" ({x['Lineup'][5]}),"
-                        f"{lu_names[6].replace('#', '-')}"
-                        f" ({x['Lineup'][6]}),"
-                        f"{lu_names[7].replace('#', '-')}"
-                        f" ({x['Lineup'][7]}),"
-                        f"{fpts_p},{fieldFpts_p},{ceil_p},{salary},{win_p}%,{top10_p}%,{own_p},{own_s},{primaryStack},{secondaryStack},{lu_type},{simDupes}"
-                    )
-            elif self.site == "fd":
-                if self.use_contest_data:
-                    roi_p = round(
-                        x["ROI"] / self.entry_fee / self.num_iterations * 100, 2
-                    )
-                    roi_round = round(x["ROI"] / self.num_iterations, 2)
-                    lineup_str = (
-                        f"{x['Lineup'][0]}:{lu_names[0].replace('#', '-')},"
-                        f"{x['Lineup'][1]}:{lu_names[1].replace('#', '-')},"
-                        f"{x['Lineup'][2]}:{lu_names[2].replace('#', '-')},"
-                        f"{x['Lineup'][3]}:{lu_names[3].replace('#', '-')},"
-                        f"{x['Lineup'][4]}:{lu_names[4].replace('#', '-')},"
-                        f"{x['Lineup'][5]}:{lu_names[5].replace('#', '-')},"
-                        f"{x['Lineup'][6]}:{lu_names[6].replace('#', '-')},"
-                        f"{x['Lineup'][7]}:{lu_names[7].replace('#', '-')},"
-                        f"{x['Lineup'][8]}:{lu_names[8].replace('#', '-')},"
-                        f"{fpts_p},{fieldFpts_p},{ceil_p},{salary},{win_p}%,{top10_p}%,{roi_p}%,{own_p},{own_s},${roi_round},{primaryStack},{secondaryStack},{lu_type},{simDupes}"
-                    )
-                else:
-                    lineup_str = (
-                        f"{x['Lineup'][0]}:{lu_names[0].replace('#', '-')},"
-                        f"{x['Lineup'][1]}:{lu_names[1].replace('#', '-')},"
-                        f"{x['Lineup'][2]}:{lu_names[2].replace('#', '-')},"
-                        f"{x['Lineup'][3]}:{lu_names[3].replace('#', '-')},"
-                        f"{x['Lineup'][4]}:{lu_names[4].replace('#', '-')},"
-                        f"{x['Lineup'][5]}:{lu_names[5].replace('#', '-')},"
-                        f"{x['Lineup'][6]}:{lu_names[6].replace('#', '-')},"
-                        f"{x['Lineup'][7]}:{lu_names[7].replace('#', '-')},"
-                        f"{x['Lineup'][8]}:{lu_names[8].replace('#', '-')},"
-                        f"{fpts_p},{fieldFpts_p},{ceil_p},{salary},{win_p}%,{top10_p}%,{own_p},{own_s},{primaryStack},{secondaryStack},{lu_type},{simDupes}"
-                    )
-            unique[index] = lineup_str
+        player_fpts = np.empty((len(self.player_keys), num_iterations), dtype=np.float32)
+        timings = {}
+        for distribution in OUTCOME_DISTRIBUTIONS:
+            model = self.get_outcome_model(distribution)
+            timings[distribution] = math.inf
+            for seed in self.benchmark_seed_sequence.spawn(num_repeats):
+                start_time = time.time()
+                self.draw_player_outcomes(player_fpts, model, self.sampling, seed)
+                timings[distribution] = min(
+                    timings[distribution], time.time() - start_time
+                )
 
         out_path = os.path.join(
             os.path.dirname(__file__),
-            "../output/{}_gpp_sim_lineups_{}_{}.csv".format(
-                self.site, self.field_size, self.num_iterations
+            "../output/{}_gpp_sim_distribution_benchmark_{}_{}.csv".format(
+                self.site, len(self.player_keys), num_iterations
             ),
         )
+        with open(out_path, "w") as f:
+            f.write("Distribution,Seconds,Cost vs. Normal\n")
+            for distribution, seconds in timings.items():
+                cost = round(seconds / timings["normal"], 2)
+                print(
+                    "{}: {} seconds, {}x the normal outcomes".format(
+                        distribution, round(seconds, 3), cost
+                    )
+                )
+                f.write("{},{},{}\n".format(distribution, seconds, cost))
+
+    def get_lineup_stacks(self, lineups):
+        # each lineup's most and second most rostered team and their player counts, ties
+        # going to the team rostered first (the order collections.Counter.most_common uses)
+        team_names, team_codes = np.unique(
+            [self.player_dict[k]["Team"] for k in self.player_keys], return_inverse=True
+        )
+        lineup_teams = team_codes[lineups]
+        num_slots = lineups.shape[1]
+        same_team = lineup_teams[:, :, None] == lineup_teams[:, None, :]
+        team_counts = same_team.sum(axis=2)
+        # only a team's first slot in the lineup is a candidate
+        first_slot = ~np.tril(same_team, k=-1).any(axis=2)
+        order = np.where(
+            first_slot, team_counts * num_slots + np.arange(num_slots)[::-1], -1
+        )
+        rows = np.arange(len(lineups))
+        primary = np.argmax(order, axis=1)
+        order[rows, primary] = -1
+        secondary = np.argmax(order, axis=1)
+        return [
+            [
+                "{} {}".format(team, count)
+                for team, count in zip(
+                    team_names[lineup_teams[rows, slot]],
+                    team_counts[rows, slot].tolist(),
+                )
+            ]
+            for slot in (primary, secondary)
+        ]
+
+    def get_output_path(self, kind, iterations=True):
+        # output files are named by contest when several are simulated together, and by
+        # the iterations run unless they describe the field alone
+        if self.contest_name is not None:
+            kind = "{}_{}".format(kind, self.contest_name)
+        name = "{}_gpp_sim_{}_{}".format(self.site, kind, self.field_size)
+        if iterations:
+            name = "{}_{}".format(name, self.num_iterations)
+        return os.path.join(os.path.dirname(__file__), "../output/" + name + ".csv")
+
+    def output(self):
+        # every column is computed for the whole field at once from per player arrays
+        # indexed by the (lineups x slots) index matrix, then written out in bulk
+        index_to_key = list(self.field_lineups.keys())
+        field_lineups = [self.field_lineups[k] for k in index_to_key]
+        lineups = np.array([x["Lineup"] for x in field_lineups], dtype=np.int64)
+        players = [self.player_dict[k] for k in self.player_keys]
+
+        def lineup_totals(values):
+            # summed slot by slot, in the order the lineup lists them
+            slot_values = np.array(values)[lineups]
+            total = slot_values[:, 0]
+            for slot in range(1, slot_values.shape[1]):
+                total = total + slot_values[:, slot]
+            return total.tolist()
+
+        def percents(values, scale=100):
+            return ["{}%".format(round(v, 2)) for v in (values * scale).tolist()]
+
+        fpts_p = lineup_totals([v["Fpts"] for v in players])
+        fieldFpts_p = lineup_totals([v["fieldFpts"] for v in players])
+        ceil_p = lineup_totals([v["Ceiling"] for v in players])
+        salary = lineup_totals([v["Salary"] for v in players])
+        ownership = np.array([v["Ownership"] / 100 for v in players])[lineups]
+        own_p = ownership.prod(axis=1).tolist()
+        own_s = ownership.sum(axis=1).tolist()
+        wins = np.array([x["Wins"] for x in field_lineups])
+        top1pct = np.array([x["Top1Percent"] for x in field_lineups])
+        roi = np.array([x["ROI"] for x in field_lineups], dtype=float)
+        win_p = percents(wins / self.num_iterations)
+        top10_p = percents(top1pct / self.num_iterations)
+        primaryStack, secondaryStack = self.get_lineup_stacks(lineups)
+        lu_type = [x["Type"] for x in field_lineups]
+        simDupes = [x["Count"] for x in field_lineups]
+
+        names = [v["DK Name"].replace("#", "-") for v in players]
+        if self.site == "dk":
+            labels = ["{} ({})".format(n, i) for n, i in zip(names, self.player_ids)]
+        else:
+            labels = ["{}:{}".format(i, n) for n, i in zip(names, self.player_ids)]
+        lineup_labels = np.array(labels, dtype=object)[lineups].T.tolist()
+        if self.use_contest_data:
+            roi_p = percents(roi / self.entry_fee / self.num_iterations)
+            roi_round = [
+                "${}".format(round(v, 2)) for v in (roi / self.num_iterations).tolist()
+            ]
+            stat_columns = [
+                fpts_p,
+                fieldFpts_p,
+                ceil_p,
+                salary,
+                win_p,
+                top10_p,
+                roi_p,
+                own_p,
+                own_s,
+                roi_round,
+            ]
+        else:
+            stat_columns = [
+                fpts_p,
+                fieldFpts_p,
+                ceil_p,
+                salary,
+                win_p,
+                top10_p,
+                own_p,
+                own_s,
+            ]
+        # an adaptive run also reports the precision it reached for every lineup
+        se_columns = []
+        if self.lineup_standard_errors is not None:
+            se_columns = [
+                ["{}%".format(round(v, 4)) for v in se.tolist()]
+                for se in self.lineup_standard_errors
+            ]
+        rows = zip(
+            *lineup_labels,
+            *stat_columns,
+            primaryStack,
+            secondaryStack,
+            lu_type,
+            simDupes,
+            *se_columns,
+        )
+
+        out_path = self.get_output_path("lineups")
         with open(out_path, "w") as f:
             if self.site == "dk":
                 if self.use_contest_data:
-                    f.write(
-                        "PG,SG,SF,PF,C,G,F,UTIL,Fpts Proj,Field Fpts Proj,Ceiling,Salary,Win %,Top 1%,ROI%,Proj. Own. Product,Own. Sum,Avg. Return,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes\n"
-                    )
+                    header = "PG,SG,SF,PF,C,G,F,UTIL,Fpts Proj,Field Fpts Proj,Ceiling,Salary,Win %,Top 1%,ROI%,Proj. Own. Product,Own. Sum,Avg. Return,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes"
                 else:
-                    f.write(
-                        "PG,SG,SF,PF,C,G,F,UTIL,Fpts Proj,Field Fpts Proj,Ceiling,Salary,Win %,Top 1%, Proj. Own. Product,Own. Sum,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes\n"
-                    )
+                    header = "PG,SG,SF,PF,C,G,F,UTIL,Fpts Proj,Field Fpts Proj,Ceiling,Salary,Win %,Top 1%, Proj. Own. Product,Own. Sum,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes"
             elif self.site == "fd":
                 if self.use_contest_data:
-                    f.write(
-                        "PG,PG,SG,SG,SF,SF,PF,PF,C,DST,Fpts Proj,Field Fpts Proj,Ceiling,Salary,Win %,Top 1%,ROI%,Proj. Own. Product,Own. Sum,Avg. Return,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes\n"
-                    )
+                    header = "PG,PG,SG,SG,SF,SF,PF,PF,C,DST,Fpts Proj,Field Fpts Proj,Ceiling,Salary,Win %,Top 1%,ROI%,Proj. Own. Product,Own. Sum,Avg. Return,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes"
                 else:
-                    f.write(
-                        "PG,PG,SG,SG,SF,SF,PF,PF,C,Fpts Proj,Field Fpts Proj,Ceiling,Salary,Win %,Top 1%,Proj. Own. Product,Own. Sum,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes\n"
-                    )
+                    header = "PG,PG,SG,SG,SF,SF,PF,PF,C,Fpts Proj,Field Fpts Proj,Ceiling,Salary,Win %,Top 1%,Proj. Own. Product,Own. Sum,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes"
+            se_header = ["Win % SE", "ROI% SE"][: len(se_columns)]
+            f.write(",".join([header] + se_header) + "\n")
 
-            for fpts, lineup_str in unique.items():
-                f.write("%s\n" % lineup_str)
+            csv.writer(f, lineterminator="\n").writerows(rows)
 
-        out_path = os.path.join(
-            os.path.dirname(__file__),
-            "../output/{}_gpp_sim_player_exposure_{}_{}.csv".format(
-                self.site, self.field_size, self.num_iterations
-            ),
-        )
+        out_path = self.get_output_path("player_exposure")
         with open(out_path, "w") as f:
             f.write(
                 "Player,Position,Team,Win%,Top1%,Sim. Own%,Proj. Own%,Avg. Return\n"
             )
-            unique_players = {}
-            for val in self.field_lineups.values():
-                for player in val["Lineup"]:
-                    if player not in unique_players:
-                        unique_players[player] = {
-                            "Wins": val["Wins"],
-                            "Top1Percent": val["Top1Percent"],
-                            "In": val["Count"],
-                            "ROI": val["ROI"],
-                        }
-                    else:
-                        unique_players[player]["Wins"] = (
-                            unique_players[player]["Wins"] + val["Wins"]
-                        )
-                        unique_players[player]["Top1Percent"] = (
-                            unique_players[player]["Top1Percent"] + val["Top1Percent"]
-                        )
-                        unique_players[player]["In"] += val["Count"]
-                        unique_players[player]["ROI"] = (
-                            unique_players[player]["ROI"] + val["ROI"]
-                        )
-
-            for player, data in unique_players.items():
-                field_p = round(data["In"] / self.field_size * 100, 2)
-                win_p = round(data["Wins"] / self.num_iterations * 100, 2)
-                top10_p = round(data["Top1Percent"] / self.num_iterations, 2)
-                roi_p = round(data["ROI"] / data["In"] / self.num_iterations, 2)
-                for k, v in self.player_dict.items():
-                    if player == v["ID"]:
-                        proj_own = v["Ownership"]
-                        p_name = v["Name"]
-                        position = "/".join(v.get("Position"))
-                        team = v.get("Team")
-                        break
-                f.write(
-                    "{},{},{},{}%,{}%,{}%,{}%,${}\n".format(
-                        p_name.replace("#", "-"),
-                        position,
-                        team,
-                        win_p,
-                        top10_p,
-                        field_p,
-                        proj_own,
-                        roi_p,
-                    )
+            # per player totals over every lineup rostering them, players in the order
+            # they first appear in the field
+            rostered = lineups.ravel()
+            num_slots = lineups.shape[1]
+            exposure_players, first_seen = np.unique(rostered, return_index=True)
+            exposure_players = exposure_players[np.argsort(first_seen)]
+
+            def player_totals(values):
+                totals = np.bincount(
+                    rostered,
+                    weights=np.repeat(values, num_slots),
+                    minlength=len(players),
                 )
+                return totals[exposure_players]
+
+            player_wins = player_totals(wins)
+            player_top1pct = player_totals(top1pct)
+            lineups_in = player_totals(simDupes)
+            player_roi = player_totals(roi)
+            exposure_rows = zip(
+                [players[p]["Name"].replace("#", "-") for p in exposure_players],
+                ["/".join(players[p]["Position"]) for p in exposure_players],
+                [players[p]["Team"] for p in exposure_players],
+                percents(player_wins / self.num_iterations),
+                percents(player_top1pct / self.num_iterations, scale=1),
+                percents(lineups_in / self.field_size),
+                ["{}%".format(players[p]["Ownership"]) for p in exposure_players],
+                [
+                    "${}".format(round(v, 2))
+                    for v in (player_roi / lineups_in / self.num_iterations).tolist()
+                ],
+            )
+            csv.writer(f, lineterminator="\n").writerows(exposure_rows)
@@ -42,8 +42,9 @@ class NBA_Late_Swaptimizer:
     randomness_amount = 0
     min_salary = None
 
-    def __init__(self, site=None, num_uniques=1):
+    def __init__(self, site=None, num_uniques=1, seed=None):
         self.site = site
+        self.rng = np.random.default_rng(seed)
         self.num_uniques = int(num_uniques)
         self.load_config()
         self.load_rules()
@@ -284,7 +285,7 @@ class NBA_Late_Swaptimizer:
             if self.randomness_amount != 0:
                 self.problem += (
                     plp.lpSum(
-                        np.random.normal(
+                        self.rng.normal(
                             self.player_dict[player]["Fpts"],
                             (
                                 self.player_dict[player]["StdDev"]
@@ -36,8 +36,9 @@ class NBA_Optimizer:
     randomness_amount = 0
     min_salary = None
 
-    def __init__(self, site=None, num_lineups=0, num_uniques=1):
+    def __init__(self, site=None, num_lineups=0, num_uniques=1, seed=None):
         self.site = site
+        self.rng = np.random.default_rng(seed)
         self.num_lineups = int(num_lineups)
         self.num_uniques = int(num_uniques)
         self.load_config()
@@ -192,7 +193,7 @@ class NBA_Optimizer:
         if self.randomness_amount != 0:
             self.problem += (
                 plp.lpSum(
-                    np.random.normal(
+                    self.rng.normal(
                         self.player_dict[player]["Fpts"],
                         (
                             self.player_dict[player]["StdDev"]
@@ -460,7 +461,7 @@ class NBA_Optimizer:
             if self.randomness_amount != 0:
                 self.problem += (
                     plp.lpSum(
-                        np.random.normal(
+                        self.rng.normal(
                             self.player_dict[player]["Fpts"],
                             (
                                 self.player_dict[player]["StdDev"]
@@ -1,4 +1,5 @@
 import csv
+import hashlib
 import json
 import math
 import os
@@ -14,17 +15,34 @@ import statistics
 import itertools
 import collections
 import re
-from scipy.stats import norm, kendalltau, multivariate_normal, gamma
+from scipy.stats import norm, kendalltau, gamma
+from scipy.sparse import csr_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
 from numba import njit, jit
+from nba_sim_utils import (
+    AdaptiveSim,
+    add_block_stats,
+    build_correlation_matrix,
+    correlated_outcomes,
+    draw_standard_normals,
+    get_copula_marginals,
+    load_covariance_factor,
+    new_block_stats,
+    score_ranked_block,
+)
 import sys
 
 @jit(nopython=True)  
 def salary_boost(salary, max_salary):
     return (salary / max_salary) ** 2
 
-class nba_showdown_simulator:
+
+# Correlation to teammates, by primary position
+TEAMMATE_CORRELATIONS = np.array([-0.1324, -0.1324, -0.0812, -0.0812, -0.1231, 0])
+
+
+class nba_showdown_simulator(AdaptiveSim):
     config = None
     player_dict = {}
     field_lineups = {}
@@ -51,6 +69,9 @@ class nba_showdown_simulator:
     correlation_rules = {}
     game_info = {}
     overlap_limit = 69
+    # no boom/bust floors and ceilings for an empirical distribution
+    outcome_distributions = ("normal", "gamma", "lognormal")
+    sim_name = "sd_sim"
     team_replacement_dict = {
         'PHO': 'PHX',
         'GS': 'GSW',
@@ -66,9 +87,20 @@ class nba_showdown_simulator:
         num_iterations,
         use_contest_data,
         use_lineup_input,
+        seed=None,
     ):
         self.site = site
         self.use_lineup_input = use_lineup_input
+        # every random stream in a run is spawned from its stage's child of this sequence
+        # (field lineups, outcome blocks, sampling benchmark), so the outcomes don't
+        # depend on how many field lineups were generated; a fixed seed reproduces the
+        # run on any number of cores
+        self.seed_sequence = np.random.SeedSequence(seed)
+        (
+            self.field_seed_sequence,
+            self.outcome_seed_sequence,
+            self.benchmark_seed_sequence,
+        ) = self.seed_sequence.spawn(3)
         self.load_config()
         self.load_rules()
 
@@ -85,6 +117,7 @@ class nba_showdown_simulator:
         self.load_player_ids(player_path)
         self.seen_lineups = {}
         self.seen_lineups_ix = {}
+        self.slot_multipliers = {"CPT": 1.5, "MVP": 2, "STAR": 1.5, "PRO": 1.2, "UTIL": 1}
 
         # ownership_path = os.path.join(
         #    os.path.dirname(__file__),
@@ -127,6 +160,7 @@ class nba_showdown_simulator:
 
         # self.adjust_default_stdev()
         self.assertPlayerDict()
+        self.index_players()
         self.num_iterations = int(num_iterations)
         self.get_optimal()
         if self.use_lineup_input:
@@ -162,6 +196,8 @@ class nba_showdown_simulator:
         self.max_pct_off_optimal = float(self.config["max_pct_off_optimal"])
         self.default_var = float(self.config["default_var"])
         self.correlation_rules = self.config["custom_correlations"]
+        # optional: outcome distribution, sampling and the adaptive iteration count
+        self.load_sim_options()
 
     def assertPlayerDict(self):
         for p, s in list(self.player_dict.items()):
@@ -172,6 +208,25 @@ class nba_showdown_simulator:
                 )
                 self.player_dict.pop(p)
 
+    # every roster position entry (CPT/UTIL, MVP/STAR/PRO/UTIL) gets its own index 0..N-1,
+    # which is what lineups store; UniqueKeys are only looked up again for output
+    def index_players(self):
+        self.player_keys = list(self.player_dict.keys())
+        self.unique_key_to_index = {}
+        for i, k in enumerate(self.player_keys):
+            self.player_dict[k]["Index"] = i
+            self.unique_key_to_index[self.player_dict[k]["UniqueKey"]] = i
+        # only UTIL entries are simulated; every other roster position scores as its
+        # player's UTIL outcome times the slot multiplier
+        key_to_index = {k: i for i, k in enumerate(self.player_keys)}
+        self.outcome_index = np.arange(len(self.player_keys))
+        self.outcome_weights = np.ones(len(self.player_keys))
+        for i, (player_name, roster_position, team) in enumerate(self.player_keys):
+            util_key = (player_name, "UTIL", team)
+            if util_key in key_to_index:
+                self.outcome_index[i] = key_to_index[util_key]
+                self.outcome_weights[i] = self.slot_multipliers[roster_position]
+
     # In order to make reasonable tournament lineups, we want to be close enough to the optimal that
     # a person could realistically land on this lineup. Skeleton here is taken from base `mlb_optimizer.py`
     def get_optimal(self):
@@ -663,81 +718,29 @@ class nba_showdown_simulator:
                 ]
                 # storing if this lineup was made by an optimizer or with the generation process in this script
                 error = False
-                for l in lineup:
-                    ids = [self.player_dict[k]["ID"] for k in self.player_dict]
-                    if l not in ids:
+                if len(lineup) < len(self.roster_construction):
+                    print("lineup {} is missing players".format(i))
+                    continue
+                lu = []
+                for slot, l in enumerate(lineup):
+                    if self.site == "dk":
+                        # DK uses a separate ID for the CPT and UTIL versions of a player
+                        unique_key = l
+                    else:
+                        unique_key = "{}:{}".format(
+                            self.roster_construction[slot], l.replace("-", "#")
+                        )
+                    if unique_key not in self.unique_key_to_index:
                         print("lineup {} is missing players {}".format(i, l))
                         if l in self.id_name_dict:
                             print(self.id_name_dict[l])
                         error = True
-                if len(lineup) < len(self.roster_construction):
-                    print("lineup {} is missing players".format(i))
-                    continue
-                # storing if this lineup was made by an optimizer or with the generation process in this script
-                error = False
-                if self.site == "fd":
-                    un_key_lu = []
-                    i = 0
-                    for l in lineup:
-                        l = l.replace("-", "#")
-                        ids = [self.player_dict[k]["ID"] for k in self.player_dict]
-                        if l not in ids:
-                            print("lineup {} is missing players {}".format(i, l))
-                            if l in self.id_name_dict:
-                                print(self.id_name_dict[l])
-                            error = True
-                        else:
-                            for k in self.player_dict:
-                                if self.player_dict[k]["ID"] == l:
-                                    if i == 0:
-                                        if (
-                                            self.player_dict[k]["rosterPosition"]
-                                            == "MVP"
-                                        ):
-                                            un_key_lu.append(
-                                                self.player_dict[k]["UniqueKey"]
-                                            )
-                                        else:
-                                            pass
-                                    elif i == 1:
-                                        if (
-                                            self.player_dict[k]["rosterPosition"]
-                                            == "STAR"
-                                        ):
-                                            un_key_lu.append(
-                                                self.player_dict[k]["UniqueKey"]
-                                            )
-                                        else:
-                                            pass
-                                    elif i == 2:
-                                        if (
-                                            self.player_dict[k]["rosterPosition"]
-                                            == "PRO"
-                                        ):
-                                            un_key_lu.append(
-                                                self.player_dict[k]["UniqueKey"]
-                                            )
-                                        else:
-                                            pass
-                                    else:
-                                        if (
-                                            self.player_dict[k]["rosterPosition"]
-                                            == "UTIL"
-                                        ):
-                                            un_key_lu.append(
-                                                self.player_dict[k]["UniqueKey"]
-                                            )
-                                        else:
-                                            pass
-                        i += 1
-                if len(lineup) < len(self.roster_construction):
-                    print("lineup {} is missing players".format(i))
-                    continue
-                lu = lineup if self.site == "dk" else un_key_lu
+                    else:
+                        lu.append(self.unique_key_to_index[unique_key])
                 if not error:
                     self.field_lineups[j] = {
                         "Lineup": {
-                            "Lineup": lu,
+                            "Lineup": np.array(lu, dtype=np.int16),
                             "Wins": 0,
                             "Top10": 0,
                             "ROI": 0,
@@ -755,7 +758,6 @@ class nba_showdown_simulator:
         pos,
         in_lineup,
         ownership,
-        ids,
         salaries,
         current_salary,
         remaining_salary,
@@ -778,24 +780,14 @@ class nba_showdown_simulator:
             # & ((teams != def_opp) if def_opp is not None else True)
         )[0]
         if len(valid_players) == 0:
-            # common_indices = set(np.where(pos > 0)[0]) & \
-            #     set(np.where(in_lineup == 0)[0]) & \
-            #     set(np.where(salaries <= remaining_salary)[0]) & \
-            #     set(np.where((current_salary + salaries >= salary_floor) if salary_floor is not None else True)[0]) & \
-            #     set(np.where((teams != def_opp) if def_opp is not None else True)[0])
-            # print(common_indices)
-            # print(current_salary, salary_floor, remaining_salary, k, np.where((current_salary + salaries >= salary_floor)), np.where(pos>0), np.where(salaries <= remaining_salary), np.where(in_lineup == 0), np.where(teams != def_opp) if def_opp is not None else True)
-            return None, None
-        plyr_list = ids[valid_players]
+            return None
         prob_list = ownership[valid_players] / ownership[valid_players].sum()
         if salary_ceiling:
             boosted_salaries = np.array([salary_boost(s, salary_ceiling) for s in salaries[valid_players]])
             boosted_probabilities = prob_list * boosted_salaries
             boosted_probabilities /= boosted_probabilities.sum()  # normalize to ensure it sums to 1
-            choice = rng.choice(plyr_list, p=boosted_probabilities)
-        else:
-            choice = rng.choice(plyr_list,p=prob_list)
-        return np.where(ids == choice)[0], choice
+            return rng.choice(valid_players, p=boosted_probabilities)
+        return rng.choice(valid_players, p=prob_list)
 
     @staticmethod
     def validate_lineup(
@@ -820,7 +812,7 @@ class nba_showdown_simulator:
     @staticmethod
     def generate_lineups(
         lu_num,
-        ids,
+        seed,
         in_lineup,
         pos_matrix,
         ownership,
@@ -834,11 +826,11 @@ class nba_showdown_simulator:
         opponents,
         overlap_limit,
         matchups,
-        new_player_dict,
+        sibling_indices,
         num_players_in_roster,
         site
     ):
-        rng = np.random.Generator(np.random.PCG64())
+        rng = np.random.Generator(np.random.PCG64(seed))
         lus = {}
         in_lineup.fill(0)
         iteration_count = 0
@@ -848,16 +840,14 @@ class nba_showdown_simulator:
             lineup, player_teams, lineup_matchups = [], [], []
             def_opp, players_opposing_def, cpt_selected = None, 0, False
             in_lineup.fill(0)
-            cpt_name = None
             remaining_salary = salary_ceiling
 
             for k, pos in enumerate(pos_matrix.T):
                 position_constraint = k >= 1 and players_opposing_def < overlap_limit
-                choice_idx, choice = nba_showdown_simulator.select_player(
+                choice_idx = nba_showdown_simulator.select_player(
                     pos,
                     in_lineup,
                     ownership,
-                    ids,
                     salaries,
                     salary,
                     remaining_salary,
@@ -868,134 +858,27 @@ class nba_showdown_simulator:
                     def_opp if position_constraint else None,
                     teams if position_constraint else None,
                 )
-                if choice is None:
-                    iteration_count += 1
-                    salary, proj = 0, 0
-                    lineup, player_teams, lineup_matchups = [], [], []
-                    def_opp, players_opposing_def, cpt_selected = None, 0, False
-                    in_lineup.fill(0)
-                    cpt_name = None
-                    remaining_salary = salary_ceiling
-                    continue
-                if site == 'dk':
-                    if k == 0:
-                        cpt_player_info = new_player_dict[choice]
-                        UTIL_choice_idx = next(
-                            (
-                                i
-                                for i, v in enumerate(new_player_dict.values())
-                                if v["Name"] == cpt_player_info["Name"]
-                                and v["Team"] == cpt_player_info["Team"]
-                                and v["Position"] == cpt_player_info["Position"]
-                                and v["rosterPosition"] == "UTIL"
-                            ),
-                            None,
-                        )
-                        if UTIL_choice_idx is not None:
-                            in_lineup[UTIL_choice_idx] = 1
-                        def_opp = opponents[choice_idx][0]
-                        cpt_selected = True
-                if site == 'fd':
-                    if k == 0:
-                        mvp_player_info = new_player_dict[choice]
-                        STAR_choice_idx = next(
-                            (
-                                i
-                                for i, v in enumerate(new_player_dict.values())
-                                if v["Name"] == mvp_player_info["Name"]
-                                and v["Team"] == mvp_player_info["Team"]
-                                and v["Position"] == mvp_player_info["Position"]
-                                and v["rosterPosition"] == "STAR"
-                            ),
-                            None,
-                        )
-                        if STAR_choice_idx is not None:
-                            in_lineup[STAR_choice_idx] = 1
-                        PRO_choice_idx = next(
-                            (
-                                i
-                                for i, v in enumerate(new_player_dict.values())
-                                if v["Name"] == mvp_player_info["Name"]
-                                and v["Team"] == mvp_player_info["Team"]
-                                and v["Position"] == mvp_player_info["Position"]
-                                and v["rosterPosition"] == "PRO"
-                            ),
-                            None,
-                        )
-                        if PRO_choice_idx is not None:
-                            in_lineup[PRO_choice_idx] = 1                     
-                        UTIL_choice_idx = next(
-                            (
-                                i
-                                for i, v in enumerate(new_player_dict.values())
-                                if v["Name"] == mvp_player_info["Name"]
-                                and v["Team"] == mvp_player_info["Team"]
-                                and v["Position"] == mvp_player_info["Position"]
-                                and v["rosterPosition"] == "UTIL"
-                            ),
-                            None,
-                        )
-                        if UTIL_choice_idx is not None:
-                            in_lineup[UTIL_choice_idx] = 1
-                        def_opp = opponents[choice_idx][0]
-                    elif k == 1:
-                        star_player_info = new_player_dict[choice]
-                        PRO_choice_idx = next(
-                            (
-                                i
-                                for i, v in enumerate(new_player_dict.values())
-                                if v["Name"] == star_player_info["Name"]
-                                and v["Team"] == star_player_info["Team"]
-                                and v["Position"] == star_player_info["Position"]
-                                and v["rosterPosition"] == "PRO"
-                            ),
-                            None,
-                        )
-                        if PRO_choice_idx is not None:
-                            in_lineup[PRO_choice_idx] = 1
-                        UTIL_choice_idx = next(
-                            (
-                                i
-                                for i, v in enumerate(new_player_dict.values())
-                                if v["Name"] == star_player_info["Name"]
-                                and v["Team"] == star_player_info["Team"]
-                                and v["Position"] == star_player_info["Position"]
-                                and v["rosterPosition"] == "UTIL"
-                            ),
-                            None,
-                        )
-                        if UTIL_choice_idx is not None:
-                            in_lineup[UTIL_choice_idx] = 1
-                    elif k == 2:
-                        pro_player_info = new_player_dict[choice]
-                        UTIL_choice_idx = next(
-                            (
-                                i
-                                for i, v in enumerate(new_player_dict.values())
-                                if v["Name"] == pro_player_info["Name"]
-                                and v["Team"] == pro_player_info["Team"]
-                                and v["Position"] == pro_player_info["Position"]
-                                and v["rosterPosition"] == "UTIL"
-                            ),
-                            None,
-                        )
-                        if UTIL_choice_idx is not None:
-                            in_lineup[UTIL_choice_idx] = 1
-                         
-                        
-                lineup.append(str(choice))
+                if choice_idx is None:
+                    break
+                if k == 0:
+                    def_opp = opponents[choice_idx]
+                    cpt_selected = True
+                # the same player can't be rostered again at another roster position
+                in_lineup[sibling_indices[choice_idx]] = 1
+
+                lineup.append(choice_idx)
                 in_lineup[choice_idx] = 1
                 salary += salaries[choice_idx]
                 proj += projections[choice_idx]
                 remaining_salary = salary_ceiling - salary
 
-                # lineup_matchups.append(matchups[choice_idx[0]])
-                player_teams.append(teams[choice_idx][0])
+                # lineup_matchups.append(matchups[choice_idx])
+                player_teams.append(teams[choice_idx])
 
-                if teams[choice_idx][0] == def_opp:
+                if teams[choice_idx] == def_opp:
                     players_opposing_def += 1
 
-            if nba_showdown_simulator.validate_lineup(
+            if len(lineup) == num_players_in_roster and nba_showdown_simulator.validate_lineup(
                 salary,
                 salary_floor,
                 salary_ceiling,
@@ -1005,7 +888,7 @@ class nba_showdown_simulator:
                 player_teams,
             ):
                 lus[lu_num] = {
-                    "Lineup": lineup,
+                    "Lineup": np.array(lineup, dtype=np.int16),
                     "Wins": 0,
                     "Top10": 0,
                     "ROI": 0,
@@ -1015,16 +898,6 @@ class nba_showdown_simulator:
                 break
         return lus
 
-    def remap_player_dict(self, player_dict):
-        remapped_dict = {}
-        for key, value in player_dict.items():
-            if "UniqueKey" in value:
-                player_id = value["UniqueKey"]
-                remapped_dict[player_id] = value
-            else:
-                raise KeyError(f"Player details for {key} does not contain an 'ID' key")
-        return remapped_dict
-
     def generate_field_lineups(self):
         diff = self.field_size - len(self.field_lineups)
         if diff <= 0:
@@ -1072,7 +945,8 @@ class nba_showdown_simulator:
             [],
             [],
         )
-        for player_info in self.player_dict.values():
+        for k in self.player_keys:
+            player_info = self.player_dict[k]
             if "Team" not in player_info:
                 print(
                     f"{player_info['Name']} name mismatch between projections and player ids!"
@@ -1115,14 +989,15 @@ class nba_showdown_simulator:
         ownership, salaries, projections, pos_matrix = map(
             np.array, [ownership, salaries, projections, positions]
         )
-        teams, opponents, ids = map(np.array, [teams, opponents, ids])
-        new_player_dict = self.remap_player_dict(self.player_dict)
+        teams, opponents = map(np.array, [teams, opponents])
+        sibling_indices = self.get_sibling_indices()
         num_players_in_roster = len(self.roster_construction)
         problems = []
+        seeds = self.field_seed_sequence.spawn(diff)
         for i in range(diff):
             lu_tuple = (
                 i,
-                ids,
+                seeds[i],
                 in_lineup,
                 pos_matrix,
                 ownership,
@@ -1136,7 +1011,7 @@ class nba_showdown_simulator:
                 opponents,
                 self.overlap_limit,
                 matchups,
-                new_player_dict,
+                sibling_indices,
                 num_players_in_roster,
                 self.site
             )
@@ -1144,6 +1019,20 @@ class nba_showdown_simulator:
         # print(self.player_dict.keys())
         return problems
 
+    def get_sibling_indices(self):
+        # for each player index, the indices of the same player at the other roster positions
+        groups = collections.defaultdict(list)
+        for i, k in enumerate(self.player_keys):
+            v = self.player_dict[k]
+            groups[(v["Name"], v["Team"], v["Position"])].append(i)
+        sibling_indices = []
+        for k in self.player_keys:
+            v = self.player_dict[k]
+            sibling_indices.append(
+                np.array(groups[(v["Name"], v["Team"], v["Position"])], dtype=np.int64)
+            )
+        return sibling_indices
+
     def handle_stacks_logic(self, diff):
         stacks = np.random.binomial(
             n=1, p=self.pct_field_using_stacks, size=diff
@@ -1177,8 +1066,7 @@ class nba_showdown_simulator:
 
         nk = new_keys[0]
         for i, o in enumerate(output):
-            lineup_list = sorted(next(iter(o.values()))["Lineup"])
-            lineup_set = frozenset(lineup_list)  # Convert the list to a frozenset
+            lineup_set = frozenset(next(iter(o.values()))["Lineup"].tolist())
 
             # Keeping track of lineup duplication counts
             if lineup_set in self.seen_lineups:
@@ -1202,74 +1090,28 @@ class nba_showdown_simulator:
                     self.seen_lineups_ix[lineup_set] = nk
                     nk += 1
 
-    def calc_gamma(self, mean, sd):
-        alpha = (mean / sd) ** 2
-        beta = sd**2 / mean
-        return alpha, beta
-
-    def run_simulation_for_game(self, team1_id, team1, team2_id, team2, num_iterations):
-        def get_corr_value(player1, player2):
-            # First, check for specific player-to-player correlations
-            if player2["Name"] in player1.get("Player Correlations", {}):
-                return player1["Player Correlations"][player2["Name"]]
-            
-            # If no specific correlation is found, proceed with the general logic
-            position_correlations = {
-                "PG": -0.1324,
-                "SG": -0.1324,
-                "SF": -0.0812,
-                "PF": -0.0812,
-                "C": -0.1231
-            }
-
-            if player1["Team"] == player2["Team"] and player1["Position"][0] in ["PG", "SG", "SF", "PF", "C"]:
-                primary_position = player1["Position"][0]
-                return position_correlations[primary_position]
-
-            if player1["Team"] != player2["Team"]:
-                player_2_pos = "Opp " + str(player2["Position"][0])
-            else:
-                player_2_pos = player2["Position"][0]
-
-            return player1["Correlations"].get(player_2_pos, 0)  # Default to 0 if no correlation is found
-
-        def build_covariance_matrix(players):
-            N = len(players)
-            matrix = [[0 for _ in range(N)] for _ in range(N)]
-            corr_matrix = [[0 for _ in range(N)] for _ in range(N)]
-
-            for i in range(N):
-                for j in range(N):
-                    if i == j:
-                        matrix[i][j] = (
-                            players[i]["StdDev"] ** 2
-                        )  # Variance on the diagonal
-                        corr_matrix[i][j] = 1
-                    else:
-                        matrix[i][j] = (
-                            get_corr_value(players[i], players[j])
-                            * players[i]["StdDev"]
-                            * players[j]["StdDev"]
-                        )
-                        corr_matrix[i][j] = get_corr_value(players[i], players[j])
-            return matrix, corr_matrix
-
-        def ensure_positive_semidefinite(matrix):
-            eigs = np.linalg.eigvals(matrix)
-            if np.any(eigs < 0):
-                jitter = abs(min(eigs)) + 1e-6  # a small value
-                matrix += np.eye(len(matrix)) * jitter
-
-            # Given eigenvalues and eigenvectors from previous code
-            eigenvalues, eigenvectors = np.linalg.eigh(matrix)
-
-            # Set negative eigenvalues to zero
-            eigenvalues[eigenvalues < 0] = 0
-
-            # Reconstruct the matrix
-            matrix = eigenvectors.dot(np.diag(eigenvalues)).dot(eigenvectors.T)
-            return matrix
+    def get_game_factor(self, game):
+        # covariance factor for the game's players, cached in output/ keyed by the
+        # players and their covariances so re-running the slate skips the decomposition
+        corr_matrix = build_correlation_matrix(
+            game, TEAMMATE_CORRELATIONS, same_position_only=False
+        )
+        stddevs = np.array([player["StdDev"] for player in game], dtype=float)
+        covariance_matrix = corr_matrix * np.outer(stddevs, stddevs)
+        key = hashlib.sha1(
+            json.dumps([player["UniqueKey"] for player in game]).encode()
+            + covariance_matrix.tobytes()
+        ).hexdigest()[:16]
+        path = os.path.join(
+            os.path.dirname(__file__),
+            "../output/{}_sd_sim_game_factor_{}.npy".format(self.site, key),
+        )
+        # an indefinite matrix is shifted up by a small jitter
+        return load_covariance_factor(path, covariance_matrix, jitter=True)
 
+    def run_simulation_for_game(
+        self, team1_id, team1, team2_id, team2, num_iterations, sampling, seed
+    ):
         # Filter out players with projections less than or equal to 0
         team1 = [
             player
@@ -1283,15 +1125,16 @@ class nba_showdown_simulator:
         ]
 
         game = team1 + team2
-        covariance_matrix, corr_matrix = build_covariance_matrix(game)
-        covariance_matrix = ensure_positive_semidefinite(covariance_matrix)
-
+        means = np.array([player["Fpts"] for player in game], dtype=float)
         try:
-            samples = multivariate_normal.rvs(
-                mean=[player["Fpts"] for player in game],
-                cov=covariance_matrix,
-                size=num_iterations,
+            game_factor = self.get_game_factor(game)
+            normals = draw_standard_normals(
+                np.random.default_rng(seed), len(game), num_iterations, sampling
             )
+            marginals = get_copula_marginals(
+                self.outcome_distribution, means, game_factor
+            )
+            samples = correlated_outcomes(game_factor, normals, means, marginals).T
         except Exception as e:
             print(f"{team1_id}, {team2_id}, bad matrix: {str(e)}")
             return {}
@@ -1361,165 +1204,85 @@ class nba_showdown_simulator:
 
         return temp_fpts_dict
 
-    @staticmethod
-    @jit(nopython=True)
-    def calculate_payouts(args):
-        (
-            ranks,
-            payout_array,
-            entry_fee,
-            field_lineup_keys,
-            use_contest_data,
-            field_lineups_count,
-        ) = args
-        num_lineups = len(field_lineup_keys)
-        combined_result_array = np.zeros(num_lineups)
-
-        payout_cumsum = np.cumsum(payout_array)
-
-        for r in range(ranks.shape[1]):
-            ranks_in_sim = ranks[:, r]
-            payout_index = 0
-            for lineup_index in ranks_in_sim:
-                lineup_count = field_lineups_count[lineup_index]
-                prize_for_lineup = (
-                    (
-                        payout_cumsum[payout_index + lineup_count - 1]
-                        - payout_cumsum[payout_index - 1]
-                    )
-                    / lineup_count
-                    if payout_index != 0
-                    else payout_cumsum[payout_index + lineup_count - 1] / lineup_count
-                )
-                combined_result_array[lineup_index] += prize_for_lineup
-                payout_index += lineup_count
-        return combined_result_array
+    def get_lineup_incidence(self):
+        # sparse (lineups x players) matrix; each rostered entry points at its player's UTIL
+        # row of the outcome matrix, weighted by the slot multiplier (CPT 1.5x, MVP 2x, ...)
+        lineups = np.array(
+            [v["Lineup"]["Lineup"] for v in self.field_lineups.values()], dtype=np.int64
+        )
+        rows = np.repeat(np.arange(len(lineups)), lineups.shape[1])
+        return csr_matrix(
+            (
+                self.outcome_weights[lineups.ravel()].astype(np.float32),
+                (rows, self.outcome_index[lineups.ravel()]),
+            ),
+            shape=(len(lineups), len(self.player_keys)),
+        )
 
     def run_tournament_simulation(self):
         print(f"Running {self.num_iterations} simulations")
         print(f"Number of unique field lineups: {len(self.field_lineups.keys())}")
 
-        def generate_cpt_outcomes(UTIL_dict):
-            cpt_dict = {}
-            for player_id, UTIL_outcomes in UTIL_dict.items():
-                # Fetch team information using the player_id
-                # Assuming self.player_dict uses a structure like {(player_name, position, team): player_data}
-                player_data_UTIL = [
-                    data
-                    for (name, pos, team), data in self.player_dict.items()
-                    if data["UniqueKey"] == player_id and pos == "UTIL"
-                ]
-                if player_data_UTIL:
-                    player_data_UTIL = player_data_UTIL[
-                        0
-                    ]  # Get the first match (there should only be one)
-                    team = player_data_UTIL["Team"]
-
-                    # Fetch the CPT data using the player_name and team fetched from the above step
-                    player_data_cpt = self.player_dict.get(
-                        (player_data_UTIL["Name"], "CPT", team)
-                    )
-                    if player_data_cpt:
-                        cpt_outcomes = UTIL_outcomes * 1.5
-                        cpt_dict[player_data_cpt["UniqueKey"]] = cpt_outcomes
-            return cpt_dict
-
-        def generate_fd_outcomes(UTIL_dict):
-            mvp_dict = {}
-            for player_id, UTIL_outcomes in UTIL_dict.items():
-                # Fetch team information using the player_id
-                # Assuming self.player_dict uses a structure like {(player_name, position, team): player_data}
-                player_data_UTIL = [
-                    data
-                    for (name, pos, team), data in self.player_dict.items()
-                    if data["UniqueKey"] == player_id and pos == "UTIL"
-                ]
-                if player_data_UTIL:
-                    player_data_UTIL = player_data_UTIL[
-                        0
-                    ]  # Get the first match (there should only be one)
-                    team = player_data_UTIL["Team"]
-
-                    # Fetch the CPT data using the player_name and team fetched from the above step
-                    player_data_mvp = self.player_dict.get(
-                        (player_data_UTIL["Name"], "MVP", team)
-                    )
-                    if player_data_mvp:
-                        mvp_outcomes = UTIL_outcomes * 2
-                        mvp_dict[player_data_mvp["UniqueKey"]] = mvp_outcomes
-                    player_data_star = self.player_dict.get(
-                        (player_data_UTIL["Name"], "STAR", team)
-                    )
-                    if player_data_star:
-                        star_outcomes = UTIL_outcomes * 1.5
-                        mvp_dict[player_data_star["UniqueKey"]] = star_outcomes
-                    player_data_pro = self.player_dict.get(
-                        (player_data_UTIL["Name"], "PRO", team)
-                    )
-                    if player_data_pro:
-                        pro_outcomes = UTIL_outcomes * 1.2
-                        mvp_dict[player_data_pro["UniqueKey"]] = pro_outcomes
-            return mvp_dict
-
         start_time = time.time()
-        temp_fpts_dict = {}
 
-        # Get the only matchup since it's a showdown
-        matchup = list(self.matchups)[0]
+        # iterations run in blocks, each with its own seed, so an adaptive run can check
+        # its stopping rule as it goes; a fixed iteration count is a single block
+        adaptive = self.is_adaptive()
+        block_size = self.convergence_block_size if adaptive else self.num_iterations
+        self.check_sobol_draws(block_size)
+        blocks = [
+            (i, min(i + block_size, self.num_iterations))
+            for i in range(0, self.num_iterations, block_size)
+        ]
+        seeds = self.outcome_seed_sequence.spawn(len(blocks))
 
-        # Prepare the arguments for the simulation function
-        game_simulation_params = (
-            matchup[0],
-            self.teams_dict[matchup[0]],
-            matchup[1],
-            self.teams_dict[matchup[1]],
-            self.num_iterations,
+        tournament = self.get_tournament_inputs()
+
+        index_to_key = list(self.field_lineups.keys())
+        # tied lineups share their finishes, so the counts are fractional
+        wins = np.zeros(len(index_to_key))
+        top10 = np.zeros(len(index_to_key))
+        roi = np.zeros(len(index_to_key))
+        stats = new_block_stats(len(index_to_key))
+        for (start, stop), seed in zip(blocks, seeds):
+            block_wins, block_top10, block_roi = self.simulate_tournament_block(
+                stop - start, self.sampling, seed, *tournament
+            )
+            wins += block_wins
+            top10 += block_top10
+            roi += block_roi
+            add_block_stats(stats, block_wins, block_roi, stop - start)
+            if adaptive and self.has_converged(
+                wins, roi, stats, time.time() - start_time
+            ):
+                break
+        self.num_iterations = stats["iterations"]
+        if adaptive:
+            self.report_convergence(wins, roi, stats)
+
+        for idx, lineup_key in enumerate(index_to_key):
+            self.field_lineups[lineup_key]["Lineup"]["ROI"] += roi[idx]
+            self.field_lineups[lineup_key]["Lineup"]["Wins"] += wins[idx]
+            self.field_lineups[lineup_key]["Lineup"]["Top10"] += top10[idx]
+
+        end_time = time.time()
+        diff = end_time - start_time
+        print(
+            str(self.num_iterations)
+            + " tournament simulations finished in "
+            + str(diff)
+            + " seconds. Outputting."
         )
 
-        # Run the simulation for the single game
-        temp_fpts_dict.update(self.run_simulation_for_game(*game_simulation_params))
-        if self.site == 'dk':
-            cpt_outcomes_dict = generate_cpt_outcomes(temp_fpts_dict)
-            temp_fpts_dict.update(cpt_outcomes_dict)
-        elif self.site == 'fd':
-            cpt_outcomes_dict = generate_fd_outcomes(temp_fpts_dict)
-            temp_fpts_dict.update(cpt_outcomes_dict)            
-        
-        # generate arrays for every sim result for each player in the lineup and sum
-        fpts_array = np.zeros(shape=(len(self.field_lineups), self.num_iterations))
-        # converting payout structure into an np friendly format, could probably just do this in the load contest function
-        # print(self.field_lineups)
-        # print(temp_fpts_dict)
-        # print(payout_array)
-        # print(self.player_dict[('patrick mahomes', 'UTIL', 'KC')])
+    def get_tournament_inputs(self):
+        # the showdown's only game, the lineup incidence matrix, the payouts net of the
+        # entry fee and the lineup counts that simulate_tournament_block scores the
+        # field with
+        matchup = list(self.matchups)[0]
+        incidence = self.get_lineup_incidence()
         field_lineups_count = np.array(
             [self.field_lineups[idx]["count"] for idx in self.field_lineups.keys()]
         )
-
-        #print(self.player_dict)
-        for index, values in self.field_lineups.items():
-            try:
-                fpts_sim = sum(
-                    [temp_fpts_dict[player] for player in values["Lineup"]["Lineup"]]
-                )
-            except KeyError:
-                for player in values["Lineup"]["Lineup"]:
-                    if player not in temp_fpts_dict.keys():
-                        print(player)
-                        # for k,v in self.player_dict.items():
-                        # if v['ID'] == player:
-                        #        print(k,v)
-                # print('cant find player in sim dict', values["Lineup"], temp_fpts_dict.keys())
-            # store lineup fpts sum in 2d np array where index (row) corresponds to index of field_lineups and columns are the fpts from each sim
-            fpts_array[index] = fpts_sim
-
-        fpts_array = fpts_array.astype(np.float16)
-        # ranks = np.argsort(fpts_array, axis=0)[::-1].astype(np.uint16)
-        ranks = np.argsort(-fpts_array, axis=0).astype(np.uint32)
-
-        # count wins, top 10s vectorized
-        wins, win_counts = np.unique(ranks[0, :], return_counts=True)
-        t10, t10_counts = np.unique(ranks[0:9], return_counts=True)
         payout_array = np.array(list(self.payout_structure.values()))
         # subtract entry fee
         payout_array = payout_array - self.entry_fee
@@ -1527,64 +1290,71 @@ class nba_showdown_simulator:
             shape=self.field_size - len(payout_array), fill_value=-self.entry_fee
         )
         payout_array = np.concatenate((payout_array, l_array))
-        field_lineups_keys_array = np.array(list(self.field_lineups.keys()))
-
-        # Adjusted ROI calculation
-        # print(field_lineups_count.shape, payout_array.shape, ranks.shape, fpts_array.shape)
-
-        # Split the simulation indices into chunks
-        field_lineups_keys_array = np.array(list(self.field_lineups.keys()))
-
-        chunk_size = self.num_iterations // 16  # Adjust chunk size as needed
-        simulation_chunks = [
-            (
-                ranks[:, i : min(i + chunk_size, self.num_iterations)].copy(),
-                payout_array,
-                self.entry_fee,
-                field_lineups_keys_array,
-                self.use_contest_data,
-                field_lineups_count,
-            )  # Adding field_lineups_count here
-            for i in range(0, self.num_iterations, chunk_size)
-        ]
-
-        # Use the pool to process the chunks in parallel
-        with mp.Pool() as pool:
-            results = pool.map(self.calculate_payouts, simulation_chunks)
+        return matchup, incidence, payout_array, field_lineups_count
+
+    def simulate_replicates(self, sampling, num_iterations, seeds):
+        # every field lineup's wins and ROI in an independent sim of num_iterations with
+        # this sampling for each seed, for benchmark_sampling
+        tournament = self.get_tournament_inputs()
+        results = []
+        for seed in seeds:
+            wins, _, roi = self.simulate_tournament_block(
+                num_iterations, sampling, seed, *tournament
+            )
+            results.append((wins, roi))
+        return results
 
-        combined_result_array = np.sum(results, axis=0)
-        total_sum = 0
-        index_to_key = list(self.field_lineups.keys())
-        for idx, roi in enumerate(combined_result_array):
-            lineup_key = index_to_key[idx]
-            lineup_count = self.field_lineups[lineup_key][
-                "count"
-            ]  # Assuming "Count" holds the count of the lineups
-            total_sum += roi * lineup_count
-            self.field_lineups[lineup_key]["Lineup"]["ROI"] += roi
-
-        for idx in self.field_lineups.keys():
-            if idx in wins:
-                self.field_lineups[idx]["Lineup"]["Wins"] += win_counts[
-                    np.where(wins == idx)
-                ][0]
-            if idx in t10:
-                self.field_lineups[idx]["Lineup"]["Top10"] += t10_counts[
-                    np.where(t10 == idx)
-                ][0]
+    def simulate_tournament_block(
+        self,
+        num_iterations,
+        sampling,
+        seed,
+        matchup,
+        incidence,
+        payout_array,
+        field_lineups_count,
+    ):
+        # simulates the game for one block of iterations, then scores, ranks and pays
+        # out the field; returns every lineup's wins, top 10s and ROI over the block
+        temp_fpts_dict = self.run_simulation_for_game(
+            matchup[0],
+            self.teams_dict[matchup[0]],
+            matchup[1],
+            self.teams_dict[matchup[1]],
+            num_iterations,
+            sampling,
+            seed,
+        )
 
-        end_time = time.time()
-        diff = end_time - start_time
-        print(
-            str(self.num_iterations)
-            + " tournament simulations finished in "
-            + str(diff)
-            + " seconds. Outputting."
+        # simulated UTIL outcomes as a (players x iterations) matrix in player index order
+        player_fpts = np.zeros(
+            shape=(len(self.player_keys), num_iterations), dtype=np.float32
         )
+        for unique_key, samples in temp_fpts_dict.items():
+            if unique_key in self.unique_key_to_index:
+                player_fpts[self.unique_key_to_index[unique_key]] = samples
+
+        # score the field as (lineups x players) @ (players x iterations) in float32, so
+        # lineups only tie when their scores really are the same
+        fpts_array = incidence @ player_fpts
+
+        # only the top 10 and the paid places are ranked; ties split the wins, top 10s
+        # and prizes, paid out in-process across numba's threads
+        num_ranked = max(len(self.payout_structure), 10)
+        (wins, top10), roi = score_ranked_block(
+            fpts_array,
+            num_ranked,
+            [1, 10],
+            payout_array,
+            self.entry_fee,
+            field_lineups_count,
+            parallel=True,
+        )
+        return wins, top10, roi
 
     def output(self):
         unique = {}
-        for index, data in self.field_lineups.items():
+        for i, (index, data) in enumerate(self.field_lineups.items()):
             # if index == 0:
             #    print(data)
             lineup = data["Lineup"]["Lineup"]
@@ -1603,12 +1373,8 @@ class nba_showdown_simulator:
             def_opps = []
             players_vs_def = 0
 
-            player_dict_values = {
-                v["UniqueKey"]: v for k, v in self.player_dict.items()
-            }
-
-            for player_id in lineup:
-                player_data = player_dict_values.get(player_id, {})
+            for player in lineup:
+                player_data = self.player_dict[self.player_keys[player]]
                 if player_data:
                     if "DST" in player_data["Position"]:
                         def_opps.append(player_data["Opp"])
@@ -1663,6 +1429,10 @@ class nba_showdown_simulator:
                 lineup_str = f"{lu_type},{','.join(lu_names)},{salary},{fpts_p},{fieldFpts_p},{ceil_p},{primary_stack},{secondary_stack},{win_p}%,{top10_p}%,{cash_p}%,{own_p},{own_s},{roi_p}%,${roi_round},{num_dupes}"
             else:
                 lineup_str = f"{lu_type},{','.join(lu_names)},{salary},{fpts_p},{fieldFpts_p},{ceil_p},{primary_stack},{secondary_stack},{win_p}%,{top10_p}%,{cash_p}%,{own_p},{own_s},{num_dupes}"
+            # an adaptive run also reports the precision it reached for every lineup
+            if self.lineup_standard_errors is not None:
+                for se in self.lineup_standard_errors:
+                    lineup_str += ",{}%".format(round(se[i], 4))
             unique[
                 lineup_str
             ] = fpts_p  # Changed data["Fpts"] to fpts_p, which contains the accumulated Fpts
@@ -1687,29 +1457,26 @@ class nba_showdown_simulator:
             for val in self.field_lineups.values():
                 lineup_data = val["Lineup"]
                 counts = val["count"]
-                for player_id in lineup_data["Lineup"]:
-                    if player_id not in unique_players:
-                        unique_players[player_id] = {
+                for player in lineup_data["Lineup"]:
+                    if player not in unique_players:
+                        unique_players[player] = {
                             "Wins": lineup_data["Wins"],
                             "Top10": lineup_data["Top10"],
                             "In": val["count"],
                             "ROI": lineup_data["ROI"],
                         }
                     else:
-                        unique_players[player_id]["Wins"] += lineup_data["Wins"]
-                        unique_players[player_id]["Top10"] += lineup_data["Top10"]
-                        unique_players[player_id]["In"] += val["count"]
-                        unique_players[player_id]["ROI"] += lineup_data["ROI"]
+                        unique_players[player]["Wins"] += lineup_data["Wins"]
+                        unique_players[player]["Top10"] += lineup_data["Top10"]
+                        unique_players[player]["In"] += val["count"]
+                        unique_players[player]["ROI"] += lineup_data["ROI"]
 
-            for player_id, data in unique_players.items():
+            for player, data in unique_players.items():
                 field_p = round(data["In"] / self.field_size * 100, 2)
                 win_p = round(data["Wins"] / self.num_iterations * 100, 2)
                 top10_p = round(data["Top10"] / self.num_iterations / 10 * 100, 2)
                 roi_p = round(data["ROI"] / data["In"] / self.num_iterations, 2)
-                for k, v in self.player_dict.items():
-                    if v["UniqueKey"] == player_id:
-                        player_info = v
-                        break
+                player_info = self.player_dict[self.player_keys[player]]
                 proj_own = player_info.get("Ownership", "N/A")
                 p_name = player_info.get("Name", "N/A").replace("#", "-")
                 sd_position = player_info.get("rosterPosition", ["N/A"])
@@ -1732,30 +1499,33 @@ class nba_showdown_simulator:
                 self.site, self.field_size, self.num_iterations, now
             ),
         )
+        se_header = ""
+        if self.lineup_standard_errors is not None:
+            se_header = ",Win % SE,ROI% SE" if self.use_contest_data else ",Win % SE"
         if self.site == "dk":
             if self.use_contest_data:
                 with open(out_path, "w") as f:
-                    header = "Type,CPT,UTIL,UTIL,UTIL,UTIL,UTIL,Salary,Fpts Proj,Field Fpts Proj,Ceiling,Primary Stack,Secondary Stack,Win %,Top 10%,Cash %,Proj. Own. Product,Proj. Own. Sum,ROI%,ROI$,Num Dupes\n"
-                    f.write(header)
+                    header = "Type,CPT,UTIL,UTIL,UTIL,UTIL,UTIL,Salary,Fpts Proj,Field Fpts Proj,Ceiling,Primary Stack,Secondary Stack,Win %,Top 10%,Cash %,Proj. Own. Product,Proj. Own. Sum,ROI%,ROI$,Num Dupes"
+                    f.write(header + se_header + "\n")
                     for lineup_str, fpts in unique.items():
                         f.write(f"{lineup_str}\n")
             else:
                 with open(out_path, "w") as f:
-                    header = "Type,CPT,UTIL,UTIL,UTIL,UTIL,UTIL,Salary,Fpts Proj,Field Fpts Proj,Ceiling,Primary Stack,Secondary Stack,Win %,Top 10%,Cash %,Proj. Own. Product,Proj. Own. Sum,Num Dupes\n"
-                    f.write(header)
+                    header = "Type,CPT,UTIL,UTIL,UTIL,UTIL,UTIL,Salary,Fpts Proj,Field Fpts Proj,Ceiling,Primary Stack,Secondary Stack,Win %,Top 10%,Cash %,Proj. Own. Product,Proj. Own. Sum,Num Dupes"
+                    f.write(header + se_header + "\n")
                     for lineup_str, fpts in unique.items():
                         f.write(f"{lineup_str}\n")
         else:
             if self.use_contest_data:
                 with open(out_path, "w") as f:
-                    header = "Type,MVP,STAR,PRO,UTIL,UTIL,Salary,Fpts Proj,Field Fpts Proj,Ceiling,Primary Stack,Secondary Stack,Win %,Top 10%,Cash %,Proj. Own. Product,Proj. Own. Sum,ROI,ROI/Entry Fee,Num Dupes\n"
-                    f.write(header)
+                    header = "Type,MVP,STAR,PRO,UTIL,UTIL,Salary,Fpts Proj,Field Fpts Proj,Ceiling,Primary Stack,Secondary Stack,Win %,Top 10%,Cash %,Proj. Own. Product,Proj. Own. Sum,ROI,ROI/Entry Fee,Num Dupes"
+                    f.write(header + se_header + "\n")
                     for lineup_str, fpts in unique.items():
                         f.write(f"{lineup_str}\n")
             else:
                 with open(out_path, "w") as f:
-                    header = "Type,MVP,STAR,PRO,UTIL,UTIL,Salary,Fpts Proj,Field Fpts Proj,Ceiling,Primary Stack,Secondary Stack,Win %,Top 10%,Cash %,Proj. Own. Product,Proj. Own. Sum,Num Dupes\n"
-                    f.write(header)
+                    header = "Type,MVP,STAR,PRO,UTIL,UTIL,Salary,Fpts Proj,Field Fpts Proj,Ceiling,Primary Stack,Secondary Stack,Win %,Top 10%,Cash %,Proj. Own. Product,Proj. Own. Sum,Num Dupes"
+                    f.write(header + se_header + "\n")
                     for lineup_str, fpts in unique.items():
                         f.write(f"{lineup_str}\n")
         self.player_output()
\ No newline at end of file
@@ -0,0 +1,549 @@
+import collections
+import math
+import os
+import numpy as np
+from numba import get_num_threads, jit, prange
+from scipy.special import ndtri
+from scipy.stats import gamma, norm, qmc
+
+# numeric helpers shared by the GPP, showdown and late swap simulators
+
+
+# player outcome distributions: normal, or a gaussian copula over these marginals
+OUTCOME_DISTRIBUTIONS = ("normal", "gamma", "lognormal", "empirical")
+# the normal scores marginal inverse CDF tables are sampled at
+MARGINAL_Z_MAX = 6.0
+MARGINAL_GRID_SIZE = 512
+
+# Correlation lookup keys: teammate positions, then opponent positions
+CORR_POSITIONS = ("PG", "SG", "SF", "PF", "C")
+CORR_KEYS = CORR_POSITIONS + tuple("Opp " + pos for pos in CORR_POSITIONS)
+
+
+def build_correlation_matrix(players, teammate_correlations, same_position_only):
+    # Pairwise correlations for a game's players: each player's "Correlations" row
+    # looked up by the other player's position and team, then the teammates of a player
+    # with a known primary position replaced by teammate_correlations (by that player's
+    # position; only teammates sharing it if same_position_only), and "Player
+    # Correlations" overrides patched in last
+    num_players = len(players)
+    corr_table = np.zeros((num_players, len(CORR_KEYS) + 1))
+    for i, player in enumerate(players):
+        for k, key in enumerate(CORR_KEYS):
+            corr_table[i, k] = player["Correlations"].get(key, 0)
+    positions = np.array(
+        [
+            CORR_POSITIONS.index(p["Position"][0])
+            if p["Position"][0] in CORR_POSITIONS
+            else len(CORR_POSITIONS)
+            for p in players
+        ]
+    )
+    known = positions < len(CORR_POSITIONS)
+    team_columns = np.where(known, positions, len(CORR_KEYS))
+    opp_columns = np.where(known, positions + len(CORR_POSITIONS), len(CORR_KEYS))
+    teams = np.unique([p["Team"] for p in players], return_inverse=True)[1]
+    same_team = teams[:, None] == teams[None, :]
+    columns = np.where(same_team, team_columns[None, :], opp_columns[None, :])
+    corr_matrix = np.take_along_axis(corr_table, columns, axis=1)
+    if same_position_only:
+        replaced = same_team & (positions[:, None] == positions[None, :])
+    else:
+        replaced = same_team & known[:, None]
+    corr_matrix = np.where(
+        replaced, teammate_correlations[positions][:, None], corr_matrix
+    )
+
+    name_index = collections.defaultdict(list)
+    for i, player in enumerate(players):
+        name_index[player["Name"]].append(i)
+    for i, player in enumerate(players):
+        for name, value in player.get("Player Correlations", {}).items():
+            corr_matrix[i, name_index.get(name, [])] = value
+    np.fill_diagonal(corr_matrix, 1)
+    return corr_matrix
+
+
+def factor_covariance(covariance_matrix, jitter):
+    # eigen factor F of the covariance matrix, so samples drawn as mean + Z @ F.T have
+    # covariance F @ F.T. Negative eigenvalues are clipped to zero, or with jitter the
+    # whole spectrum is first shifted up past the most negative one
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance_matrix)
+    if jitter and np.any(eigenvalues < 0):
+        eigenvalues += abs(eigenvalues.min()) + 1e-6
+    eigenvalues[eigenvalues < 0] = 0
+    return eigenvectors * np.sqrt(eigenvalues)
+
+
+def load_covariance_factor(path, covariance_matrix, jitter):
+    # factor_covariance cached at path, so re-running a slate skips the decomposition
+    if os.path.exists(path):
+        return np.load(path)
+    factor = factor_covariance(covariance_matrix, jitter)
+    # written aside and moved into place, so a crash or a concurrent sim (e.g. the
+    # shards of a sharded run) never leaves or reads a half written cache
+    tmp_path = "{}.{}.tmp".format(path, os.urandom(8).hex())
+    with open(tmp_path, "wb") as f:
+        np.save(f, factor)
+    os.replace(tmp_path, path)
+    return factor
+
+
+SAMPLING_METHODS = ("random", "antithetic", "sobol")
+
+
+def nearest_power_of_two(size):
+    # the power of two nearest size on a log scale; Sobol points are only balanced in
+    # blocks of a power of two
+    return 2 ** max(0, round(math.log2(size)))
+
+
+def draw_standard_normals(rng, num_dims, num_draws, sampling):
+    # (num_dims x num_draws) float32 standard normals: independent ("random"), in +/-
+    # pairs ("antithetic") or from a scrambled Sobol sequence ("sobol"). Antithetic
+    # pairs sit in adjacent columns, so any even-length prefix of the draws is balanced
+    if sampling == "antithetic":
+        half = rng.standard_normal((num_dims, (num_draws + 1) // 2), dtype=np.float32)
+        pairs = np.stack((half, -half), axis=2).reshape(num_dims, -1)
+        return np.ascontiguousarray(pairs[:, :num_draws])
+    if sampling == "sobol":
+        # a full power of two keeps the sequence balanced, the first num_draws are used
+        sobol = qmc.Sobol(d=num_dims, scramble=True, seed=rng)
+        points = sobol.random_base2(max(0, math.ceil(math.log2(num_draws))))
+        points = np.clip(points[:num_draws], 1e-10, 1 - 1e-10)
+        return np.ascontiguousarray(ndtri(points).T, dtype=np.float32)
+    return rng.standard_normal((num_dims, num_draws), dtype=np.float32)
+
+
+def get_marginal_tables(distribution, means, stddevs, floors, ceilings, quantiles):
+    # each player's outcome inverse CDF sampled at the normal scores
+    # linspace(-MARGINAL_Z_MAX, MARGINAL_Z_MAX, MARGINAL_GRID_SIZE), so the copula turns
+    # correlated normal scores into outcomes with a table lookup. empirical runs through
+    # the floors (mirrored below the mean where missing), the means (as the medians)
+    # and the ceilings, at the quantiles percentiles
+    z = np.linspace(-MARGINAL_Z_MAX, MARGINAL_Z_MAX, MARGINAL_GRID_SIZE)
+    means = np.asarray(means, dtype=float)[:, None]
+    stddevs = np.asarray(stddevs, dtype=float)[:, None]
+    # players without a positive projection and spread stay at their projection
+    varies = (means > 0) & (stddevs > 0)
+    safe_means = np.where(varies, means, 1.0)
+    safe_stddevs = np.where(varies, stddevs, 1.0)
+    if distribution == "gamma":
+        alpha = (safe_means / safe_stddevs) ** 2
+        beta = safe_stddevs**2 / safe_means
+        tables = gamma.ppf(norm.cdf(z), alpha, scale=beta)
+    elif distribution == "lognormal":
+        sigma = np.sqrt(np.log1p((safe_stddevs / safe_means) ** 2))
+        tables = safe_means * np.exp(sigma * z - sigma**2 / 2)
+    else:
+        ceilings = np.asarray(ceilings, dtype=float)[:, None]
+        floors = np.asarray(floors, dtype=float)[:, None]
+        floors = np.where(np.isnan(floors), 2 * means - ceilings, floors)
+        floor_z, ceiling_z = norm.ppf(quantiles)
+        below = np.maximum(means - floors, 0) / -floor_z
+        above = np.maximum(ceilings - means, 0) / ceiling_z
+        tables = np.maximum(means + np.where(z < 0, below, above) * z, 0)
+    return np.where(varies, tables, means).astype(np.float32)
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def apply_marginal_tables(scores, tables, z_min, z_step):
+    # maps each row's standard normal scores, in place, through that row's inverse CDF
+    # table sampled at the normal scores z_min, z_min + z_step, ... (linear in between,
+    # clamped at the ends)
+    last = tables.shape[1] - 1
+    for i in range(scores.shape[0]):
+        for j in range(scores.shape[1]):
+            pos = (scores[i, j] - z_min) / z_step
+            if pos <= 0:
+                scores[i, j] = tables[i, 0]
+            elif pos >= last:
+                scores[i, j] = tables[i, last]
+            else:
+                k = int(pos)
+                scores[i, j] = tables[i, k] + (pos - k) * (
+                    tables[i, k + 1] - tables[i, k]
+                )
+
+
+def get_copula_marginals(
+    distribution, means, factor, floors=None, ceilings=None, quantiles=None
+):
+    # what correlated_outcomes needs for the gaussian copula: each player's marginal
+    # inverse CDF table and the 1 / stddev that standardizes the factor's correlated
+    # normals. None for normal outcomes
+    if distribution == "normal":
+        return None
+    stddevs = np.sqrt(np.square(factor, dtype=float).sum(axis=1))
+    inv_stddevs = np.divide(1, stddevs, out=np.zeros_like(stddevs), where=stddevs > 0)
+    return {
+        "inv_stddevs": inv_stddevs.astype(np.float32),
+        "tables": get_marginal_tables(
+            distribution, means, stddevs, floors, ceilings, quantiles
+        ),
+    }
+
+
+def correlated_outcomes(factor, normals, means, marginals):
+    # (players x draws) outcomes from (factors x draws) standard normals: means + factor
+    # @ normals, or for the gaussian copula the factor's correlated normals standardized
+    # per player and mapped through the player's marginal inverse CDF
+    scores = (factor @ normals).astype(np.float32, copy=False)
+    if marginals is None:
+        scores += np.asarray(means, dtype=np.float32)[:, None]
+        return scores
+    scores *= marginals["inv_stddevs"][:, None]
+    z_step = 2 * MARGINAL_Z_MAX / (MARGINAL_GRID_SIZE - 1)
+    apply_marginal_tables(scores, marginals["tables"], -MARGINAL_Z_MAX, z_step)
+    return scores
+
+
+def batch_standard_errors(
+    sums, block_squares, block_cross, weight_squares, num_iterations, num_blocks
+):
+    # standard errors of the per-iteration means sums / num_iterations by the method of
+    # batch means: each block of iterations is one observation of the mean, weighted by
+    # its size. block_squares is the running sum of squared block totals, block_cross of
+    # block totals times block sizes and weight_squares of squared block sizes
+    if num_blocks < 2:
+        return np.full(np.shape(sums), np.inf)
+    mean = sums / num_iterations
+    spread = block_squares - 2 * mean * block_cross + mean**2 * weight_squares
+    spread = np.maximum(spread, 0) * num_blocks / (num_blocks - 1)
+    return np.sqrt(spread) / num_iterations
+
+
+def rank_top_lineups(scores, num_ranked):
+    # rows of the first num_ranked places per iteration (column), best first; lower
+    # scores rank higher. Only those places are sorted, the rest are just partitioned off
+    if num_ranked >= len(scores):
+        return np.argsort(scores, axis=0).astype(np.uint32)
+    top = np.argpartition(scores, num_ranked - 1, axis=0)[:num_ranked]
+    order = np.argsort(np.take_along_axis(scores, top, axis=0), axis=0)
+    return np.take_along_axis(top, order, axis=0).astype(np.uint32)
+
+
+def payout_kernel(
+    ranks, scores, payout_array, entry_fee, field_lineups_count, num_threads
+):
+    # ROI for one block of ranked iterations (see rank_top_lineups, scores are negated
+    # so lower is better). Lineups tied on score split the places they occupy between
+    # all of their entries; a tie that runs past the ranked rows pulls in the unranked
+    # lineups with the same score. Everyone else finished out of the money and just
+    # lost the entry fee. The iteration columns are split across num_threads, each
+    # paying out its columns into its own accumulator row
+    num_lineups = len(field_lineups_count)
+    num_ranked, num_sims = ranks.shape
+    thread_results = np.zeros((num_threads, num_lineups))
+    num_places = len(payout_array)
+    payout_cumsum = np.zeros(num_places + 1)
+    payout_cumsum[1:] = np.cumsum(payout_array)
+    sims_per_thread = (num_sims + num_threads - 1) // num_threads
+
+    for t in prange(num_threads):
+        first_sim = t * sims_per_thread
+        last_sim = min(first_sim + sims_per_thread, num_sims)
+        for r in range(first_sim, last_sim):
+            ranks_in_sim = ranks[:, r]
+            payout_index = 0
+            start = 0
+            while start < num_ranked and payout_index < num_places:
+                score = scores[ranks_in_sim[start], r]
+                end = start + 1
+                while end < num_ranked and scores[ranks_in_sim[end], r] == score:
+                    end += 1
+                if end == num_ranked and num_ranked < num_lineups:
+                    tied = np.nonzero(scores[:, r] == score)[0]
+                else:
+                    tied = ranks_in_sim[start:end].astype(np.int64)
+                entries = 0
+                for lineup_index in tied:
+                    entries += field_lineups_count[lineup_index]
+                stop = min(payout_index + entries, num_places)
+                prize_per_entry = (
+                    payout_cumsum[stop] - payout_cumsum[payout_index]
+                ) / entries
+                for lineup_index in tied:
+                    thread_results[t, lineup_index] += prize_per_entry + entry_fee
+                payout_index += entries
+                start = end
+    return thread_results.sum(axis=0) - entry_fee * num_sims
+
+
+def placement_kernel(ranks, scores, cutoffs, num_threads):
+    # each lineup's finishes within every cutoff (e.g. the win, the top 1% and the
+    # cashing places, counted in lineups) for one block of ranked iterations. Lineups
+    # tied on score across a cutoff share the places inside it, so an iteration never
+    # hands out more than cutoff finishes; ties past the ranked rows are pulled in the
+    # same way payout_kernel does
+    num_lineups = scores.shape[0]
+    num_ranked, num_sims = ranks.shape
+    max_cutoff = cutoffs.max()
+    thread_placements = np.zeros((num_threads, len(cutoffs), num_lineups))
+    sims_per_thread = (num_sims + num_threads - 1) // num_threads
+
+    for t in prange(num_threads):
+        first_sim = t * sims_per_thread
+        last_sim = min(first_sim + sims_per_thread, num_sims)
+        for r in range(first_sim, last_sim):
+            ranks_in_sim = ranks[:, r]
+            start = 0
+            while start < num_ranked and start < max_cutoff:
+                score = scores[ranks_in_sim[start], r]
+                end = start + 1
+                while end < num_ranked and scores[ranks_in_sim[end], r] == score:
+                    end += 1
+                if end == num_ranked and num_ranked < num_lineups:
+                    tied = np.nonzero(scores[:, r] == score)[0]
+                else:
+                    tied = ranks_in_sim[start:end].astype(np.int64)
+                for c in range(len(cutoffs)):
+                    inside = min(cutoffs[c], start + len(tied)) - start
+                    if inside > 0:
+                        share = inside / len(tied)
+                        for lineup_index in tied:
+                            thread_placements[t, c, lineup_index] += share
+                start = end
+    return thread_placements.sum(axis=0)
+
+
+# payout_kernel / placement_kernel compiled twice: serially for sims that already run
+# one block per pool worker, and across numba's threads for sims that score a block in
+# process (prange is a plain range in the serial build)
+serial_payouts = jit(nopython=True)(payout_kernel)
+parallel_payouts = jit(nopython=True, parallel=True)(payout_kernel)
+serial_placements = jit(nopython=True)(placement_kernel)
+parallel_placements = jit(nopython=True, parallel=True)(placement_kernel)
+
+
+def score_ranked_block(
+    scores, num_ranked, cutoffs, payout_array, entry_fee, field_lineups_count, parallel
+):
+    # ranks one block of (lineups x iterations) 32-bit scores, best first, and returns
+    # every lineup's finishes within each cutoff and its ROI over the block. Only the
+    # first num_ranked places are sorted, which must cover every cutoff and paid place
+    np.negative(scores, out=scores)
+    ranks = rank_top_lineups(scores, num_ranked)
+    cutoffs = np.asarray(cutoffs, dtype=np.int64)
+    if parallel:
+        num_threads = get_num_threads()
+        placements = parallel_placements(ranks, scores, cutoffs, num_threads)
+        roi = parallel_payouts(
+            ranks, scores, payout_array, entry_fee, field_lineups_count, num_threads
+        )
+    else:
+        placements = serial_placements(ranks, scores, cutoffs, 1)
+        roi = serial_payouts(
+            ranks, scores, payout_array, entry_fee, field_lineups_count, 1
+        )
+    return placements, roi
+
+
+def new_block_stats(num_lineups):
+    # running sums of the blocks' win and ROI totals for their standard errors
+    return {
+        "squares": np.zeros((2, num_lineups)),
+        "cross": np.zeros((2, num_lineups)),
+        "weight_squares": 0,
+        "iterations": 0,
+        "blocks": 0,
+    }
+
+
+def add_block_stats(stats, wins, roi, num_iterations):
+    # records one block of num_iterations iterations with these win and ROI totals
+    block_totals = np.array([wins, roi])
+    stats["squares"] += np.square(block_totals)
+    stats["cross"] += num_iterations * block_totals
+    stats["weight_squares"] += num_iterations**2
+    stats["iterations"] += num_iterations
+    stats["blocks"] += 1
+
+
+class AdaptiveSim:
+    # the outcome distribution, the sampling option and the adaptive iteration count
+    # every simulator offers; a simulator sets use_contest_data and entry_fee, and feeds
+    # new_block_stats / add_block_stats to has_converged after every block. sim_name
+    # goes in the names of its output files
+    outcome_distribution = "normal"
+    outcome_distributions = OUTCOME_DISTRIBUTIONS
+    boom_bust_quantiles = [0.1, 0.9]
+    sampling = "random"
+    target_win_se = None
+    target_roi_se = None
+    sim_time_budget = None
+    convergence_top_n = 100
+    convergence_block_size = 1000
+    min_convergence_blocks = 10
+    lineup_standard_errors = None
+    sim_name = None
+
+    def load_sim_options(self):
+        # optional: "normal", or a gaussian copula over "gamma", "lognormal" or
+        # "empirical" (boom/bust floor and ceiling) player outcome distributions
+        self.outcome_distribution = self.config.get(
+            "outcome_distribution", self.outcome_distribution
+        )
+        if self.outcome_distribution not in self.outcome_distributions:
+            print(
+                "unsupported outcome_distribution {}, using normal".format(
+                    self.outcome_distribution
+                )
+            )
+            self.outcome_distribution = "normal"
+        # optional: the percentiles boom/bust floors and ceilings stand for
+        self.boom_bust_quantiles = self.config.get(
+            "boom_bust_quantiles", self.boom_bust_quantiles
+        )
+        # optional: "random", "antithetic" or "sobol" normal draws for player outcomes
+        self.sampling = self.config.get("sampling", self.sampling)
+        if self.sampling not in SAMPLING_METHODS:
+            print("unknown sampling {}, using random".format(self.sampling))
+            self.sampling = "random"
+        if self.sampling == "sobol":
+            # adaptive blocks of a power of two, so each block's draws are balanced
+            self.convergence_block_size = nearest_power_of_two(
+                self.convergence_block_size
+            )
+        # optional: adaptive iteration count, num_iterations becomes the cap. The sim
+        # stops once the top convergence_top_n lineups' win% (and ROI%) standard errors
+        # are within target_win_se (target_roi_se) percentage points, or after
+        # sim_time_budget seconds
+        self.target_win_se = self.config.get("target_win_se", self.target_win_se)
+        self.target_roi_se = self.config.get("target_roi_se", self.target_roi_se)
+        self.sim_time_budget = self.config.get("sim_time_budget", self.sim_time_budget)
+        self.convergence_top_n = int(
+            self.config.get("convergence_top_n", self.convergence_top_n)
+        )
+
+    def check_sobol_draws(self, draw_size):
+        # warns when drawing num_iterations in draws of draw_size leaves a Sobol draw
+        # that isn't a power of two (a whole draw, or the last one cut short), which
+        # loses part of its variance reduction
+        if self.sampling != "sobol":
+            return
+        draw_size = min(draw_size, self.num_iterations)
+        last_draw = self.num_iterations % draw_size or draw_size
+        if draw_size & (draw_size - 1) == 0 and last_draw & (last_draw - 1) == 0:
+            return
+        if draw_size == self.num_iterations:
+            suggestion = nearest_power_of_two(draw_size)
+        else:
+            suggestion = max(1, round(self.num_iterations / draw_size)) * draw_size
+        print(
+            "sobol sampling is only balanced in draws of a power of two iterations, "
+            "{} iterations are drawn in blocks of {}; {} iterations keep every draw "
+            "balanced".format(self.num_iterations, draw_size, suggestion)
+        )
+
+    def benchmark_sampling(self, num_replicates=16, replicate_iterations=4096):
+        # every field lineup's ROI and win% estimates from independent replicate sims of
+        # replicate_iterations under each sampling method. A method's variance
+        # reduction (total variance with random sampling over total variance with the
+        # method) is how many times fewer iterations it needs for the same standard
+        # error on this slate. A simulator provides simulate_replicates and a
+        # benchmark_seed_sequence
+        print(
+            "Benchmarking sampling with {} replicates of {} iterations".format(
+                num_replicates, replicate_iterations
+            )
+        )
+        variances = {}
+        for sampling in SAMPLING_METHODS:
+            roi_estimates = []
+            win_estimates = []
+            for wins, roi in self.simulate_replicates(
+                sampling,
+                replicate_iterations,
+                self.benchmark_seed_sequence.spawn(num_replicates),
+            ):
+                roi_estimates.append(roi / replicate_iterations)
+                win_estimates.append(wins / replicate_iterations * 100)
+            variances[sampling] = [
+                np.var(roi_estimates, axis=0, ddof=1).sum(),
+                np.var(win_estimates, axis=0, ddof=1).sum(),
+            ]
+
+        out_path = os.path.join(
+            os.path.dirname(__file__),
+            "../output/{}_{}_sampling_benchmark_{}_{}.csv".format(
+                self.site, self.sim_name, self.field_size, replicate_iterations
+            ),
+        )
+        with open(out_path, "w") as f:
+            f.write(
+                "Sampling,ROI Variance,ROI Variance Reduction,"
+                "Win% Variance,Win% Variance Reduction\n"
+            )
+            for sampling, (roi_var, win_var) in variances.items():
+                # ROI has no variance without contest data
+                reductions = [
+                    round(baseline / var, 2) if var > 0 else "n/a"
+                    for baseline, var in zip(variances["random"], (roi_var, win_var))
+                ]
+                print(
+                    "{}: ROI variance reduction {}x, win% variance reduction "
+                    "{}x".format(sampling, *reductions)
+                )
+                f.write(
+                    "{},{},{},{},{}\n".format(
+                        sampling, roi_var, reductions[0], win_var, reductions[1]
+                    )
+                )
+
+    def is_adaptive(self):
+        return any(
+            v is not None
+            for v in [self.target_win_se, self.target_roi_se, self.sim_time_budget]
+        )
+
+    def get_convergence_lineups(self, wins, roi):
+        # the lineups an adaptive run has to pin down: the best by ROI, or by wins
+        # without contest data
+        order = np.argsort(-roi if self.use_contest_data else -wins, kind="stable")
+        return order[: self.convergence_top_n]
+
+    def get_lineup_standard_errors(self, wins, roi, stats):
+        # every lineup's win% and ROI% standard errors in percentage points, the latter
+        # only with contest data
+        win_se, roi_se = batch_standard_errors(
+            np.array([wins, roi], dtype=float),
+            stats["squares"],
+            stats["cross"],
+            stats["weight_squares"],
+            stats["iterations"],
+            stats["blocks"],
+        )
+        if not self.use_contest_data:
+            return win_se * 100, None
+        return win_se * 100, roi_se / self.entry_fee * 100
+
+    def has_converged(self, wins, roi, stats, elapsed):
+        # the stopping rule of an adaptive run, checked after every block. Even out of
+        # time it takes two blocks to put a standard error on the results
+        if self.sim_time_budget is not None and stats["blocks"] >= 2:
+            if elapsed >= float(self.sim_time_budget):
+                return True
+        if stats["blocks"] < self.min_convergence_blocks:
+            return False
+        win_se, roi_se = self.get_lineup_standard_errors(wins, roi, stats)
+        top = self.get_convergence_lineups(wins, roi)
+        checks = []
+        if self.target_win_se is not None:
+            checks.append(win_se[top].max() <= float(self.target_win_se))
+        if self.target_roi_se is not None and roi_se is not None:
+            checks.append(roi_se[top].max() <= float(self.target_roi_se))
+        return len(checks) > 0 and all(checks)
+
+    def report_convergence(self, wins, roi, stats):
+        # kept for the output CSVs, with the precision the top lineups reached
+        win_se, roi_se = self.get_lineup_standard_errors(wins, roi, stats)
+        self.lineup_standard_errors = [win_se]
+        top = self.get_convergence_lineups(wins, roi)
+        message = "Stopped after {} iterations: top {} lineups' win% SE <= {}%".format(
+            stats["iterations"], len(top), round(win_se[top].max(), 4)
+        )
+        if roi_se is not None:
+            self.lineup_standard_errors.append(roi_se)
+            message += ", ROI% SE <= {}%".format(round(roi_se[top].max(), 4))
+        print(message)
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import csv
 import os
@@ -13,7 +14,19 @@ import multiprocessing
 import time
 from collections import Counter, defaultdict
 from numba import jit, prange
-from scipy.stats import norm, kendalltau, multivariate_normal, gamma
+from scipy.stats import norm, kendalltau, gamma
+from scipy.sparse import csr_matrix
+from nba_sim_utils import (
+    AdaptiveSim,
+    add_block_stats,
+    build_correlation_matrix,
+    correlated_outcomes,
+    draw_standard_normals,
+    get_copula_marginals,
+    load_covariance_factor,
+    new_block_stats,
+    score_ranked_block,
+)
 import requests
 import pytz
 from datetime import timezone, timedelta
@@ -23,7 +36,11 @@ def salary_boost(salary, max_salary):
     return (salary / max_salary) ** 2
 
 
-class NBA_Swaptimizer_Sims:
+# Correlation to teammates, by primary position
+TEAMMATE_CORRELATIONS = np.array([-0.1324, -0.1324, -0.0812, -0.0812, -0.1231, 0])
+
+
+class NBA_Swaptimizer_Sims(AdaptiveSim):
     site = None
     config = None
     problem = None
@@ -65,9 +82,24 @@ class NBA_Swaptimizer_Sims:
     min_salary = None
     teams_dict = defaultdict(list) 
     missing_ids = {}
+    # no live floors and ceilings for an empirical distribution
+    outcome_distributions = ("normal", "gamma", "lognormal")
+    sim_name = "lateswap_sim"
 
-    def __init__(self, num_iterations, site=None, num_uniques=1):
+    def __init__(self, num_iterations, site=None, num_uniques=1, seed=None):
         self.site = site
+        # every random stream in a run is spawned from its stage's child of this sequence
+        # (rng, lineup guesses, game outcomes, sampling benchmark), so the outcomes
+        # don't depend on how many lineups were guessed; a fixed seed reproduces the run
+        # on any number of cores
+        self.seed_sequence = np.random.SeedSequence(seed)
+        (
+            rng_seed,
+            self.guess_seed_sequence,
+            self.outcome_seed_sequence,
+            self.benchmark_seed_sequence,
+        ) = self.seed_sequence.spawn(4)
+        self.rng = np.random.default_rng(rng_seed)
         self.num_iterations = num_iterations
         self.num_uniques = int(num_uniques)
         if self.site == 'dk':
@@ -892,6 +924,8 @@ class NBA_Swaptimizer_Sims:
         self.min_salary = int(self.config["min_lineup_salary"])
         self.default_var = float(self.config["default_var"])
         self.max_pct_off_optimal = float(self.config['max_pct_off_optimal'])
+        # optional: outcome distribution, sampling and the adaptive iteration count
+        self.load_sim_options()
 
     def load_projections(self, path):
         # Read projections into a dictionary
@@ -1139,7 +1173,7 @@ class NBA_Swaptimizer_Sims:
             if self.randomness_amount != 0:
                 problem += (
                     plp.lpSum(
-                        np.random.normal(
+                        self.rng.normal(
                             self.player_dict[player]["Fpts"],
                             (
                                 self.player_dict[player]["StdDev"]
@@ -1458,9 +1492,11 @@ class NBA_Swaptimizer_Sims:
         num_players_in_roster = len(self.roster_construction)
         pos_index_dict = {pos: i for i, pos in enumerate(self.roster_construction)}
         # creating tuples of the above np arrays plus which lineup number we are going to create
-        for key, lineup in self.contest_lineups.items():
+        seeds = self.guess_seed_sequence.spawn(len(self.contest_lineups))
+        for (key, lineup), seed in zip(self.contest_lineups.items(), seeds):
             lu_tuple = (
                 key,
+                seed,
                 lineup,
                 ids,
                 in_lineup,
@@ -1543,6 +1579,7 @@ class NBA_Swaptimizer_Sims:
     @staticmethod
     def generate_lineups(
         key,
+        seed,
         lineup,
         ids,
         in_lineup,
@@ -1562,7 +1599,7 @@ class NBA_Swaptimizer_Sims:
         pos_index_dict,
         player_salary_floor
     ):
-        rng = np.random.default_rng()  # Use default_rng for a more modern RNG
+        rng = np.random.default_rng(seed)
         lineup_copy = lineup.copy()
         iteration_count = 0
         total_players = num_players_in_roster
@@ -1650,8 +1687,6 @@ class NBA_Swaptimizer_Sims:
                         lineup = reset_lineup()  # No valid players, reset lineup
                         break  # Break out of the position loop to restart
                     #print(f'{key} found valid players for position {p}: {valid_players}')
-                    # grab names of players eligible
-                    plyr_list = ids[valid_players]
                     # create np array of probability of being seelcted based on ownership and who is eligible at the position
                     prob_list = ownership[valid_players]
                     prob_list = prob_list / prob_list.sum()
@@ -1668,9 +1703,9 @@ class NBA_Swaptimizer_Sims:
                         )  # normalize to ensure it sums to 1
                     try:
                         if players_remaining == 1:
-                            choice = rng.choice(plyr_list, p=boosted_probabilities)
+                            choice_idx = rng.choice(valid_players, p=boosted_probabilities)
                         else:
-                            choice = rng.choice(plyr_list, p=prob_list)
+                            choice_idx = rng.choice(valid_players, p=prob_list)
                     except:
                         lineup = reset_lineup()
                         #if lineup['EntryId'] == '3983870229':
@@ -1682,11 +1717,10 @@ class NBA_Swaptimizer_Sims:
                         #print(f'{key} restarting lineup generation {lineup}, {players_remaining}')
                         continue  # Skip to the next iteration of the while loop
                     players_remaining -= 1
-                    choice_idx = np.nonzero(ids == choice)[0]
                     #if lineup['EntryId'] == '3983870229':
                     #    print(choice, salary, proj, reasonable_projection, salary_floor)
                     #    log_lineup_state("Before adding player", lineup)
-                    lineup[position] = str(choice)  # Adding player
+                    lineup[position] = str(ids[choice_idx])  # Adding player
                     in_lineup[choice_idx] = 1
                     salary += salaries[choice_idx]
                     proj += projections[choice_idx]
@@ -1694,8 +1728,8 @@ class NBA_Swaptimizer_Sims:
                     #if lineup['EntryId'] == '3983870229':
                     #    print(choice, salary, proj, reasonable_projection, salary_floor)
                     #    log_lineup_state("After adding player", lineup)
-                    player_teams.append(teams[choice_idx][0])
-                    lineup_matchups.append(matchups[choice_idx[0]])
+                    player_teams.append(teams[choice_idx])
+                    lineup_matchups.append(matchups[choice_idx])
                 if players_remaining == 0:
                     # Check if the lineup is valid after all positions are filled
                     if is_valid_lineup(salary, proj, player_teams):
@@ -1721,13 +1755,23 @@ class NBA_Swaptimizer_Sims:
                 return lineup  # Return the best attempt or a lineup indicating failure
 
 
-    def calc_gamma(self, mean, sd):
-        alpha = (mean / sd) ** 2
-        beta = sd**2 / mean
-        return alpha, beta
+    def index_outcome_players(self):
+        # the simulated players in outcome matrix row order: game by game in sorted
+        # matchup order, each game's players in the order run_simulation_for_game
+        # returns them (team1 then team2), so every game fills a contiguous range of rows
+        self.outcome_player_ids = [
+            player["ID"]
+            for m in sorted(self.matchups)
+            for player in self.teams_dict[m[0]] + self.teams_dict[m[1]]
+        ]
+        self.outcome_index = {
+            player_id: row for row, player_id in enumerate(self.outcome_player_ids)
+        }
 
     def count_lineups_and_extract_fields(self):
-
+        self.index_outcome_players()
+        # entries rostering a player no game simulates, who would silently score 0
+        unsimulated = []
         for entry_id, lineup_info in self.contest_lineups.items():
             #print(entry_id, lineup_info)
             # Create a list of player IDs to represent the actual lineup
@@ -1736,17 +1780,30 @@ class NBA_Swaptimizer_Sims:
             except:
                 print(lineup_info)
 
+            for pos, player_id in zip(self.roster_construction, actual_lineup_list):
+                if player_id not in self.outcome_index:
+                    unsimulated.append(
+                        "entry {} ({}): {} {}".format(
+                            entry_id, lineup_info.get("User"), pos, player_id
+                        )
+                    )
+
             # Create a frozenset of player IDs to represent the lineup uniquely for counting duplicates
             lineup_set = frozenset(actual_lineup_list)
             if 'BayesianProjectedFpts' not in lineup_info:
                 print(lineup_info)
             # If this is the first time we see this lineup, initialize its info in the dictionary
             if lineup_set not in self.field_lineups:
+                # rows of the rostered players in the outcome matrix
+                lineup_rows = [
+                    self.outcome_index.get(player_id, -1)
+                    for player_id in actual_lineup_list
+                ]
                 self.field_lineups[lineup_set] = {
                     'Count': 1,
                     'BayesianProjectedFpts': lineup_info['BayesianProjectedFpts'],
                     'BayesianProjectedVar': lineup_info['BayesianProjectedVar'],
-                    'Lineup': actual_lineup_list,  # The list of player IDs,
+                    'Lineup': np.array(lineup_rows, dtype=np.int64),
                     'EntryIds': [],
                     'ROI': 0,
                     'Wins': 0,
@@ -1759,7 +1816,38 @@ class NBA_Swaptimizer_Sims:
                 self.field_lineups[lineup_set]['Count'] += 1
                 self.field_lineups[lineup_set]['EntryIds'].append(entry_id)
 
-        
+        if len(unsimulated) > 0:
+            raise ValueError(
+                "{} rostered players of live contest {} aren't in any simulated game, "
+                "check their IDs against the projections:\n{}".format(
+                    len(unsimulated),
+                    self.config.get("live_contest_path"),
+                    "\n".join(unsimulated),
+                )
+            )
+
+
+    def get_game_factor(self, game):
+        # covariance factor for the game's players, cached in output/ keyed by the
+        # players and their covariances so re-running the slate skips the decomposition
+        corr_matrix = build_correlation_matrix(
+            game, TEAMMATE_CORRELATIONS, same_position_only=False
+        )
+        stddevs = np.array([player["StdDev"] for player in game], dtype=float)
+        covariance_matrix = corr_matrix * np.outer(stddevs, stddevs)
+        np.fill_diagonal(
+            covariance_matrix, [player["BayesianProjectedVar"] for player in game]
+        )
+        key = hashlib.sha1(
+            json.dumps([player["ID"] for player in game]).encode()
+            + covariance_matrix.tobytes()
+        ).hexdigest()[:16]
+        path = os.path.join(
+            os.path.dirname(__file__),
+            "../output/{}_lateswap_sim_game_factor_{}.npy".format(self.site, key),
+        )
+        # negative eigenvalues are clipped
+        return load_covariance_factor(path, covariance_matrix, jitter=False)
 
     @staticmethod
     def run_simulation_for_game(
@@ -1767,219 +1855,128 @@ class NBA_Swaptimizer_Sims:
         team1,
         team2_id,
         team2,
+        game_factor,
+        marginals,
         num_iterations,
         roster_construction,
-        time_remaining_dict
+        time_remaining_dict,
+        sampling,
+        seed,
     ):
-        # Define correlations between positions
-        if time_remaining_dict[team1_id]['Minutes Remaining']== 0:
-            game = team1 + team2
-            temp_fpts_dict = {}
-            for i, player in enumerate(game):
-                temp_fpts_dict[player["ID"]] = np.full(num_iterations, player["BayesianProjectedFpts"])
-                # If time remaining is zero, we set the player's fantasy points to their BayesianProjectedFpts
-        else: 
-            def get_corr_value(player1, player2):
-                # First, check for specific player-to-player correlations
-                if player2["Name"] in player1.get("Player Correlations", {}):
-                    return player1["Player Correlations"][player2["Name"]]
-
-                # If no specific correlation is found, proceed with the general logic
-                position_correlations = {
-                    "PG": -0.1324,
-                    "SG": -0.1324,
-                    "SF": -0.0812,
-                    "PF": -0.0812,
-                    "C": -0.1231,
-                }
-
-                if player1["Team"] == player2["Team"] and player1["Position"][0] in [
-                    "PG",
-                    "SG",
-                    "SF",
-                    "PF",
-                    "C",
-                ]:
-                    primary_position = player1["Position"][0]
-                    return position_correlations[primary_position]
-
-                if player1["Team"] != player2["Team"]:
-                    player_2_pos = "Opp " + str(player2["Position"][0])
-                else:
-                    player_2_pos = player2["Position"][0]
-
-                return player1["Correlations"].get(
-                    player_2_pos, 0
-                )  # Default to 0 if no correlation is found
-
-            def build_covariance_matrix(players):
-                N = len(players)
-                matrix = [[0 for _ in range(N)] for _ in range(N)]
-                corr_matrix = [[0 for _ in range(N)] for _ in range(N)]
-
-                for i in range(N):
-                    for j in range(N):
-                        if i == j:
-                            matrix[i][j] = (
-                                players[i]["BayesianProjectedVar"]
-                            )  # Variance on the diagonal
-                            corr_matrix[i][j] = 1
-                        else:
-                            matrix[i][j] = (
-                                get_corr_value(players[i], players[j])
-                                * players[i]["StdDev"]
-                                * players[j]["StdDev"]
-                            )
-                            corr_matrix[i][j] = get_corr_value(players[i], players[j])
-                return matrix, corr_matrix
-
-            def ensure_positive_semidefinite(matrix):
-                eigs = np.linalg.eigvals(matrix)
-                if np.any(eigs < 0):
-                    jitter = abs(min(eigs)) + 1e-6  # a small value
-                    matrix += np.eye(len(matrix)) * jitter
-                return matrix
-
-            game = team1 + team2
-            covariance_matrix, corr_matrix = build_covariance_matrix(game)
-            # print(team1_id, team2_id)
-            # print(corr_matrix)
-            corr_matrix = np.array(corr_matrix)
-
-            # Given eigenvalues and eigenvectors from previous code
-            eigenvalues, eigenvectors = np.linalg.eigh(covariance_matrix)
-
-            # Set negative eigenvalues to zero
-            eigenvalues[eigenvalues < 0] = 0
-
-            # Reconstruct the matrix
-            covariance_matrix = eigenvectors.dot(np.diag(eigenvalues)).dot(eigenvectors.T)
-
-            try:
-                samples = multivariate_normal.rvs(
-                    mean=[player["BayesianProjectedFpts"] for player in game],
-                    cov=covariance_matrix,
-                    size=num_iterations,
-                )
-            except:
-                print(team1_id, team2_id, "bad matrix", covariance_matrix)
-
-            player_samples = []
-            for i, player in enumerate(game):
-                if "QB" in player["Position"]:
-                    sample = samples[:, i]
-                else:
-                    sample = samples[:, i]
-                # if player['Team'] in ['LAR','SEA']:
-                #     print(player['Name'], player['Fpts'], player['StdDev'], sample, np.mean(sample), np.std(sample))
-                player_samples.append(sample)
-
-            temp_fpts_dict = {}
-            # print(team1_id, team2_id, len(game), uniform_samples.T.shape, len(player_samples), covariance_matrix.shape )
-
-            for i, player in enumerate(game):
-                temp_fpts_dict[player["ID"]] = player_samples[i]
-                
-        return temp_fpts_dict
-
-    @staticmethod
-    @jit(nopython=True)
-    def calculate_payouts(args):
-        (
-            ranks,
-            payout_array,
-            entry_fee,
-            field_lineup_keys,
-            use_contest_data,
-            field_lineups_count,
-        ) = args
-        num_lineups = len(field_lineup_keys)
-        combined_result_array = np.zeros(num_lineups)
-
-        payout_cumsum = np.cumsum(payout_array)
-
-        for r in range(ranks.shape[1]):
-            ranks_in_sim = ranks[:, r]
-            payout_index = 0
-            for lineup_index in ranks_in_sim:
-                lineup_count = field_lineups_count[lineup_index]
-                prize_for_lineup = (
-                    (
-                        payout_cumsum[payout_index + lineup_count - 1]
-                        - payout_cumsum[payout_index - 1]
-                    )
-                    / lineup_count
-                    if payout_index != 0
-                    else payout_cumsum[payout_index + lineup_count - 1] / lineup_count
-                )
-                combined_result_array[lineup_index] += prize_for_lineup
-                payout_index += lineup_count
-        return combined_result_array
+        # the game's simulated fpts as a (players x iterations) float32 matrix, rows in
+        # team1 + team2 order. The players of a finished game are fixed at their
+        # BayesianProjectedFpts, their final scores
+        game = team1 + team2
+        means = np.array(
+            [player["BayesianProjectedFpts"] for player in game], dtype=float
+        )
+        if time_remaining_dict[team1_id]["Minutes Remaining"] == 0:
+            return np.repeat(means[:, None], num_iterations, axis=1).astype(np.float32)
+        rng = np.random.default_rng(seed)
+        normals = draw_standard_normals(rng, len(game), num_iterations, sampling)
+        return correlated_outcomes(game_factor, normals, means, marginals)
+
+    def get_lineup_incidence(self):
+        # sparse (lineups x players) float32 matrix with a 1 wherever the lineup rosters
+        # the player, its columns the rows of the outcome matrix (see
+        # index_outcome_players)
+        lineups = np.array(
+            [v["Lineup"] for v in self.field_lineups.values()], dtype=np.int64
+        )
+        rows = np.repeat(np.arange(len(lineups)), lineups.shape[1])
+        return csr_matrix(
+            (np.ones(lineups.size, dtype=np.float32), (rows, lineups.ravel())),
+            shape=(len(lineups), len(self.outcome_player_ids)),
+        )
 
     def run_tournament_simulation(self):
         print(f"Running {self.num_iterations} simulations")
         print(f"Number of unique field lineups: {len(self.field_lineups.keys())}")
 
         start_time = time.time()
-        temp_fpts_dict = {}
-        size = self.num_iterations
-        game_simulation_params = []
         #print(self.time_remaining_dict)
         #random_keys = random.sample(list(self.contest_lineups.keys()), 5)
         #random_5_entries = {key: self.contest_lineups[key] for key in random_keys}
         #print(random_5_entries)
-        if len(self.matchups)>0:
-            for m in self.matchups:
-                game_simulation_params.append(
-                    (
-                        m[0],
-                        self.teams_dict[m[0]],
-                        m[1],
-                        self.teams_dict[m[1]],
-                        self.num_iterations,
-                        self.roster_construction,
-                        self.time_remaining_dict
-                    )
-                )
-            with multiprocessing.Pool() as pool:
-                results = pool.starmap(self.run_simulation_for_game, game_simulation_params)
 
-            for res in results:
-                temp_fpts_dict.update(res)  
+        # iterations run in blocks, each with its own seeds, so an adaptive run can
+        # check its stopping rule as it goes; a fixed iteration count is a single block
+        adaptive = self.is_adaptive()
+        block_size = self.convergence_block_size if adaptive else self.num_iterations
+        self.check_sobol_draws(block_size)
+        blocks = [
+            (i, min(i + block_size, self.num_iterations))
+            for i in range(0, self.num_iterations, block_size)
+        ]
 
-        field_lineups_count = np.array(
-            [self.field_lineups[idx]["Count"] for idx in self.field_lineups.keys()]
-        )
+        tournament = self.get_tournament_inputs()
 
-        fpts_array = np.zeros((len(self.field_lineups), self.num_iterations))
-        kcelite_idx = None
-        
-        for index, (keys, values) in enumerate(self.field_lineups.items()):
-            try:
-                fpts_sim = sum([temp_fpts_dict[player] for player in values["Lineup"]])
-            except KeyError:
-                for player in values["Lineup"]:
-                    if player not in temp_fpts_dict.keys():
-                        print(player)
-                        # for k,v in self.player_dict.items():
-                        # if v['ID'] == player:
-                        #        print(k,v)
-                # print('cant find player in sim dict', values["Lineup"], temp_fpts_dict.keys())
-            # store lineup fpts sum in 2d np array where index (row) corresponds to index of field_lineups and columns are the fpts from each sim
-            fpts_array[index] = fpts_sim
-            
-        fpts_array = fpts_array.astype(np.float16)
-        print(fpts_array)
-        # ranks = np.argsort(fpts_array, axis=0)[::-1].astype(np.uint16)
-        ranks = np.argsort(-fpts_array, axis=0).astype(np.uint32)
+        self.lineup_to_int = {lineup: index for index, lineup in enumerate(self.field_lineups.keys())}
+        index_to_key = list(self.field_lineups.keys())
+        # tied lineups share their finishes, so every total is fractional
+        totals = [np.zeros(len(index_to_key)) for _ in range(4)]
+        stats = new_block_stats(len(index_to_key))
+        with multiprocessing.Pool() as pool:
+            for start, stop in blocks:
+                result = self.simulate_tournament_block(
+                    pool,
+                    stop - start,
+                    self.sampling,
+                    self.outcome_seed_sequence.spawn(len(self.matchups)),
+                    *tournament,
+                )
+                totals = [t + r for t, r in zip(totals, result)]
+                add_block_stats(stats, result[0], result[3], stop - start)
+                if adaptive and self.has_converged(
+                    totals[0], totals[3], stats, time.time() - start_time
+                ):
+                    break
+        wins, top1pct, cashes, roi = totals
+        self.num_iterations = stats["iterations"]
+        if adaptive:
+            self.report_convergence(wins, roi, stats)
 
-        # count wins, top 10s vectorized
-        wins, win_counts = np.unique(ranks[0, :], return_counts=True)
+        for idx, lineup_key in enumerate(index_to_key):
+            self.field_lineups[lineup_key]["ROI"] += roi[idx]
+            self.field_lineups[lineup_key]["Wins"] += wins[idx]
+            self.field_lineups[lineup_key]["Top1Percent"] += top1pct[idx]
+            self.field_lineups[lineup_key]["Cashes"] += cashes[idx]
 
-        top1pct, top1pct_counts = np.unique(
-            ranks[0 : math.ceil(0.01 * len(self.field_lineups)), :], return_counts=True
+        end_time = time.time()
+        diff = end_time - start_time
+        print(
+            str(self.num_iterations)
+            + " tournament simulations finished in "
+            + str(diff)
+            + " seconds. Outputting."
         )
 
+    def get_tournament_inputs(self):
+        # the games with their covariance factors and copula marginals, the lineup
+        # incidence matrix, the payouts net of the entry fee and the lineup counts
+        # simulate_tournament_block scores the field with. The games are
+        # sorted so each one gets the same seed from run to run
+        matchups = sorted(self.matchups)
+        game_factors = []
+        game_marginals = []
+        for m in matchups:
+            # finished games are fixed at their final scores and need no factor
+            game_factor = None
+            marginals = None
+            if self.time_remaining_dict[m[0]]["Minutes Remaining"] != 0:
+                game = self.teams_dict[m[0]] + self.teams_dict[m[1]]
+                game_factor = self.get_game_factor(game)
+                marginals = get_copula_marginals(
+                    self.outcome_distribution,
+                    [player["BayesianProjectedFpts"] for player in game],
+                    game_factor,
+                )
+            game_factors.append(game_factor)
+            game_marginals.append(marginals)
+
+        field_lineups_count = np.array(
+            [self.field_lineups[idx]["Count"] for idx in self.field_lineups.keys()]
+        )
         payout_array = np.array(list(self.payout_structure.values()))
         # subtract entry fee
         payout_array = payout_array - self.entry_fee
@@ -1987,72 +1984,93 @@ class NBA_Swaptimizer_Sims:
             shape=self.field_size - len(payout_array), fill_value=-self.entry_fee
         )
         payout_array = np.concatenate((payout_array, l_array))
-        
-        cashes, cash_counts = np.unique(ranks[0:len(list(self.payout_structure.values()))], return_counts=True)
-
-        # Adjusted ROI calculation
-        # print(field_lineups_count.shape, payout_array.shape, ranks.shape, fpts_array.shape)
-
-        # Split the simulation indices into chunks
-        self.lineup_to_int = {lineup: index for index, lineup in enumerate(self.field_lineups.keys())}
-        field_lineups_keys_array = np.array([self.lineup_to_int[lineup] for lineup in self.field_lineups.keys()])
-
-        chunk_size = self.num_iterations // 16  # Adjust chunk size as needed
-        simulation_chunks = [
-            (
-                ranks[:, i : min(i + chunk_size, self.num_iterations)].copy(),
-                payout_array,
-                self.entry_fee,
-                field_lineups_keys_array,
-                self.use_contest_data,
-                field_lineups_count,
-            )  # Adding field_lineups_count here
-            for i in range(0, self.num_iterations, chunk_size)
-        ]
+        return (
+            matchups,
+            game_factors,
+            game_marginals,
+            self.get_lineup_incidence(),
+            payout_array,
+            field_lineups_count,
+        )
 
-        # Use the pool to process the chunks in parallel
+    def simulate_replicates(self, sampling, num_iterations, seeds):
+        # every field lineup's wins and ROI in an independent sim of num_iterations with
+        # this sampling for each seed, for benchmark_sampling
+        tournament = self.get_tournament_inputs()
+        results = []
         with multiprocessing.Pool() as pool:
-            results = pool.map(self.calculate_payouts, simulation_chunks)
-
-        combined_result_array = np.sum(results, axis=0)
-        
-        total_sum = 0
-        index_to_key = list(self.field_lineups.keys())
-        for idx, roi in enumerate(combined_result_array):
-            lineup_int_key = self.lineup_to_int[index_to_key[idx]]  # Convert lineup string to integer key
-            lineup_count = self.field_lineups[index_to_key[idx]]["Count"]  # Access using the original lineup string
-            total_sum += roi * lineup_count
-            self.field_lineups[index_to_key[idx]]["ROI"] += roi  # Access using the original lineup string
-
-        # Second loop for wins and top1pct
-        # Assuming wins and top1pct are arrays or lists of integers that correspond to the mapped lineup integers
-
-        for lineup_key in self.field_lineups.keys():  # loop through lineup strings
-            lineup_int_key = self.lineup_to_int[lineup_key]  # Convert lineup string to integer key
-
-            if lineup_int_key in wins:
-                # Find the index where lineup_int_key is found in wins array
-                win_index = np.where(wins == lineup_int_key)[0][0]
-                self.field_lineups[lineup_key]["Wins"] += win_counts[win_index]
-
-            if lineup_int_key in top1pct:
-                # Find the index where lineup_int_key is found in top1pct array
-                top1pct_index = np.where(top1pct == lineup_int_key)[0][0]
-                self.field_lineups[lineup_key]["Top1Percent"] += top1pct_counts[top1pct_index]
-
-            if lineup_int_key in cashes:
-                # Find the index where lineup_int_key is found in wins array
-                cash_index = np.where(cashes == lineup_int_key)[0][0]
-                self.field_lineups[lineup_key]["Cashes"] += cash_counts[cash_index]
+            for seed in seeds:
+                wins, _, _, roi = self.simulate_tournament_block(
+                    pool,
+                    num_iterations,
+                    sampling,
+                    seed.spawn(len(self.matchups)),
+                    *tournament,
+                )
+                results.append((wins, roi))
+        return results
 
-        end_time = time.time()
-        diff = end_time - start_time
-        print(
-            str(self.num_iterations)
-            + " tournament simulations finished in "
-            + str(diff)
-            + " seconds. Outputting."
+    def simulate_tournament_block(
+        self,
+        pool,
+        num_iterations,
+        sampling,
+        seeds,
+        matchups,
+        game_factors,
+        game_marginals,
+        incidence,
+        payout_array,
+        field_lineups_count,
+    ):
+        # simulates every game for one block of iterations, then scores, ranks and pays
+        # out the field; returns every lineup's wins, top 1%s, cashes and ROI over the
+        # block
+        game_simulation_params = []
+        for m, game_factor, marginals, seed in zip(
+            matchups, game_factors, game_marginals, seeds
+        ):
+            game_simulation_params.append(
+                (
+                    m[0],
+                    self.teams_dict[m[0]],
+                    m[1],
+                    self.teams_dict[m[1]],
+                    game_factor,
+                    marginals,
+                    num_iterations,
+                    self.roster_construction,
+                    self.time_remaining_dict,
+                    sampling,
+                    seed,
+                )
+            )
+        # the games' outcomes stack into the (players x iterations) outcome matrix in
+        # index_outcome_players order, then the field is scored as (lineups x players) @
+        # (players x iterations) in float32, so lineups only tie when their scores
+        # really are the same
+        player_fpts = np.zeros((0, num_iterations), dtype=np.float32)
+        if len(game_simulation_params) > 0:
+            player_fpts = np.concatenate(
+                pool.starmap(self.run_simulation_for_game, game_simulation_params)
+            )
+        fpts_array = incidence @ player_fpts
+
+        # only the top 1% and the paid places are ranked; ties split the wins, top 1%s,
+        # cashes and prizes, paid out in-process across numba's threads
+        num_lineups = len(field_lineups_count)
+        num_top1pct = math.ceil(0.01 * num_lineups)
+        num_cashes = len(self.payout_structure)
+        (wins, top1pct, cashes), roi = score_ranked_block(
+            fpts_array,
+            max(num_top1pct, num_cashes, 1),
+            [1, num_top1pct, num_cashes],
+            payout_array,
+            self.entry_fee,
+            field_lineups_count,
+            parallel=True,
         )
+        return wins, top1pct, cashes, roi
 
     def output(self):
         unique = {}
@@ -2207,6 +2225,10 @@ class NBA_Swaptimizer_Sims:
                             f" ({x['Lineup'][8]}),"
                             f"{fpts_p},{ceil_p},{salary},{win_p}%,{top10_p}%,{own_p},{own_s},{primaryStack},{secondaryStack},{lu_type},{simDupes},{userName},{lu_idx},{entry}"
                         )
+                # an adaptive run also reports the precision it reached for every lineup
+                if self.lineup_standard_errors is not None:
+                    for se in self.lineup_standard_errors:
+                        lineup_str += ",{}%".format(round(se[lu_idx], 4))
                 unique[index] = lineup_str
 
         out_path = os.path.join(
@@ -2215,24 +2237,27 @@ class NBA_Swaptimizer_Sims:
                 self.site, self.field_size, self.num_iterations
             ),
         )
+        se_header = ""
+        if self.lineup_standard_errors is not None:
+            se_header = ",Win % SE,ROI% SE" if self.use_contest_data else ",Win % SE"
         with open(out_path, "w") as f:
             if self.site == "dk":
                 if self.use_contest_data:
                     f.write(
-                        "PG,SG,SF,PF,C,G,F,UTIL,Fpts Proj,Ceiling,Salary,Win %,Top 1%,ROI%,Proj. Own. Product,Own. Sum,Avg. Return,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes,User Name,Lineup Index,Entry ID\n"
+                        "PG,SG,SF,PF,C,G,F,UTIL,Fpts Proj,Ceiling,Salary,Win %,Top 1%,ROI%,Proj. Own. Product,Own. Sum,Avg. Return,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes,User Name,Lineup Index,Entry ID" + se_header + "\n"
                     )
                 else:
                     f.write(
-                        "PG,SG,SF,PF,C,G,F,UTIL,Fpts Proj,Ceiling,Salary,Win %,Top 1%, Proj. Own. Product,Own. Sum,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes,User Name,Lineup Index,Entry ID\n"
+                        "PG,SG,SF,PF,C,G,F,UTIL,Fpts Proj,Ceiling,Salary,Win %,Top 1%, Proj. Own. Product,Own. Sum,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes,User Name,Lineup Index,Entry ID" + se_header + "\n"
                     )
             elif self.site == "fd":
                 if self.use_contest_data:
                     f.write(
-                        "PG,PG,SG,SG,SF,SF,PF,PF,C,DST,Fpts Proj,Ceiling,Salary,Win %,Top 1%,ROI%,Proj. Own. Product,Own. Sum,Avg. Return,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes,User Name,Lineup Index,Entry ID\n"
+                        "PG,PG,SG,SG,SF,SF,PF,PF,C,DST,Fpts Proj,Ceiling,Salary,Win %,Top 1%,ROI%,Proj. Own. Product,Own. Sum,Avg. Return,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes,User Name,Lineup Index,Entry ID" + se_header + "\n"
                     )
                 else:
                     f.write(
-                        "PG,PG,SG,SG,SF,SF,PF,PF,C,Fpts Proj,Ceiling,Salary,Win %,Top 1%,Proj. Own. Product,Own. Sum,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes,User Name,Lineup Index,Entry ID\n"
+                        "PG,PG,SG,SG,SF,SF,PF,PF,C,Fpts Proj,Ceiling,Salary,Win %,Top 1%,Proj. Own. Product,Own. Sum,Stack1 Type,Stack2 Type,Lineup Type,Sim Dupes,User Name,Lineup Index,Entry ID" + se_header + "\n"
                     )
 
             for fpts, lineup_str in unique.items():
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+import nba_gpp_simulator
+from nba_gpp_simulator import NBA_GPP_Simulator, dedupe_lineups, hash_lineups
+
+ROSTER = ["PG", "SG", "SF", "PF", "C", "G", "F", "UTIL"]
+POSITIONS = ["PG", "SG", "SF", "PF", "C"]
+
+
+def make_simulator(seed, field_chunk_size=100):
+    # just enough of a simulator for sample_field, without loading a slate
+    sim = object.__new__(NBA_GPP_Simulator)
+    sim.roster_construction = ROSTER
+    sim.salary = 50000
+    sim.field_chunk_size = field_chunk_size
+    sim.field_seed_sequence = np.random.SeedSequence(seed).spawn(4)[1]
+    return sim
+
+
+def make_slate(sim, num_players=80):
+    # num_players players on 8 teams in 4 games, in the layout generate_field_lineups
+    # hands to sample_lineups
+    rng = np.random.default_rng(0)
+    positions = [POSITIONS[i % 5] for i in range(num_players)]
+    pos_masks = np.zeros(num_players, dtype=np.int64)
+    for i, position in enumerate(positions):
+        for k, slot in enumerate(ROSTER):
+            if slot == position or (slot, position) in [
+                ("G", "PG"),
+                ("G", "SG"),
+                ("F", "SF"),
+                ("F", "PF"),
+                ("UTIL", position),
+            ]:
+                pos_masks[i] |= 1 << k
+    ownership = rng.uniform(1, 30, num_players)
+    salaries = (rng.integers(30, 110, num_players) * 100).astype(np.int64)
+    teams = np.arange(num_players, dtype=np.int64) % 8
+    min_salary_after, max_salary_after = sim.get_salary_bounds(pos_masks, salaries)
+    return {
+        **sim.get_slot_tables(pos_masks, ownership, salaries),
+        "salaries": salaries,
+        "projections": rng.uniform(10, 50, num_players),
+        "teams": teams,
+        "matchups": teams // 2,
+        "num_players_in_roster": len(ROSTER),
+        "salary_floor": 45000,
+        "salary_ceiling": 50000,
+        "min_salary_after": min_salary_after,
+        "max_salary_after": max_salary_after,
+        "reasonable_projection": 0.0,
+        "max_players_per_team": 0,
+        "min_acceptance_rate": 0.0,
+        "adapt_window": 1000,
+        "projection_backoff": 0.95,
+    }
+
+
+def count_repeats(lineups):
+    # how many lineups are copies of one earlier in the field
+    _, _, first, _ = dedupe_lineups(lineups)
+    return len(lineups) - len(first)
+
+
+@pytest.fixture(scope="module")
+def slate():
+    return make_slate(make_simulator(7))
+
+
+def test_seeded_field_is_reproducible(slate):
+    first = make_simulator(7).sample_field(slate, 300)[0]
+    again = make_simulator(7).sample_field(slate, 300)[0]
+    other = make_simulator(8).sample_field(slate, 300)[0]
+    assert np.array_equal(first, again)
+    assert not np.array_equal(first, other)
+
+
+def test_topped_up_field_draws_new_lineups(slate):
+    fresh = make_simulator(7).sample_field(slate, 600)[0]
+    cached = make_simulator(7).sample_field(slate, 200)[0]
+    top_up = make_simulator(7).sample_field(slate, 400, offset=len(cached))[0]
+    topped_up = np.concatenate([cached, top_up])
+    # chunks line up with a fresh run's, so the top-up is the rest of that field
+    assert np.array_equal(topped_up, fresh)
+    assert count_repeats(topped_up) <= count_repeats(fresh)
+
+
+def test_top_up_at_an_unaligned_offset(slate):
+    fresh = make_simulator(7).sample_field(slate, 600)[0]
+    cached = make_simulator(7).sample_field(slate, 250)[0]
+    top_up = make_simulator(7).sample_field(slate, 350, offset=len(cached))[0]
+    # no chunk of the top-up reuses a seed the cached lineups were drawn from
+    assert count_repeats(np.concatenate([cached, top_up])) <= count_repeats(fresh)
+
+
+def test_hashes_ignore_roster_order():
+    lineups = np.array([[3, 1, 2], [1, 2, 3], [2, 3, 1], [1, 2, 4]], dtype=np.int16)
+    rows, hashes = hash_lineups(lineups)
+    assert np.array_equal(rows[0], [1, 2, 3])
+    assert len(set(hashes[:3].tolist())) == 1
+    assert hashes[3] != hashes[0]
+
+
+def test_dedupe_counts_distinct_lineups(slate):
+    lineups = make_simulator(7).sample_field(slate, 300)[0]
+    # every lineup twice more, once with its roster order reversed
+    field = np.concatenate([lineups, lineups, lineups[:, ::-1]])
+    rows, _, first, counts = dedupe_lineups(field)
+    distinct, expected_counts = np.unique(rows, axis=0, return_counts=True)
+    assert len(first) == len(distinct)
+    assert sorted(counts.tolist()) == sorted(expected_counts.tolist())
+    assert counts.sum() == len(field)
+
+
+def test_dedupe_survives_hash_collisions(monkeypatch):
+    lineups = np.array([[1, 2, 3], [3, 2, 1], [4, 5, 6], [1, 2, 7]], dtype=np.int16)
+
+    def colliding_hashes(lineups):
+        rows, hashes = hash_lineups(lineups)
+        return rows, np.zeros_like(hashes)
+
+    monkeypatch.setattr(nba_gpp_simulator, "hash_lineups", colliding_hashes)
+    rows, _, first, counts = dedupe_lineups(lineups)
+    assert len(first) == 3
+    assert sorted(counts.tolist()) == [1, 1, 2]
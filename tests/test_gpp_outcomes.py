@@ -0,0 +1,104 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from nba_gpp_simulator import NBA_GPP_Simulator
+from nba_sim_utils import factor_covariance
+
+NUM_PLAYERS = 6
+
+
+def stored_outcomes():
+    # the stores go to output/ like a real run's, under a site of their own
+    return glob.glob(
+        os.path.join(os.path.dirname(__file__), "..", "output", "test_gpp_sim_*")
+    )
+
+
+def remove_stores():
+    for path in stored_outcomes():
+        os.remove(path)
+
+
+@pytest.fixture(autouse=True)
+def clean_output():
+    yield
+    remove_stores()
+
+
+def make_simulator(seed, num_iterations=300, sampling="random"):
+    # just enough of a simulator for the outcome store, with a fixed outcome model
+    sim = object.__new__(NBA_GPP_Simulator)
+    sim.site = "test"
+    sim.seed = seed
+    sim.seed_sequence = np.random.SeedSequence(seed)
+    (
+        _,
+        sim.field_seed_sequence,
+        sim.outcome_seed_sequence,
+        sim.benchmark_seed_sequence,
+    ) = sim.seed_sequence.spawn(4)
+    sim.player_ids = np.arange(NUM_PLAYERS)
+    sim.player_keys = list(range(NUM_PLAYERS))
+    sim.num_iterations = num_iterations
+    sim.sampling = sampling
+    sim.outcome_chunk_size = 128
+    covariance = np.full((NUM_PLAYERS, NUM_PLAYERS), 4.0) + np.eye(NUM_PLAYERS) * 12
+    model = {
+        "means": np.linspace(10, 40, NUM_PLAYERS).astype(np.float32),
+        "factor": factor_covariance(covariance, jitter=True),
+        "marginals": None,
+    }
+    sim.get_outcome_model = lambda: model
+    return sim
+
+
+def simulate(sim):
+    # the run's outcomes, as the workers read them from the store
+    store = sim.open_player_outcomes()
+    sim.extend_player_outcomes(store, sim.num_iterations)
+    outcomes = np.array(np.load(store["path"], mmap_mode="r"))
+    sim.close_player_outcomes(store)
+    return outcomes
+
+
+@pytest.mark.parametrize("sampling", ["random", "antithetic", "sobol"])
+def test_seeded_outcomes_are_reproducible(sampling):
+    first = simulate(make_simulator(3, sampling=sampling))
+    # drawn again rather than read back from the first run's store
+    remove_stores()
+    again = simulate(make_simulator(3, sampling=sampling))
+    other = simulate(make_simulator(4, sampling=sampling))
+    assert first.shape == (NUM_PLAYERS, 300)
+    assert np.array_equal(first, again)
+    assert not np.array_equal(first, other)
+
+
+def test_adaptive_draws_match_a_full_draw():
+    full = simulate(make_simulator(3))
+    remove_stores()
+    # a chunk at a time, as an adaptive run draws them
+    sim = make_simulator(3)
+    store = sim.open_player_outcomes()
+    for stop in range(100, 301, 100):
+        sim.extend_player_outcomes(store, stop)
+    outcomes = np.array(np.load(store["path"], mmap_mode="r"))
+    sim.close_player_outcomes(store)
+    assert np.array_equal(outcomes, full)
+
+
+def test_seeded_runs_reuse_their_store(capsys):
+    first = simulate(make_simulator(3))
+    again = simulate(make_simulator(3))
+    assert "using stored player outcomes for seed 3" in capsys.readouterr().out
+    assert np.array_equal(first, again)
+
+
+def test_unseeded_runs_are_independent():
+    first = simulate(make_simulator(None))
+    again = simulate(make_simulator(None))
+    assert not np.array_equal(first, again)
+    # nothing is left behind for a later run to pick up
+    assert stored_outcomes() == []
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from nba_sim_utils import (
+    draw_standard_normals,
+    rank_top_lineups,
+    score_ranked_block,
+)
+
+
+@pytest.mark.parametrize("num_draws", [1, 10, 11, 1000])
+def test_antithetic_prefixes_are_balanced(num_draws):
+    normals = draw_standard_normals(
+        np.random.default_rng(0), 3, num_draws, "antithetic"
+    )
+    assert normals.shape == (3, num_draws)
+    assert normals.dtype == np.float32
+    # every even-length prefix sums to zero, e.g. an adaptive run stopping mid-chunk
+    for stop in range(2, num_draws + 1, 2):
+        assert np.allclose(normals[:, :stop].sum(axis=1), 0, atol=1e-4)
+
+
+def test_sobol_draws_are_reproducible():
+    first = draw_standard_normals(np.random.default_rng(5), 4, 1024, "sobol")
+    again = draw_standard_normals(np.random.default_rng(5), 4, 1024, "sobol")
+    assert np.array_equal(first, again)
+    assert np.all(np.isfinite(first))
+
+
+def reference_scoring(scores, cutoffs, payouts, entry_fee, counts):
+    # every lineup's finishes within each cutoff and net winnings, one iteration at a
+    # time from a full sort: tied lineups split the places (in lineups) and prizes (in
+    # entries) they occupy evenly
+    num_lineups, num_sims = scores.shape
+    net = np.full(counts.sum(), -float(entry_fee))
+    net[: len(payouts)] = payouts
+    placements = np.zeros((len(cutoffs), num_lineups))
+    roi = np.zeros(num_lineups)
+    for r in range(num_sims):
+        place = 0
+        entry = 0
+        for score in np.unique(scores[:, r])[::-1]:
+            tied = np.nonzero(scores[:, r] == score)[0]
+            entries = counts[tied].sum()
+            roi[tied] += net[entry : entry + entries].mean()
+            for c, cutoff in enumerate(cutoffs):
+                inside = min(cutoff, place + len(tied)) - place
+                if inside > 0:
+                    placements[c, tied] += inside / len(tied)
+            place += len(tied)
+            entry += entries
+    return placements, roi
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_tied_payouts_and_placements_match_a_full_sort(parallel):
+    rng = np.random.default_rng(1)
+    num_lineups = 40
+    # a handful of distinct scores, so most places are tied
+    scores = rng.integers(0, 12, (num_lineups, 300)).astype(np.float32)
+    counts = rng.integers(1, 4, num_lineups)
+    entry_fee = 5
+    prizes = np.array([100, 50, 30, 20, 10, 10, 8, 6], dtype=float)
+    # payouts net of the entry fee, every place past the prizes losing the fee
+    payout_array = np.full(counts.sum(), -float(entry_fee))
+    payout_array[: len(prizes)] = prizes - entry_fee
+    cutoffs = [1, 3, len(prizes)]
+
+    placements, roi = score_ranked_block(
+        scores.copy(),
+        len(prizes),
+        cutoffs,
+        payout_array,
+        entry_fee,
+        counts,
+        parallel=parallel,
+    )
+    expected_placements, expected_roi = reference_scoring(
+        scores, cutoffs, payout_array, entry_fee, counts
+    )
+    assert np.allclose(placements, expected_placements)
+    assert np.allclose(roi, expected_roi)
+    # every iteration hands out exactly one win
+    assert np.isclose(placements[0].sum(), scores.shape[1])
+
+
+def test_rank_top_lineups_orders_the_best_places():
+    scores = np.random.default_rng(2).random((50, 20)).astype(np.float32)
+    ranks = rank_top_lineups(scores, 5)
+    assert ranks.shape == (5, 20)
+    assert np.array_equal(ranks, np.argsort(scores, axis=0)[:5])
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from nba_swap_sims import NBA_Swaptimizer_Sims
+
+ROSTER = ["PG", "SG", "SF", "PF", "C", "G", "F", "UTIL"]
+
+
+def make_simulator():
+    # two games of 8 players a team, the second one finished, and three contest entries
+    # (two of them the same lineup)
+    sim = object.__new__(NBA_Swaptimizer_Sims)
+    sim.roster_construction = ROSTER
+    sim.matchups = {("BOS", "NYK"), ("LAL", "DEN")}
+    sim.time_remaining_dict = {
+        "BOS": {"Minutes Remaining": 30},
+        "NYK": {"Minutes Remaining": 30},
+        "LAL": {"Minutes Remaining": 0},
+        "DEN": {"Minutes Remaining": 0},
+    }
+    sim.teams_dict = {
+        team: [
+            {"ID": "{}{}".format(team, i), "BayesianProjectedFpts": 10.0 + i}
+            for i in range(8)
+        ]
+        for team in sim.time_remaining_dict
+    }
+    lineups = [
+        ["BOS0", "NYK1", "LAL2", "DEN3", "BOS4", "NYK5", "LAL6", "DEN7"],
+        ["BOS1", "BOS2", "BOS3", "NYK0", "NYK2", "NYK3", "LAL0", "DEN0"],
+        ["NYK1", "BOS0", "LAL2", "DEN3", "BOS4", "NYK5", "LAL6", "DEN7"],
+    ]
+    sim.contest_lineups = {
+        entry_id: {
+            **dict(zip(ROSTER, lineup)),
+            "BayesianProjectedFpts": 0.0,
+            "BayesianProjectedVar": 0.0,
+        }
+        for entry_id, lineup in enumerate(lineups)
+    }
+    sim.field_lineups = {}
+    return sim, lineups
+
+
+def simulate_games(sim, num_iterations):
+    # every game's outcomes in sorted matchup order, as simulate_tournament_block stacks
+    # them
+    outcomes = []
+    for m in sorted(sim.matchups):
+        game = sim.teams_dict[m[0]] + sim.teams_dict[m[1]]
+        outcomes.append(
+            sim.run_simulation_for_game(
+                m[0],
+                sim.teams_dict[m[0]],
+                m[1],
+                sim.teams_dict[m[1]],
+                np.eye(len(game), dtype=np.float32) * 3,
+                None,
+                num_iterations,
+                ROSTER,
+                sim.time_remaining_dict,
+                "random",
+                np.random.SeedSequence(1),
+            )
+        )
+    return np.concatenate(outcomes)
+
+
+def test_lineups_score_their_players_outcomes():
+    sim, lineups = make_simulator()
+    sim.count_lineups_and_extract_fields()
+    # the duplicate entry is counted once
+    assert [v["Count"] for v in sim.field_lineups.values()] == [2, 1]
+
+    player_fpts = simulate_games(sim, 50)
+    assert player_fpts.shape == (32, 50)
+    scores = sim.get_lineup_incidence() @ player_fpts
+    rows = {player_id: row for row, player_id in enumerate(sim.outcome_player_ids)}
+    for score, lineup in zip(scores, lineups[:2]):
+        expected = player_fpts[[rows[player_id] for player_id in lineup]].sum(axis=0)
+        assert np.allclose(score, expected)
+
+
+def test_finished_games_are_fixed():
+    sim, _ = make_simulator()
+    sim.index_outcome_players()
+    player_fpts = simulate_games(sim, 20)
+    for row, player_id in enumerate(sim.outcome_player_ids):
+        if player_id[:3] in ["LAL", "DEN"]:
+            assert np.all(player_fpts[row] == 10.0 + int(player_id[3:]))
+        else:
+            assert player_fpts[row].std() > 0
+
+
+def test_unsimulated_players_are_an_error():
+    sim, _ = make_simulator()
+    sim.config = {"live_contest_path": "live_contest.csv"}
+    sim.contest_lineups[0]["UTIL"] = "PHX0"
+    with pytest.raises(ValueError, match="entry 0 .*UTIL PHX0"):
+        sim.count_lineups_and_extract_fields()